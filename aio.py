@@ -0,0 +1,197 @@
+"""asyncio coroutines for hashing and verifying files from an event loop, e.g. in a service that verifies uploads.
+
+Files are read and hashed on the threads of a `HashLimiter`, which bounds the number of files hashed at the same time;
+all coroutines given the same limiter share this budget. Nothing blocks the event loop: scanning, the hash cache, the
+journal, and the report are handled on a thread of the run. Cancelling the task that awaits a coroutine (or iterates
+over a verification) stops the reads it has started at their next block."""
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import functools
+
+import archive
+import blockio
+import hash
+import iosched
+from control import Cancelled, RunControl
+from verify import Verification
+
+PAUSE_POLL_INTERVAL = 0.1
+"""The number of seconds between two checks whether a paused verification has been resumed."""
+
+
+class HashLimiter:
+    """A budget of files that are hashed at the same time, shared by all coroutines the limiter is given to.
+
+    Files are hashed on a pool of `limit` threads. A coroutine waits for a free slot before it hands a file to the pool,
+    so that a file whose task is cancelled while waiting is never read, and slots are given out first come, first
+    served."""
+
+    def __init__(self, limit):
+        if limit < 1:
+            raise ValueError("the limit of a HashLimiter must be at least 1")
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=limit, thread_name_prefix="veepiaci-async-hash")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    async def run(self, function, *arguments, control):
+        """Run `function(*arguments)` on a thread of the pool once a slot is free, and return its result. If the
+        awaiting task is cancelled, the given `_TaskControl` is cancelled, which `function` has to check regularly."""
+        async with self.semaphore:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(function, *arguments))
+            try:
+                return await future
+            except asyncio.CancelledError:
+                # a running thread cannot be interrupted, but it stops at its next checkpoint
+                control.cancel()
+                raise
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _TaskControl:
+    """The `RunControl` of the thread hashing a single file for a task: it is cancelled when either the task or the
+    run is cancelled. Pausing the run does not stop the thread, so that a paused run does not hold on to the slots of a
+    shared `HashLimiter`; instead, no new files are started while the run is paused."""
+
+    def __init__(self, control=None):
+        self.control = control
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def checkpoint(self):
+        if self.cancelled or (self.control is not None and self.control.cancelled):
+            raise Cancelled()
+
+
+def _limiter(limiter):
+    """Return the given `HashLimiter`, or a new one for a limit given as a number, together with whether it is new."""
+    if isinstance(limiter, HashLimiter):
+        return limiter, False
+    return HashLimiter(limiter), True
+
+
+async def create_hash_async(file_name, limiter, algorithms=("md5",), block_size=blockio.DEFAULT_BLOCK_SIZE, strategy="auto", timings=None, control=None):
+    """Hash the given file like `hash.create_hash`, on a thread of the given `HashLimiter` (or of a limiter of its own,
+    if a number is given instead). Raises `Cancelled` if the given `RunControl` is cancelled."""
+    (limiter, own_limiter) = _limiter(limiter)
+    task_control = _TaskControl(control)
+    try:
+        return await limiter.run(hash.create_hash, file_name, algorithms, block_size, strategy, timings, task_control, control=task_control)
+    finally:
+        if own_limiter:
+            limiter.close()
+
+
+async def verify_checksums_async(checksum_file, directory, limiter, hash_cache=None, trust_cache=True, exclude=(), targeted=False, on_progress=None, on_finished=None,
+                                 report=None, journal=None, control=None, fail_fast=False):
+    """Verify the files in the given directory (or archive) against the given `ChecksumFile` like
+    `verify.verify_checksums`, as an async iterator of `(file, hashes, correct)` tuples, one for every file as soon as
+    it has been checked.
+
+    At most `2 * limiter.limit` files of a run are waiting for the given `HashLimiter` at any time, so that arbitrarily
+    many files can be verified, and several runs sharing a limiter take turns. The `VerificationResult`, which also
+    lists missing and additional files, is passed to `on_finished` at the end; `on_progress` is called on the event
+    loop. A verification that is cancelled through its `RunControl`, or stopped early with `fail_fast`, ends with an
+    incomplete result. Cancelling the iterating task stops the verification right away, without a result."""
+    loop = asyncio.get_running_loop()
+    (limiter, own_limiter) = _limiter(limiter)
+    control = control if control is not None else RunControl()
+    checked_files = collections.deque()
+    notify_progress = (lambda progress: loop.call_soon_threadsafe(on_progress, progress)) if on_progress else None
+    verification = Verification(checksum_file, directory, lambda *checked_file: checked_files.append(checked_file), notify_progress, hash_cache, trust_cache, report,
+                                journal, control, fail_fast)
+    # the hash cache, the journal, and the report are only ever used from this thread, in order
+    bookkeeping = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="veepiaci-async-verify")
+    try:
+        complete = True
+        try:
+            try:
+                jobs = await loop.run_in_executor(bookkeeping, verification.prepare, limiter.limit, exclude, targeted)
+            except asyncio.CancelledError:
+                # the scan cannot be interrupted, but stops at its next checkpoint
+                control.cancel()
+                raise
+            while checked_files:
+                yield checked_files.popleft()
+            if verification.archive_format is not None:
+                hashed_files = _hash_archive_members(verification, jobs, limiter, control)
+            else:
+                hashed_files = _hash_jobs(jobs, limiter, control)
+            async with contextlib.aclosing(hashed_files):
+                async for (job, file_hash) in hashed_files:
+                    await loop.run_in_executor(bookkeeping, verification.file_hashed, job, file_hash)
+                    while checked_files:
+                        yield checked_files.popleft()
+        except Cancelled:
+            complete = False
+        verification_result = await loop.run_in_executor(bookkeeping, verification.finish, complete)
+        if on_finished is not None:
+            on_finished(verification_result)
+    finally:
+        bookkeeping.shutdown(wait=False)
+        if own_limiter:
+            limiter.close()
+
+
+async def _hash_jobs(jobs, limiter, control):
+    """Hash the files of the given jobs on the limiter, yielding `(job, hashes)` tuples as they finish."""
+    scheduler = iosched.IoScheduler(jobs)
+    pending = {}
+    try:
+        while True:
+            await _wait_while_paused(control)
+            while len(pending) < limiter.limit * 2:
+                job = scheduler.next_job()
+                if job is None:
+                    break
+                job.timings = hash.HashTimings()
+                pending[asyncio.ensure_future(create_hash_async(job.file_name, limiter, job.algorithms, timings=job.timings, control=control))] = job
+            if not pending:
+                return
+            (done, _) = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                job = pending.pop(task)
+                scheduler.job_done(job)
+                file_hash = task.result()
+                if control.cancelled:
+                    raise Cancelled()
+                yield job, file_hash
+    finally:
+        for task in pending:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # retrieve the exception of a file that failed after the run had been stopped, so that asyncio does not
+                # report it as never retrieved
+                task.exception()
+
+
+async def _hash_archive_members(verification, jobs, limiter, control):
+    """Hash the files of the given jobs inside the archive of the verification, which is read by a single thread, one
+    file at a time."""
+    task_control = _TaskControl(control)
+    hashed_files = archive.hash_members(verification.directory, jobs, verification.existing_files, task_control)
+    while True:
+        await _wait_while_paused(control)
+        hashed_file = await limiter.run(next, hashed_files, None, control=task_control)
+        if hashed_file is None:
+            return
+        yield hashed_file
+
+
+async def _wait_while_paused(control):
+    while control.paused:
+        await asyncio.sleep(PAUSE_POLL_INTERVAL)
+    if control.cancelled:
+        raise Cancelled()
@@ -0,0 +1,318 @@
+"""Reads the files inside ISO 9660 images, ZIP archives and tar archives, so that they can be verified like the files
+of a directory, without extracting them.
+
+`scan_archive` lists the files of an archive as `ArchiveMember` objects, which stand in for the `ScanEntry` objects of
+a scanned directory, and `hash_members` hashes them by reading the archive once from start to end."""
+import contextlib
+import fnmatch
+import os
+import posixpath
+import tarfile
+import zipfile
+
+import blockio
+import hash
+import scan
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMATS = ("ISO", "ZIP", "tar")
+"""The formats of archives whose files can be verified. tar archives may be compressed with gzip, bzip2, xz, or (if the
+zstandard package is installed) Zstandard."""
+
+ISO_SECTOR_SIZE = 2048
+ISO_FIRST_VOLUME_DESCRIPTOR = 16
+"""The size of the sectors of an ISO 9660 image, and the sector of its first volume descriptor."""
+
+_JOLIET_ESCAPE_SEQUENCES = (b"%/@", b"%/C", b"%/E")
+_ZSTANDARD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class ArchiveMember:
+    """A file inside an archive, found by `scan_archive`.
+
+    Like a `ScanEntry`, a member has the metadata fields of `os.stat_result` that are used for the hash cache and the
+    checkpoint journal. Apart from the size, these are the ones of the archive itself, so that any change of the archive
+    invalidates the cached hashes of all of its members."""
+
+    __slots__ = ("path", "disk_path", "st_size", "st_mtime_ns", "st_ino", "st_dev", "location")
+
+    def __init__(self, path, disk_path, size, archive_stat, location):
+        self.path = path
+        """The path of the file inside the archive, separated by “/” and normalized to NFC."""
+        self.disk_path = disk_path
+        """The path of the file inside the archive as it is named there, separated by “/”."""
+        self.st_size = size
+        self.st_mtime_ns = archive_stat.st_mtime_ns
+        self.st_ino = archive_stat.st_ino
+        self.st_dev = archive_stat.st_dev
+        self.location = location
+        """Where the content of the file is found in the archive: a tuple of `(offset, size)` extents for ISO images,
+        the name of the member holding the data for ZIP archives, and the offset of the header of the member holding
+        the data (which is another member for hard links) for tar archives."""
+
+    def __repr__(self):
+        return "ArchiveMember(%r, size=%d)" % (self.path, self.st_size)
+
+
+def archive_format(file_name):
+    """Return the format (one of `FORMATS`) of the archive with the given name, detected from its content, or `None`
+    if it is not a file or not an archive of a supported format."""
+    if not os.path.isfile(file_name):
+        return None
+    with open(file_name, "rb") as file:
+        file.seek(ISO_FIRST_VOLUME_DESCRIPTOR * ISO_SECTOR_SIZE + 1)
+        if file.read(5) == b"CD001":
+            return "ISO"
+        file.seek(0)
+        if file.read(4) == _ZSTANDARD_MAGIC:
+            return "tar"
+    if zipfile.is_zipfile(file_name):
+        return "ZIP"
+    if tarfile.is_tarfile(file_name):
+        return "tar"
+    return None
+
+
+def scan_archive(file_name, exclude=()):
+    """Find all files inside the given archive, skipping those whose name or path (or the name or path of a directory
+    they are in) matches one of the glob patterns in `exclude`. Returns a list of `ArchiveMember` objects."""
+    format = archive_format(file_name)
+    if format is None:
+        raise ValueError("not a supported archive: " + file_name)
+    archive_stat = os.stat(file_name)
+    members = []
+    for (disk_path, size, location) in _LISTERS[format](file_name):
+        path = scan.normalize_name(disk_path)
+        if exclude and _is_excluded(path, exclude):
+            continue
+        members.append(ArchiveMember(path, disk_path, size, archive_stat, location))
+    return members
+
+
+def _is_excluded(path, exclude):
+    parts = path.split("/")
+    for index in range(len(parts)):
+        if any(fnmatch.fnmatchcase(parts[index], pattern) or fnmatch.fnmatchcase("/".join(parts[:index + 1]), pattern) for pattern in exclude):
+            return True
+    return False
+
+
+def hash_members(file_name, jobs, members, control=None, block_size=blockio.DEFAULT_BLOCK_SIZE):
+    """Hash the files inside the given archive for the given `HashJob` objects, whose keys are looked up in `members`,
+    a mapping from path to the `ArchiveMember` found by `scan_archive`.
+
+    The archive is read once, sequentially, and every file is hashed while it is being read (and decompressed), without
+    any temporary files. A `(job, hashes)` tuple is yielded for every job in the order the files appear in the archive.
+    If a `RunControl` is given, its checkpoint is passed between blocks; once it is cancelled, `Cancelled` is raised."""
+    jobs_by_location = {}
+    for job in jobs:
+        jobs_by_location.setdefault(members[job.key].location, []).append(job)
+    if not jobs_by_location:
+        return
+    for (location, blocks) in _READERS[archive_format(file_name)](file_name, jobs_by_location, block_size):
+        if control is not None:
+            control.checkpoint()
+        location_jobs = jobs_by_location[location]
+        timings = hash.HashTimings()
+        file_hash = hash.hash_blocks(blocks, sorted({algorithm for job in location_jobs for algorithm in job.algorithms}), timings, control)
+        for job in location_jobs:
+            # files at the same location are read once, so the time is only counted for the first of them
+            (job.timings, timings) = (timings, hash.HashTimings())
+            yield job, {algorithm: file_hash[algorithm] for algorithm in job.algorithms}
+
+
+def _read_file_blocks(file, size, block_size):
+    """Read `size` bytes from the current position of a binary file into a reused buffer, yielding them in blocks."""
+    buffer = bytearray(min(block_size, max(size, 1)))
+    view = memoryview(buffer)
+    try:
+        while size > 0:
+            read_bytes = file.readinto(view[:min(size, len(buffer))])
+            if not read_bytes:
+                raise ValueError("unexpected end of archive in " + getattr(file, "name", "archive"))
+            size -= read_bytes
+            with view[:read_bytes] as block:
+                yield block
+    finally:
+        view.release()
+
+
+# ISO 9660 images: the directory tree is read from the Joliet volume descriptor if there is one (its names are not
+# limited to upper case and 8.3), and from the primary volume descriptor otherwise.
+
+def _list_iso_members(file_name):
+    with open(file_name, "rb") as file:
+        (root_record, sector_size, joliet) = _read_iso_volume_descriptors(file)
+        files = []
+        pending = [("", _parse_iso_directory_record(root_record, joliet))]
+        visited = set()
+        while pending:
+            (prefix, directory) = pending.pop()
+            if directory["extents"][0] in visited:
+                continue
+            visited.add(directory["extents"][0])
+            for record in _read_iso_directory(file, directory, sector_size, joliet):
+                path = prefix + record["name"]
+                if record["directory"]:
+                    pending.append((path + "/", record))
+                else:
+                    files.append((path, sum(size for (_, size) in record["extents"]), tuple((sector * sector_size, size) for (sector, size) in record["extents"])))
+        return files
+
+
+def _read_iso_volume_descriptors(file):
+    primary = None
+    joliet = None
+    sector = ISO_FIRST_VOLUME_DESCRIPTOR
+    while True:
+        file.seek(sector * ISO_SECTOR_SIZE)
+        descriptor = file.read(ISO_SECTOR_SIZE)
+        if len(descriptor) < ISO_SECTOR_SIZE or descriptor[1:6] != b"CD001" or descriptor[0] == 255:
+            break
+        if descriptor[0] == 1 and primary is None:
+            primary = descriptor
+        elif descriptor[0] == 2 and descriptor[88:91] in _JOLIET_ESCAPE_SEQUENCES and joliet is None:
+            joliet = descriptor
+        sector += 1
+    if primary is None:
+        raise ValueError("ISO image without a primary volume descriptor: " + file.name)
+    descriptor = joliet if joliet is not None else primary
+    sector_size = int.from_bytes(descriptor[128:130], "little") or ISO_SECTOR_SIZE
+    return descriptor[156:190], sector_size, joliet is not None
+
+
+def _read_iso_directory(file, directory, sector_size, joliet):
+    """Yield the parsed records of the given directory, merging the records of files split into several extents."""
+    (sector, size) = directory["extents"][0]
+    file.seek(sector * sector_size)
+    data = file.read(size)
+    offset = 0
+    split_file = None
+    while offset < len(data):
+        length = data[offset]
+        if length == 0:
+            # records do not cross sector boundaries; the rest of the sector is padding
+            offset = (offset // sector_size + 1) * sector_size
+            continue
+        raw_name = data[offset + 33:offset + 33 + data[offset + 32]]
+        if raw_name not in (b"\x00", b"\x01"):
+            record = _parse_iso_directory_record(data[offset:offset + length], joliet)
+            if split_file is not None:
+                split_file["extents"] += record["extents"]
+                record = split_file
+            split_file = record if record["multi_extent"] else None
+            if split_file is None:
+                yield record
+        offset += length
+
+
+def _parse_iso_directory_record(record, joliet):
+    name = record[33:33 + record[32]]
+    name = name.decode("utf-16-be", "replace") if joliet else name.decode("latin-1")
+    if ";" in name:
+        name = name[:name.rindex(";")]
+    if not joliet and name.endswith("."):
+        name = name[:-1]
+    return {
+        "name": name,
+        "extents": [(int.from_bytes(record[2:6], "little"), int.from_bytes(record[10:14], "little"))],
+        "directory": bool(record[25] & 0x02),
+        "multi_extent": bool(record[25] & 0x80),
+    }
+
+
+def _read_iso_members(file_name, jobs_by_location, block_size):
+    with open(file_name, "rb", buffering=0) as file:
+        blockio.advise_sequential_access(file.fileno())
+        for location in sorted(jobs_by_location, key=lambda location: location[0][0] if location else 0):
+            yield location, _read_iso_extents(file, location, block_size)
+
+
+def _read_iso_extents(file, extents, block_size):
+    for (offset, size) in extents:
+        file.seek(offset)
+        yield from _read_file_blocks(file, size, block_size)
+
+
+# ZIP archives
+
+def _list_zip_members(file_name):
+    with zipfile.ZipFile(file_name) as archive:
+        return [(_member_path(info.filename), info.file_size, info.filename) for info in archive.infolist() if not info.is_dir()]
+
+
+def _read_zip_members(file_name, jobs_by_location, block_size):
+    with zipfile.ZipFile(file_name) as archive:
+        for info in sorted((archive.getinfo(name) for name in jobs_by_location), key=lambda info: info.header_offset):
+            with archive.open(info) as member:
+                yield info.filename, _read_zip_blocks(member, block_size)
+
+
+def _read_zip_blocks(member, block_size):
+    while True:
+        try:
+            block = member.read(block_size)
+        except zipfile.BadZipFile:
+            # the CRC-32 stored in the archive does not match the data, so the digests will not match either, which
+            # is reported as a mismatch instead of aborting the verification
+            return
+        if not block:
+            return
+        yield block
+
+
+# tar archives are read as streams, so that compressed ones are decompressed only once, from start to end
+
+def _list_tar_members(file_name):
+    with _open_tar(file_name) as archive:
+        files = {}
+        data = {}
+        for member in archive:
+            path = _member_path(member.name)
+            if member.isreg():
+                data[member.name] = (member.size, member.offset)
+                files[path] = data[member.name]
+            elif member.islnk() and member.linkname in data:
+                # the data of a hard link is the one of the earlier member it links to
+                files[path] = data[member.linkname]
+            else:
+                files.pop(path, None)
+        # a name that appears more than once (e.g. after `tar --append`) is extracted from its last member, which
+        # replaces the earlier ones
+        return [(path, size, offset) for (path, (size, offset)) in files.items()]
+
+
+def _read_tar_members(file_name, jobs_by_location, block_size):
+    with _open_tar(file_name, stream=True) as archive:
+        for member in archive:
+            if member.isreg() and member.offset in jobs_by_location:
+                yield member.offset, _read_file_blocks(archive.extractfile(member), member.size, block_size)
+
+
+@contextlib.contextmanager
+def _open_tar(file_name, stream=False):
+    """Open a tar archive; as a stream, it is read strictly from start to end. Uncompressed archives that are not
+    opened as a stream are listed by seeking from header to header instead of reading the data of their members."""
+    with open(file_name, "rb") as file:
+        if file.read(4) == _ZSTANDARD_MAGIC:
+            if zstandard is None:
+                raise ValueError("reading Zstandard-compressed tar archives requires the zstandard package: " + file_name)
+            file.seek(0)
+            with zstandard.ZstdDecompressor().stream_reader(file) as reader, tarfile.open(fileobj=reader, mode="r|") as archive:
+                yield archive
+            return
+        file.seek(0)
+        with tarfile.open(fileobj=file, mode="r|*" if stream else "r:*") as archive:
+            yield archive
+
+
+def _member_path(name):
+    return posixpath.normpath(name.replace("\\", "/")).lstrip("/")
+
+
+_LISTERS = {"ISO": _list_iso_members, "ZIP": _list_zip_members, "tar": _list_tar_members}
+_READERS = {"ISO": _read_iso_members, "ZIP": _read_zip_members, "tar": _read_tar_members}
@@ -0,0 +1,259 @@
+"""Verifies many checksum files, each against its own directory, as a single batch.
+
+The files of all verifications of a batch are hashed on one shared pool of workers, which `iosched.FairScheduler`
+divides evenly between them, and all of them are written to one combined report."""
+import collections
+import fnmatch
+import os
+
+import archive
+import checksumfile
+import engine
+import hash
+import iosched
+from control import Cancelled, RunControl
+from journal import CheckpointJournal, default_journal_file
+from progress import ProgressTracker
+from verify import FileTiers, Verification, VerificationResult
+
+MANIFEST_PATTERNS = ("*.veepiaci", "*.md5", "*.sha1", "*.sha256", "*.sha512", "*.sfv", "*sums", "*sums.txt", "checksums.txt")
+"""The names of the files that `discover_jobs` considers to be checksum files, compared case-insensitively. A file with
+such a name is only used if it actually is a checksum file in one of `checksumfile.FORMATS`."""
+
+
+class BatchJob:
+    """A single verification of a batch: a checksum file and the directory (or archive) whose files it lists."""
+
+    def __init__(self, checksum_file_name, directory, algorithm=None, exclude=()):
+        self.checksum_file_name = checksum_file_name
+        self.directory = directory
+        self.algorithm = algorithm
+        """The algorithm of an md5sum/sha*sum checksum file, if it cannot be guessed from its name."""
+        self.exclude = exclude
+        """Glob patterns of files and directories that are ignored, e.g. the checksum file itself."""
+
+    def __repr__(self):
+        return "BatchJob(%r, %r)" % (self.checksum_file_name, self.directory)
+
+
+def discover_jobs(root, patterns=MANIFEST_PATTERNS):
+    """Find the checksum files below the given directory and return a `BatchJob` for each of them, which verifies the
+    directory the checksum file is in. The files below a directory containing a checksum file belong to that checksum
+    file, so its subdirectories are not searched for further checksum files. Jobs are returned in the order of their
+    paths."""
+    jobs = []
+    for (directory, subdirectories, files) in os.walk(root):
+        subdirectories.sort()
+        checksum_file_names = [name for name in sorted(files) if _is_checksum_file(directory, name, patterns)]
+        if checksum_file_names:
+            subdirectories.clear()
+            jobs.extend(BatchJob(os.path.join(directory, name), directory, exclude=tuple(checksum_file_names)) for name in checksum_file_names)
+    return jobs
+
+
+def common_root(jobs):
+    """Return the deepest directory containing the directories (or archives) of all given jobs."""
+    return os.path.commonpath([os.path.abspath(job.directory) for job in jobs]) if jobs else ""
+
+
+def _is_checksum_file(directory, name, patterns):
+    if not any(fnmatch.fnmatchcase(name.lower(), pattern) for pattern in patterns):
+        return False
+    try:
+        with open(os.path.join(directory, name), "rb") as file:
+            checksumfile.detect_format(file.read(checksumfile.DETECTION_SIZE))
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def verify_batch(jobs, on_job_started=None, on_file_hashed=None, on_job_finished=None, on_progress=None, workers=None, hash_cache=None, trust_cache=True, report=None,
+                 resume=False, control=None, backend="threads", root=None):
+    """Verify all given `BatchJob` objects and return a `BatchResult`.
+
+    The checksum files are read and their directories scanned one after the other; then the files of all jobs are
+    hashed by `workers` threads (or processes, depending on `backend`) in turns, so that every job makes progress at
+    the same rate, and at most as many files are read from a device at once as for a single verification. Jobs
+    verifying an archive are hashed afterwards, one archive at a time. Every job finishes as soon as its last file has
+    been checked: `on_job_started(job)` is called before its directory is scanned, `on_file_hashed(job, file, hashes,
+    correct)` for every file, and `on_job_finished(job, verification_result)` at the end. `on_progress` is called with a
+    `VerificationProgress` of the whole batch.
+
+    If a `ReportWriter` is given, the files of all jobs are written to it, with paths relative to `root` (by default
+    the deepest directory containing all jobs), followed by a summary of the whole batch. With `resume`, every job
+    keeps a `CheckpointJournal`, as with `verify.verify_checksums`. A job whose checksum file cannot be read is left
+    out and listed in `BatchResult.errors`. Cancelling the given `RunControl` stops the whole batch."""
+    jobs = list(jobs)
+    control = control if control is not None else RunControl()
+    root = root if root is not None else common_root(jobs)
+    progress = ProgressTracker()
+    runs = []
+    errors = {}
+    complete = True
+
+    def start_phase(phase):
+        progress.start_phase(phase)
+        if on_progress:
+            on_progress(progress.snapshot())
+
+    try:
+        start_phase("scan")
+        for job in jobs:
+            control.checkpoint()
+            if on_job_started:
+                on_job_started(job)
+            try:
+                run = _BatchRun(job, _label(job, root), progress, on_file_hashed, on_progress, hash_cache, trust_cache, report, resume, control)
+                run.prepare(workers)
+            except (OSError, ValueError) as error:
+                errors[job] = str(error)
+                continue
+            runs.append(run)
+            if not run.hash_jobs:
+                run.finish(True, on_job_finished)
+        progress.set_totals(sum(run.verification.progress.total_files for run in runs), sum(run.verification.progress.total_bytes for run in runs))
+        start_phase("hash")
+        pool_runs = [run for run in runs if run.hash_jobs and run.verification.archive_format is None]
+        owners = {id(hash_job): run for run in pool_runs for hash_job in run.hash_jobs}
+        active = collections.Counter()
+        scheduler = iosched.FairScheduler([iosched.IoScheduler(run.hash_jobs, active=active) for run in pool_runs])
+        on_error = (lambda hash_job, error: owners.pop(id(hash_job)).file_failed(hash_job, error, on_job_finished))
+        for (hash_job, file_hash) in engine.hash_files(scheduler, workers, control, backend, on_error):
+            run = owners.pop(id(hash_job))
+            run.file_hashed(hash_job, file_hash, on_job_finished)
+        for run in runs:
+            if run.hash_jobs and run.verification.archive_format is not None:
+                for (hash_job, file_hash) in archive.hash_members(run.job.directory, run.hash_jobs, run.verification.existing_files, control):
+                    run.file_hashed(hash_job, file_hash, on_job_finished)
+    except Cancelled:
+        complete = False
+    except BaseException:
+        for run in runs:
+            run.close()
+        raise
+    start_phase("report")
+    for run in runs:
+        if run.result is None:
+            run.finish(False, on_job_finished)
+    progress.start_phase(None)
+    results = {run.job: run.result for run in runs}
+    combined_result = _combine(runs, progress.snapshot(), complete and not errors)
+    if report is not None:
+        report.write_summary(combined_result)
+    batch_result = BatchResult(results, errors, combined_result)
+    if on_progress:
+        on_progress(combined_result.statistics)
+    return batch_result
+
+
+def _label(job, root):
+    label = os.path.relpath(os.path.abspath(job.directory), os.path.abspath(root)).replace(os.sep, "/")
+    return "" if label == "." else label
+
+
+class _BatchRun:
+    """The verification of a single job of a batch."""
+
+    def __init__(self, job, label, progress, on_file_hashed, on_progress, hash_cache, trust_cache, report, resume, control):
+        self.job = job
+        self.label = label
+        """The path of the directory of the job relative to the root of the batch (empty for the root itself), which
+        prefixes its files in the combined report and result."""
+        self.progress = progress
+        self.on_progress = on_progress
+        checksum_file = checksumfile.read_checksum_file(job.checksum_file_name, job.algorithm)
+        self.journal = CheckpointJournal(default_journal_file(job.checksum_file_name, job.directory), job.checksum_file_name, job.directory) if resume else None
+        file_callback = (lambda file, hashes, correct: self.file_checked(file, hashes, correct, on_file_hashed))
+        self.verification = Verification(checksum_file, job.directory, file_callback, None, hash_cache, trust_cache, _PrefixedReport(report, label) if report else None,
+                                         self.journal, control)
+        self.hash_jobs = []
+        self.remaining = 0
+        self.result = None
+
+    def prepare(self, workers):
+        try:
+            self.hash_jobs = self.verification.prepare(workers, self.job.exclude)
+        except BaseException:
+            self.close()
+            raise
+        self.remaining = len(self.hash_jobs)
+
+    def close(self):
+        """Close the journal, if any, without finishing the run, so that it can be resumed."""
+        if self.journal is not None:
+            self.journal.close()
+
+    def file_checked(self, file, hashes, correct, on_file_hashed):
+        self.progress.file_processed(self.verification.existing_files[file].st_size)
+        if on_file_hashed:
+            on_file_hashed(self.job, file, hashes, correct)
+        if self.on_progress:
+            self.on_progress(self.progress.snapshot())
+
+    def file_hashed(self, hash_job, file_hash, on_job_finished):
+        self.verification.file_hashed(hash_job, file_hash)
+        self.file_done(on_job_finished)
+
+    def file_failed(self, hash_job, error, on_job_finished):
+        self.verification.file_failed(hash_job, error)
+        self.file_done(on_job_finished)
+
+    def file_done(self, on_job_finished):
+        self.remaining -= 1
+        if not self.remaining:
+            self.finish(True, on_job_finished)
+
+    def finish(self, complete, on_job_finished):
+        self.result = self.verification.finish(complete)
+        if self.journal is not None:
+            self.journal.close()
+        if on_job_finished:
+            on_job_finished(self.job, self.result)
+
+
+class _PrefixedReport:
+    """Writes the files of one job of a batch to the combined report, with the label of the job in front of their
+    paths; the summary is only written once, for the whole batch."""
+
+    def __init__(self, report, label):
+        self.report = report
+        self.prefix = label + "/" if label else ""
+
+    def write_file(self, path, status, hashes=None, tier=None, timings=None, error=None):
+        self.report.write_file(self.prefix + path, status, hashes, tier, timings, error)
+
+    def write_summary(self, verification_result):
+        pass
+
+
+def _combine(runs, statistics, complete):
+    def prefixed(run, files):
+        prefix = run.label + "/" if run.label else ""
+        return [prefix + file for file in files]
+
+    return VerificationResult([file for run in runs for file in prefixed(run, run.result.mismatches)], [file for run in runs for file in prefixed(run, run.result.missing_files)],
+                              [file for run in runs for file in prefixed(run, run.result.additional_files)], sum(run.result.cache_hits for run in runs), statistics,
+                              timings=hash.HashTimings(sum(run.result.timings.read_seconds for run in runs), sum(run.result.timings.hash_seconds for run in runs)),
+                              resumed_files=sum(run.result.resumed_files for run in runs), complete=complete,
+                              tiers=dict(sum((collections.Counter(run.result.tiers) for run in runs), collections.Counter())), file_tiers=_combine_tiers(runs, prefixed))
+
+
+def _combine_tiers(runs, prefixed):
+    file_tiers = FileTiers(sorted(file for run in runs for file in prefixed(run, run.result.file_tiers.files)))
+    for run in runs:
+        for (file, tier) in zip(prefixed(run, run.result.file_tiers), run.result.file_tiers.values()):
+            file_tiers[file] = tier
+    return file_tiers
+
+
+class BatchResult:
+    def __init__(self, results, errors, combined_result):
+        self.results = results
+        """The `VerificationResult` of every job whose checksum file could be read, by `BatchJob`, in the order of the
+        jobs."""
+        self.errors = errors
+        """The error message for every job whose checksum file could not be read, by `BatchJob`."""
+        self.combined_result = combined_result
+        """A `VerificationResult` of all jobs together, whose paths are relative to the root of the batch. It is only
+        complete if the batch has not been cancelled and all checksum files could be read."""
+        self.success = combined_result.success
@@ -0,0 +1,55 @@
+"""Compare the read strategies and block sizes of `blockio` when hashing files of different sizes.
+
+Run from the repository root with `python -m benchmarks.bench_io`. Note that the page cache will usually contain the
+test files after they have been written, so this measures the cost of the read path, not of the disk."""
+import argparse
+import os
+import tempfile
+import time
+
+import blockio
+import hash
+
+FILE_SIZES = (4 * 1024, 1024 * 1024, 64 * 1024 * 1024, 512 * 1024 * 1024)
+BLOCK_SIZES = (4 * 1024, 64 * 1024, blockio.DEFAULT_BLOCK_SIZE, 8 * 1024 * 1024)
+
+
+def create_test_file(directory, size):
+    file_name = os.path.join(directory, "bench-%d.dat" % size)
+    chunk = os.urandom(min(size, 1024 * 1024))
+    with open(file_name, "wb") as file:
+        remaining = size
+        while remaining > 0:
+            file.write(chunk[:remaining])
+            remaining -= len(chunk)
+    return file_name
+
+
+def measure(file_name, file_size, block_size, strategy, algorithms):
+    repetitions = max(1, (256 * 1024 * 1024) // max(file_size, 1))
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        hash.create_hash(file_name, algorithms, block_size, strategy)
+    elapsed = time.perf_counter() - start
+    return repetitions * file_size / elapsed / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--algorithms", default="md5", help="comma-separated hash algorithms (default: md5)")
+    parser.add_argument("--max-size", type=int, default=FILE_SIZES[-1], help="the largest file size to test, in bytes")
+    arguments = parser.parse_args()
+    algorithms = tuple(arguments.algorithms.split(","))
+    with tempfile.TemporaryDirectory() as temp_directory:
+        print("%12s %10s %10s %10s" % ("file size", "block size", "strategy", "MB/s"))
+        for file_size in filter(lambda size: size <= arguments.max_size, FILE_SIZES):
+            file_name = create_test_file(temp_directory, file_size)
+            for block_size in BLOCK_SIZES:
+                for strategy in ("buffered", "mmap"):
+                    throughput = measure(file_name, file_size, block_size, strategy, algorithms)
+                    print("%12d %10d %10s %10.1f" % (file_size, block_size, strategy, throughput))
+            os.remove(file_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Measure the cost of adding a hashed file to the progress log of `VerifyRunWindow` as the log grows.
+
+Run from the repository root with `python -m benchmarks.bench_log_view`; it uses Qt’s offscreen platform, so no
+display is needed. Files are delivered through an `EventCoalescer`, as they are by `VerificationWorker`. For a log
+that stays responsive, the cost per file must stay flat as the number of files grows."""
+import argparse
+import os
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6 import QtWidgets
+
+from events import EventCoalescer
+from verify_window import VerifyRunWindow
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200_000, help="the number of hashed files to add to the log")
+    parser.add_argument("--step", type=int, default=20_000, help="the number of files per measurement")
+    parser.add_argument("--events-every", type=int, default=100, help="process Qt events after this many files, like a busy event loop would")
+    arguments = parser.parse_args()
+    application = QtWidgets.QApplication([])
+    window = VerifyRunWindow(None)
+    window.resize(800, 450)
+    window.show()
+    window.on_started("/benchmark")
+    coalescer = EventCoalescer(window.on_files_hashed, interval=60)
+    print("%12s %16s" % ("files", "µs per file"))
+    for first_file in range(0, arguments.files, arguments.step):
+        start = time.perf_counter()
+        for file in range(first_file, first_file + arguments.step):
+            coalescer.on_file_hashed("directory-%d/file-%d.dat" % (file % 100, file), {}, file % 1000 != 0)
+            if file % arguments.events_every == 0:
+                application.processEvents()
+        coalescer.flush()
+        application.processEvents()
+        elapsed = time.perf_counter() - start
+        print("%12d %16.1f" % (first_file + arguments.step, elapsed / arguments.step * 1000000))
+
+
+if __name__ == "__main__":
+    main()
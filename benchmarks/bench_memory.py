@@ -0,0 +1,65 @@
+"""Compare the memory needed to hold the checksums of a large checksum file as plain dictionaries and as
+`CompactChecksums`.
+
+Run from the repository root with `python -m benchmarks.bench_memory`."""
+import argparse
+import gc
+import hashlib
+import time
+import tracemalloc
+
+from checksumfile import CompactChecksums
+
+
+def generate_entries(count):
+    for index in range(count):
+        path = "archive/directory-%d/subdirectory-%d/file-%d.dat" % (index % 1000, index % 7, index)
+        yield path, {"md5": hashlib.md5(path.encode()).hexdigest(), "sha256": hashlib.sha256(path.encode()).hexdigest()}
+
+
+def build_dictionaries(count):
+    file_checksums = {}
+    for (path, checksums) in generate_entries(count):
+        file_checksums[path] = checksums
+    return file_checksums
+
+
+def build_compact_checksums(count):
+    file_checksums = CompactChecksums()
+    for (path, checksums) in generate_entries(count):
+        file_checksums.add(path, checksums)
+    return file_checksums
+
+
+def measure(build, count):
+    """Build the checksums twice, once to measure the memory they use and once to time building them, as tracing
+    memory allocations slows building down considerably."""
+    gc.collect()
+    tracemalloc.start()
+    file_checksums = build(count)
+    (memory, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del file_checksums
+    gc.collect()
+    start = time.perf_counter()
+    file_checksums = build(count)
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    for path in generate_entries(count):
+        file_checksums[path[0]]["md5"]
+    lookup_time = time.perf_counter() - start
+    return memory, elapsed, lookup_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1_000_000, help="the number of files in the checksum file")
+    arguments = parser.parse_args()
+    print("%20s %12s %14s %10s %10s" % ("representation", "memory MB", "bytes/entry", "build s", "lookup s"))
+    for (name, build) in (("dictionaries", build_dictionaries), ("CompactChecksums", build_compact_checksums)):
+        (memory, elapsed, lookup_time) = measure(build, arguments.entries)
+        print("%20s %12.1f %14.1f %10.2f %10.2f" % (name, memory / (1024 * 1024), memory / arguments.entries, elapsed, lookup_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Measure how fast checksum files of the supported formats are parsed, and how much memory parsing needs.
+
+Run from the repository root with `python -m benchmarks.bench_parse`. For every format a checksum file with the given
+number of entries is generated; it is then iterated with `ChecksumFileReader` (streaming) and loaded completely with
+`read_checksum_file`."""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+import tracemalloc
+
+import checksumfile
+
+
+def write_checksum_file(directory, file_format, entries):
+    file_name = os.path.join(directory, "checksums-%s.txt" % file_format)
+    with open(file_name, "w", encoding="windows-1252" if file_format == "UltraISO" else "utf-8", newline="\n" if file_format != "UltraISO" else "\r\n") as file:
+        if file_format == "UltraISO":
+            file.write("# MD5 checksums generated by UltraISO (http://www.ezbsystems.com)\n# Generated 2024-11-05 14:50:13\n\n")
+        elif file_format == "SFV":
+            file.write("; Generated by bench_parse\n")
+        elif file_format == "Veepiaci":
+            file.write("# Veepiaci checksum file\n# fields: md5 sha256\n")
+        for index in range(entries):
+            path = "directory-%d/file-%d.dat" % (index % 1000, index)
+            md5 = hashlib.md5(path.encode()).hexdigest()
+            if file_format == "UltraISO":
+                file.write("%s *%s\n" % (md5, path.replace("/", "\\")))
+            elif file_format == "GNU":
+                file.write("%s  %s\n" % (md5, path))
+            elif file_format == "BSD":
+                file.write("MD5 (%s) = %s\n" % (path, md5))
+            elif file_format == "SFV":
+                file.write("%s %s\n" % (path, md5[:8]))
+            else:
+                file.write("%s %s%s %s\n" % (md5, md5, md5, path))
+    return file_name
+
+
+def measure(function):
+    """Run the given function twice, once to time it and once to measure its peak memory usage, as tracing memory
+    allocations slows it down considerably."""
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    del result
+    tracemalloc.start()
+    result = function()
+    (_, peak_memory) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak_memory
+
+
+def count_entries(file_name):
+    with checksumfile.ChecksumFileReader(file_name) as reader:
+        return sum(1 for _ in reader)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1_000_000, help="the number of entries per checksum file")
+    arguments = parser.parse_args()
+    with tempfile.TemporaryDirectory() as temp_directory:
+        print("%10s %10s %12s %12s %14s" % ("format", "mode", "MB", "entries/s", "peak memory MB"))
+        for file_format in checksumfile.FORMATS:
+            file_name = write_checksum_file(temp_directory, file_format, arguments.entries)
+            file_size = os.path.getsize(file_name) / (1024 * 1024)
+            (count, elapsed, peak_memory) = measure(lambda: count_entries(file_name))
+            print("%10s %10s %12.1f %12.0f %14.1f" % (file_format, "streaming", file_size, count / elapsed, peak_memory / (1024 * 1024)))
+            (checksum_file, elapsed, peak_memory) = measure(lambda: checksumfile.read_checksum_file(file_name))
+            print("%10s %10s %12.1f %12.0f %14.1f" % (file_format, "complete", file_size, len(checksum_file.file_checksums) / elapsed, peak_memory / (1024 * 1024)))
+            os.remove(file_name)
+
+
+if __name__ == "__main__":
+    main()
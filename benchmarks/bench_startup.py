@@ -0,0 +1,56 @@
+"""Measure how long the command line interface takes to start, and check that it does not import Qt.
+
+Run from the repository root with `python -m benchmarks.bench_startup`. Every measurement starts a new interpreter that
+runs `python -m veepiaci verify --help`, so it includes the interpreter’s own startup; the time of a bare interpreter
+is shown for comparison. The modules that take longest to import are listed from `-X importtime`."""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+COMMAND = [sys.executable, "-m", "veepiaci", "verify", "--help"]
+BASELINE = [sys.executable, "-c", "pass"]
+QT_CHECK = "import sys, veepiaci, cli; sys.exit(any(name.split('.')[0] == 'PySide6' for name in sys.modules))"
+
+
+def time_command(command, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def slowest_imports(count):
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import veepiaci, cli"], stderr=subprocess.PIPE, text=True, check=True).stderr
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        (_, cumulative, name) = line[len("import time:"):].split("|")
+        imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=20, help="the number of times every command is started")
+    parser.add_argument("--imports", type=int, default=10, help="the number of slowest imports to list")
+    arguments = parser.parse_args()
+    if subprocess.run([sys.executable, "-c", QT_CHECK]).returncode != 0:
+        print("error: the command line interface imports PySide6")
+        sys.exit(1)
+    print("%24s %12s %12s" % ("command", "median ms", "min ms"))
+    for (name, command) in (("python -c pass", BASELINE), ("veepiaci verify --help", COMMAND)):
+        times = time_command(command, arguments.runs)
+        print("%24s %12.1f %12.1f" % (name, statistics.median(times) * 1000, min(times) * 1000))
+    print()
+    print("%12s  %s" % ("cumulative µs", "module"))
+    for (cumulative, name) in slowest_imports(arguments.imports):
+        print("%12d  %s" % (cumulative, name))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Measure the performance of hashing, scanning, parsing, and verification on synthetic data, and compare it with a
+stored baseline.
+
+Run from the repository root with `python -m benchmarks.suite`. The data for the chosen `--scale` is generated from
+`--seed` (see `benchmarks.synthetic`): trees of many tiny files, a few huge files, a deeply nested tree, a tree with
+Unicode names in NFD, and checksum files with 10 thousand, 1 million, and (at the large scale) 10 million entries.
+The data is generated and every case runs in a fresh interpreter, so that the peak RSS of a case is its own. The
+results are printed and can be written as JSON with `--output`; given a `--baseline` from an earlier run, every
+metric that got worse by more than `--tolerance` is reported as a regression, and the exit code is 1.
+
+The page cache will usually contain the generated files, so hashing is measured with a warm cache."""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import checksumfile
+import create
+import hash
+import verify
+from benchmarks import synthetic
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+SCALES = {
+    "small": {"manifests": (10_000,), "tiny": 2_000, "huge": (2, 64 * 1024 * 1024), "depth": 32, "unicode": 500},
+    "medium": {"manifests": (10_000, 1_000_000), "tiny": 20_000, "huge": (2, 512 * 1024 * 1024), "depth": 64, "unicode": 5_000},
+    "large": {"manifests": (10_000, 1_000_000, 10_000_000), "tiny": 200_000, "huge": (4, 2 * 1024 * 1024 * 1024), "depth": 128, "unicode": 20_000},
+}
+"""The amount of data generated for every scale."""
+
+TREES = ("tiny", "huge", "deep", "unicode")
+
+DEFAULT_ALGORITHMS = ("sha3_256", "blake2b")
+"""The algorithms used unless `--algorithms` says otherwise; these do not depend on optional packages, so results are
+comparable between machines."""
+
+
+def prepare(data_directory, scale, seed, algorithms):
+    """Generate the trees and checksum files of the given scale, and a checksum file for every tree."""
+    settings = SCALES[scale]
+    generators = {
+        "tiny": lambda directory: synthetic.create_tiny_files(directory, settings["tiny"], seed),
+        "huge": lambda directory: synthetic.create_huge_files(directory, settings["huge"][0], settings["huge"][1], seed),
+        "deep": lambda directory: synthetic.create_deep_tree(directory, settings["depth"], seed=seed),
+        "unicode": lambda directory: synthetic.create_unicode_files(directory, settings["unicode"], seed),
+    }
+    for tree in TREES:
+        directory = os.path.join(data_directory, tree)
+        generators[tree](directory)
+        create.create_checksums(directory, algorithms, os.path.join(data_directory, tree + ".veepiaci"))
+    for entries in settings["manifests"]:
+        synthetic.write_manifest(os.path.join(data_directory, "manifest-%d.veepiaci" % entries), entries)
+
+
+def cases(scale):
+    """Return the names of the cases run for the given scale."""
+    return (["hash-huge"] + ["scan-" + tree for tree in TREES] + ["parse-%d" % entries for entries in SCALES[scale]["manifests"]]
+            + ["create-tiny"] + ["verify-" + tree for tree in TREES])
+
+
+def run_case(case, data_directory, algorithms):
+    """Run a single case and return its metrics."""
+    (kind, argument) = case.split("-", 1)
+    start = time.perf_counter()
+    if kind == "hash":
+        directory = os.path.join(data_directory, argument)
+        file_names = [os.path.join(root, name) for (root, _, names) in os.walk(directory) for name in names]
+        start = time.perf_counter()
+        for file_name in file_names:
+            hash.create_hash(file_name, algorithms)
+        return throughput(start, len(file_names), sum(os.path.getsize(file_name) for file_name in file_names))
+    if kind == "scan":
+        files = verify.collect_files(os.path.join(data_directory, argument))
+        return throughput(start, len(files))
+    if kind == "parse":
+        file_name = os.path.join(data_directory, "manifest-%s.veepiaci" % argument)
+        checksums = checksumfile.read_checksum_file(file_name)
+        return throughput(start, len(checksums.file_checksums), os.path.getsize(file_name))
+    if kind == "create":
+        with tempfile.TemporaryDirectory() as temp_directory:
+            result = create.create_checksums(os.path.join(data_directory, argument), algorithms, os.path.join(temp_directory, "checksums.veepiaci"))
+        return dict(throughput(start, result.files, result.statistics.processed_bytes), phase_seconds=result.statistics.phase_seconds)
+    if kind == "verify":
+        checksum_file = checksumfile.read_checksum_file(os.path.join(data_directory, argument + ".veepiaci"))
+        result = verify.verify_checksums(checksum_file, os.path.join(data_directory, argument))
+        if not result.success:
+            raise RuntimeError("verification of the %s tree failed" % argument)
+        return dict(throughput(start, result.statistics.processed_files, result.statistics.processed_bytes), phase_seconds=result.statistics.phase_seconds)
+    raise ValueError("unknown case: " + case)
+
+
+def throughput(start, files, size=None):
+    seconds = time.perf_counter() - start
+    metrics = {"seconds": seconds, "files_per_second": files / seconds if seconds > 0 else 0.0}
+    if size is not None:
+        metrics["megabytes_per_second"] = size / (1024 * 1024) / seconds if seconds > 0 else 0.0
+    return metrics
+
+
+def peak_rss_megabytes():
+    """Return the peak RSS of this process. On Linux, this is `VmHWM`, which starts from zero with every `exec`; the
+    `ru_maxrss` of `getrusage` keeps the peak of the parent process across `fork` and `exec`, so it is only used
+    elsewhere, where the parent therefore generates the data in a process of its own."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
+
+
+def run_case_in_subprocess(case, data_directory, algorithms):
+    output = subprocess.run([sys.executable, "-m", "benchmarks.suite", "--run-case", case, "--data", data_directory, "--algorithms", ",".join(algorithms)],
+                            stdout=subprocess.PIPE, check=True, text=True).stdout
+    return json.loads(output)
+
+
+def flatten(metrics, prefix=""):
+    for (name, value) in metrics.items():
+        if isinstance(value, dict):
+            yield from flatten(value, prefix + name + ".")
+        elif value is not None:
+            yield prefix + name, value
+
+
+def higher_is_better(metric):
+    return metric.endswith("_per_second")
+
+
+def compare(results, baseline, tolerance):
+    """Print the change of every metric against the baseline, and return the number of regressions."""
+    regressions = 0
+    print()
+    print("%-16s %-28s %14s %14s %9s" % ("case", "metric", "baseline", "current", "change"))
+    for (case, metrics) in results["cases"].items():
+        baseline_metrics = dict(flatten(baseline["cases"].get(case, {})))
+        for (metric, value) in flatten(metrics):
+            if metric not in baseline_metrics or not baseline_metrics[metric]:
+                continue
+            change = value / baseline_metrics[metric] - 1
+            worse = -change if higher_is_better(metric) else change
+            regression = worse > tolerance
+            regressions += regression
+            print("%-16s %-28s %14.3f %14.3f %+8.1f%%%s" % (case, metric, baseline_metrics[metric], value, change * 100, "  REGRESSION" if regression else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="medium", help="the amount of data to generate (default: medium)")
+    parser.add_argument("--seed", type=int, default=0, help="the seed for generating the data")
+    parser.add_argument("--algorithms", default=",".join(DEFAULT_ALGORITHMS), help="comma-separated hash algorithms (default: %(default)s)")
+    parser.add_argument("--cases", help="comma-separated cases to run (default: all of the scale)")
+    parser.add_argument("--data", help="a directory for the generated data, which is reused if it exists (default: a temporary directory)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results with this JSON file from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="the relative change of a metric that counts as a regression (default: 0.1)")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+    algorithms = tuple(arguments.algorithms.split(","))
+
+    if arguments.prepare:
+        prepare(arguments.data, arguments.scale, arguments.seed, algorithms)
+        return
+
+    if arguments.run_case:
+        metrics = run_case(arguments.run_case, arguments.data, algorithms)
+        metrics["peak_rss_megabytes"] = peak_rss_megabytes()
+        json.dump(metrics, sys.stdout)
+        return
+
+    with tempfile.TemporaryDirectory() as temp_directory:
+        data_directory = arguments.data if arguments.data else temp_directory
+        marker = os.path.join(data_directory, "prepared-%s-%d-%s" % (arguments.scale, arguments.seed, "-".join(algorithms)))
+        if not os.path.exists(marker):
+            print("Generating %s data in %s…" % (arguments.scale, data_directory), file=sys.stderr)
+            os.makedirs(data_directory, exist_ok=True)
+            subprocess.run([sys.executable, "-m", "benchmarks.suite", "--prepare", "--data", data_directory, "--scale", arguments.scale, "--seed", str(arguments.seed),
+                            "--algorithms", ",".join(algorithms)], check=True)
+            open(marker, "w").close()
+        results = {
+            "scale": arguments.scale,
+            "seed": arguments.seed,
+            "algorithms": list(algorithms),
+            "machine": {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor(), "cpu_count": os.cpu_count()},
+            "cases": {},
+        }
+        print("%-16s %10s %14s %10s %14s" % ("case", "seconds", "files/s", "MB/s", "peak RSS MB"))
+        for case in (arguments.cases.split(",") if arguments.cases else cases(arguments.scale)):
+            metrics = run_case_in_subprocess(case, data_directory, algorithms)
+            results["cases"][case] = metrics
+            print("%-16s %10.3f %14.0f %10s %14s" % (case, metrics["seconds"], metrics["files_per_second"],
+                                                     "%.1f" % metrics["megabytes_per_second"] if "megabytes_per_second" in metrics else "-",
+                                                     "%.1f" % metrics["peak_rss_megabytes"] if metrics["peak_rss_megabytes"] is not None else "-"))
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    if arguments.baseline:
+        with open(arguments.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if compare(results, baseline, arguments.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
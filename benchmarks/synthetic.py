@@ -0,0 +1,76 @@
+"""Generate synthetic directory trees and checksum files for the benchmarks.
+
+Everything is generated from a seed, so that the same seed always produces the same trees and checksum files."""
+import hashlib
+import os
+import random
+import unicodedata
+
+UNICODE_NAMES = ("Übersicht", "façade", "naïve résumé", "Ærø", "Ἀθῆναι", "東京", "서울", "Москва", "😀 smile", "ﬁle")
+"""Name parts used for trees with Unicode names; the names are written to disk in NFD."""
+
+
+def create_tiny_files(directory, count, seed=0, max_size=4096, files_per_directory=100):
+    """Create `count` files of up to `max_size` bytes, spread over directories of `files_per_directory` files."""
+    generator = random.Random(seed)
+    files = []
+    for index in range(count):
+        path = "tiny-%d/file-%d.dat" % (index // files_per_directory, index)
+        files.append((path, write_file(directory, path, generator.randrange(max_size + 1), generator)))
+    return files
+
+
+def create_huge_files(directory, count, size, seed=0):
+    """Create `count` files of `size` bytes each."""
+    generator = random.Random(seed)
+    return [("huge/file-%d.dat" % index, write_file(directory, "huge/file-%d.dat" % index, size, generator)) for index in range(count)]
+
+
+def create_deep_tree(directory, depth, width=2, seed=0):
+    """Create a tree `depth` directories deep in which every directory has `width` subdirectories until a total of
+    a thousand directories is reached, with one small file in every directory."""
+    generator = random.Random(seed)
+    files = []
+    pending = [("deep", 0)]
+    while pending and len(files) < 1000:
+        (path, level) = pending.pop()
+        file_path = path + "/file-%d.dat" % len(files)
+        files.append((file_path, write_file(directory, file_path, generator.randrange(1024), generator)))
+        if level < depth:
+            pending.extend((path + "/level-%d-%d" % (level + 1, child), level + 1) for child in range(width))
+    return files
+
+
+def create_unicode_files(directory, count, seed=0):
+    """Create `count` small files whose names contain accents, ligatures, other scripts and emoji, written in NFD as
+    macOS does, so that the normalization of names is exercised."""
+    generator = random.Random(seed)
+    files = []
+    for index in range(count):
+        path = "unicode/%s/%s %d.dat" % (UNICODE_NAMES[index % len(UNICODE_NAMES)], generator.choice(UNICODE_NAMES), index)
+        files.append((unicodedata.normalize("NFC", path), write_file(directory, unicodedata.normalize("NFD", path), generator.randrange(1024), generator)))
+    return files
+
+
+def write_file(directory, path, size, generator):
+    file_name = os.path.join(directory, *path.split("/"))
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    block = generator.randbytes(min(size, 1024 * 1024))
+    with open(file_name, "wb") as file:
+        remaining = size
+        while remaining > 0:
+            file.write(block[:remaining])
+            remaining -= len(block)
+    return size
+
+
+def write_manifest(file_name, entries, algorithms=("md5", "sha256")):
+    """Write a checksum file in veepiaci’s format with `entries` entries for files that do not exist. The digests are
+    derived from the paths, so that they are deterministic but look random."""
+    digest_lengths = [hashlib.new(algorithm).digest_size * 2 for algorithm in algorithms]
+    with open(file_name, "w", encoding="utf-8", newline="\n", buffering=1024 * 1024) as file:
+        file.write("# Veepiaci checksum file\n# fields: " + " ".join(algorithms) + "\n")
+        for index in range(entries):
+            path = "archive/directory-%d/subdirectory-%d/file-%d.dat" % (index % 1000, index % 7, index)
+            seed = hashlib.sha512(path.encode()).hexdigest()
+            file.write(" ".join((seed * 2)[:length] for length in digest_lengths) + " " + path + "\n")
@@ -0,0 +1,96 @@
+import mmap
+import os
+import random
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+"""The number of bytes read from a file at once, unless told otherwise."""
+
+STRATEGIES = ("auto", "buffered", "mmap")
+"""The names of the strategies `read_blocks` can use to read a file."""
+
+SAMPLE_BLOCK_SIZE = 64 * 1024
+"""The number of bytes of every block of the sample `read_sample_blocks` takes of a file."""
+
+SAMPLE_RANDOM_BLOCKS = 4
+"""The number of blocks `read_sample_blocks` takes from random places of a file, in addition to its head and tail."""
+
+
+def read_blocks(file_name, block_size=DEFAULT_BLOCK_SIZE, strategy="auto"):
+    """Read the given file sequentially, yielding its content as a series of blocks.
+
+    The blocks are `memoryview` objects that are only valid until the next block is requested; they are never copied.
+    The “buffered” strategy reads the file into a single reused buffer, and the “mmap” strategy maps the file into
+    memory. The “auto” strategy reads buffered: if a mapped file is truncated, or the disk or network share it is on
+    goes away, the process is killed by SIGBUS instead of getting an `OSError`, so memory mapping is only used when
+    asked for explicitly."""
+    if strategy not in STRATEGIES:
+        raise ValueError("unknown read strategy: " + strategy)
+    with open(file_name, "rb", buffering=0) as file:
+        advise_sequential_access(file.fileno())
+        file_size = os.fstat(file.fileno()).st_size
+        if file_size > 0 and strategy == "mmap":
+            yield from _read_mapped_blocks(file, block_size)
+        else:
+            # small files do not need a buffer of the full block size; one byte more than the file size lets the
+            # end of the file be detected with a single additional read, even if the file has grown meanwhile.
+            yield from _read_buffered_blocks(file, min(block_size, file_size + 1))
+
+
+def read_sample_blocks(file_name, block_size=SAMPLE_BLOCK_SIZE, random_blocks=SAMPLE_RANDOM_BLOCKS):
+    """Read a sample of the given file: its first and last block and `random_blocks` blocks in between, in the order of
+    their offsets. The offsets only depend on the size of the file, so every file of the same size is sampled at the
+    same places. A file that is not larger than the sample is read completely.
+
+    The first block yielded is the size of the file as 8 bytes, so that samples of files of different sizes differ."""
+    with open(file_name, "rb", buffering=0) as file:
+        file_size = os.fstat(file.fileno()).st_size
+        yield file_size.to_bytes(8, "little")
+        if file_size <= block_size * (random_blocks + 2):
+            yield from _read_buffered_blocks(file, min(block_size, file_size + 1))
+            return
+        generator = random.Random(file_size)
+        offsets = sorted(generator.randrange(block_size, file_size - 2 * block_size + 1) for _ in range(random_blocks))
+        for offset in [0] + offsets + [file_size - block_size]:
+            file.seek(offset)
+            yield file.read(block_size)
+
+
+def _read_buffered_blocks(file, block_size):
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    try:
+        while True:
+            read_bytes = file.readinto(view)
+            if not read_bytes:
+                break
+            with view[:read_bytes] as block:
+                yield block
+    finally:
+        view.release()
+
+
+def _read_mapped_blocks(file, block_size):
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        if hasattr(mapped_file, "madvise"):
+            mapped_file.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mapped_file)
+        try:
+            for offset in range(0, len(view), block_size):
+                with view[offset:offset + block_size] as block:
+                    yield block
+        finally:
+            view.release()
+
+
+def advise_sequential_access(file_descriptor):
+    """Tell the operating system that the file will be read once, from start to end.
+
+    This lets the kernel read ahead more aggressively and keeps the file from crowding other data out of the page
+    cache. It does nothing on systems without `posix_fadvise`."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(file_descriptor, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        os.posix_fadvise(file_descriptor, 0, 0, os.POSIX_FADV_NOREUSE)
+    except OSError:
+        pass
@@ -1,30 +1,529 @@
+import io
+import os
+import re
+from datetime import datetime
+from array import array
+from collections.abc import Mapping
+
+import scan
+
+FORMATS = ("UltraISO", "GNU", "BSD", "SFV", "Veepiaci")
+"""The formats of checksum files that can be read."""
+
+WRITABLE_FORMATS = ("Veepiaci", "UltraISO", "GNU")
+"""The formats of checksum files that can be written."""
+
+DETECTION_SIZE = 4096
+"""The number of bytes at the start of a checksum file that are used to detect its format."""
+
+SIZE_FIELD = "size"
+"""The field of Veepiaci checksum files that holds the size of every file in bytes, which is not a hash algorithm."""
+
+GNU_DIGEST_ALGORITHMS = {32: "md5", 40: "sha1", 56: "sha224", 64: "sha256", 96: "sha384", 128: "sha512"}
+"""The algorithms assumed for the lines of `md5sum`/`sha*sum` files by the length of their hexadecimal digests, when
+neither the caller nor the name of the file says otherwise."""
+
+_GNU_LINE = re.compile(r"\\?[0-9a-fA-F]{8,} [ *]")
+_BSD_LINE = re.compile(r"([A-Za-z0-9/-]+) ?\((.*)\) ?= ([0-9a-fA-F]+)")
+_SFV_LINE = re.compile(r".+ [0-9a-fA-F]{8}")
+_FULL_LENGTH_BLAKE2 = {"blake2b_512": "blake2b", "blake2s_256": "blake2s"}
+_ALGORITHM_IN_FILE_NAME = re.compile(r"(?:^|[^a-z0-9])(sha3[-_]\d+|sha\d+|md5|b2|blake2[bs]|b3|blake3)(?:sums?)?(?:$|[^a-z0-9])")
+
+
 class ChecksumFile:
     """Contains all checksums that have been created for a number of files."""
 
-    def __init__(self, type, file_checksums):
+    def __init__(self, type, file_checksums, file_sizes=None):
         """Create a new ChecksumFile of the given type, containing the given checksums."""
         self.type = type
         """The type of the checksum file (i.e. “UltraISO” for files created by UltraISO)."""
         self.file_checksums = file_checksums
-        """A dictionary of files and their checksums."""
+        """A mapping of files to their checksums, which in turn map algorithm names to hexadecimal digests. This is
+        either a plain dictionary or a `CompactChecksums` object."""
+        self.file_sizes = file_sizes if file_sizes is not None else {}
+        """A mapping of files to their sizes in bytes, for the files whose size is recorded in the checksum file (only
+        Veepiaci checksum files record sizes)."""
+
+
+class CompactChecksums(Mapping):
+    """A memory-efficient mapping from file paths to their checksums.
+
+    Paths are split into a directory, which is stored only once for all files in it, and a name, which is stored as
+    UTF-8 in a single shared buffer. Digests are stored as raw bytes in one contiguous buffer per algorithm. Paths are
+    found using an open-addressing hash table of entry indices. Looking up a path returns a `ChecksumEntry` view onto
+    the stored digests."""
+
+    def __init__(self, file_checksums=None):
+        self._directories = []
+        self._directory_indices = {}
+        self._entry_directories = array("I")
+        self._names = bytearray()
+        self._name_offsets = array("Q", [0])
+        self._path_hashes = array("q")
+        self._sizes = array("q")
+        self._table = array("q", [-1]) * 8
+        self._columns = {}
+        if file_checksums:
+            for (path, checksums) in file_checksums.items():
+                self.add(path, checksums)
+
+    def add(self, path, checksums, size=None):
+        """Add the given checksums (a mapping from algorithm name to hexadecimal digest) for the given path, merging
+        them with checksums already stored for the path, and the size of the file, if it is known."""
+        (directory, name) = _split_path(path)
+        path_hash = hash(path)
+        encoded_name = name.encode("utf-8", "surrogateescape")
+        index = self._find_encoded(directory, encoded_name, path_hash)
+        if index < 0:
+            index = self._append(directory, encoded_name, path_hash)
+        for (algorithm, digest) in checksums.items():
+            column = self._columns.get(algorithm)
+            digest_bytes = bytes.fromhex(digest)
+            if column is None:
+                column = self._columns[algorithm] = _DigestColumn(len(digest_bytes))
+            column.set(index, digest_bytes)
+        if size is not None:
+            self._sizes[index] = size
+
+    @property
+    def sizes(self):
+        """A read-only mapping of the paths whose size has been added to their sizes in bytes."""
+        return _CompactSizes(self)
+
+    def __getitem__(self, path):
+        index = self._find(path)
+        if index < 0:
+            raise KeyError(path)
+        return ChecksumEntry(self, index)
+
+    def __contains__(self, path):
+        return self._find(path) >= 0
+
+    def __iter__(self):
+        for index in range(len(self._entry_directories)):
+            yield self._path(index)
+
+    def __len__(self):
+        return len(self._entry_directories)
+
+    def _path(self, index):
+        name = self._names[self._name_offsets[index]:self._name_offsets[index + 1]].decode("utf-8", "surrogateescape")
+        return self._directories[self._entry_directories[index]] + name
+
+    def _find(self, path):
+        (directory, name) = _split_path(path)
+        return self._find_encoded(directory, name.encode("utf-8", "surrogateescape"), hash(path))
+
+    def _find_encoded(self, directory, encoded_name, path_hash):
+        directory_index = self._directory_indices.get(directory)
+        if directory_index is None:
+            return -1
+        table = self._table
+        mask = len(table) - 1
+        slot = path_hash & mask
+        while True:
+            index = table[slot]
+            if index < 0:
+                return -1
+            if self._path_hashes[index] == path_hash and self._entry_directories[index] == directory_index and \
+                    self._names[self._name_offsets[index]:self._name_offsets[index + 1]] == encoded_name:
+                return index
+            slot = (slot + 1) & mask
+
+    def _append(self, directory, encoded_name, path_hash):
+        directory_index = self._directory_indices.get(directory)
+        if directory_index is None:
+            directory_index = self._directory_indices[directory] = len(self._directories)
+            self._directories.append(directory)
+        index = len(self._entry_directories)
+        self._entry_directories.append(directory_index)
+        self._names += encoded_name
+        self._name_offsets.append(len(self._names))
+        self._path_hashes.append(path_hash)
+        self._sizes.append(-1)
+        if (index + 1) * 2 > len(self._table):
+            self._rebuild_table(len(self._table) * 2)
+        else:
+            self._insert_into_table(index)
+        return index
+
+    def _rebuild_table(self, size):
+        self._table = array("q", [-1]) * size
+        for index in range(len(self._path_hashes)):
+            self._insert_into_table(index)
+
+    def _insert_into_table(self, index):
+        mask = len(self._table) - 1
+        slot = self._path_hashes[index] & mask
+        while self._table[slot] >= 0:
+            slot = (slot + 1) & mask
+        self._table[slot] = index
+
+
+class ChecksumEntry(Mapping):
+    """A read-only view of the checksums of a single file in a `CompactChecksums` object, mapping algorithm names to
+    hexadecimal digests."""
+
+    __slots__ = ("_checksums", "_index")
+
+    def __init__(self, checksums, index):
+        self._checksums = checksums
+        self._index = index
+
+    def __getitem__(self, algorithm):
+        column = self._checksums._columns.get(algorithm)
+        digest = column.get(self._index) if column is not None else None
+        if digest is None:
+            raise KeyError(algorithm)
+        return digest.hex()
+
+    def __iter__(self):
+        for (algorithm, column) in self._checksums._columns.items():
+            if column.get(self._index) is not None:
+                yield algorithm
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return "ChecksumEntry(%r)" % dict(self)
+
+
+class _CompactSizes(Mapping):
+    """The sizes of the files in a `CompactChecksums` object, as returned by `CompactChecksums.sizes`."""
+
+    __slots__ = ("_checksums",)
+
+    def __init__(self, checksums):
+        self._checksums = checksums
+
+    def __getitem__(self, path):
+        index = self._checksums._find(path)
+        if index < 0 or self._checksums._sizes[index] < 0:
+            raise KeyError(path)
+        return self._checksums._sizes[index]
+
+    def __iter__(self):
+        for (index, size) in enumerate(self._checksums._sizes):
+            if size >= 0:
+                yield self._checksums._path(index)
+
+    def __len__(self):
+        return sum(1 for size in self._checksums._sizes if size >= 0)
+
+
+class _DigestColumn:
+    """The digests of a single algorithm for all entries of a `CompactChecksums` object."""
+
+    __slots__ = ("digest_size", "digests", "present")
+
+    def __init__(self, digest_size):
+        self.digest_size = digest_size
+        self.digests = bytearray()
+        self.present = bytearray()
+
+    def get(self, index):
+        if index >= len(self.present) or not self.present[index]:
+            return None
+        return bytes(self.digests[index * self.digest_size:(index + 1) * self.digest_size])
+
+    def set(self, index, digest):
+        if len(digest) != self.digest_size:
+            raise ValueError("expected a digest of %d bytes, got %d" % (self.digest_size, len(digest)))
+        if index == len(self.present):
+            self.present.append(1)
+            self.digests += digest
+            return
+        if index > len(self.present):
+            missing_entries = index + 1 - len(self.present)
+            self.present += bytes(missing_entries)
+            self.digests += bytes(missing_entries * self.digest_size)
+        self.present[index] = 1
+        self.digests[index * self.digest_size:(index + 1) * self.digest_size] = digest
+
+
+def _split_path(path):
+    separator = path.rfind("/") + 1
+    return path[:separator], path[separator:]
+
+
+class ChecksumFileReader:
+    """Reads the entries of a checksum file one at a time, without loading the whole file into memory.
+
+    The format of the file is detected from its first bytes when the reader is created. Iterating over the reader
+    yields a tuple of the path of a file and a dictionary from algorithm name to hexadecimal digest for every entry of
+    the checksum file. Files with more than one entry (e.g. in BSD-style files listing several algorithms) are yielded
+    once per entry. The dictionaries of Veepiaci files that record sizes also contain the size of the file, as a
+    decimal string under `SIZE_FIELD`. The file is opened only once and closed when the iteration ends or the reader is closed."""
+
+    def __init__(self, filename, algorithm=None):
+        """Create a reader for the given file. `algorithm` names the hash algorithm of `md5sum`/`sha*sum` files, which
+        is otherwise guessed from the name of the file and the length of the digests."""
+        self.filename = filename
+        self.algorithm = algorithm if algorithm else _algorithm_from_file_name(filename)
+        self._file = open(filename, "rb")
+        try:
+            self.type = detect_format(self._file.peek(DETECTION_SIZE)[:DETECTION_SIZE])
+        except ValueError:
+            self.close()
+            raise
 
+    def __enter__(self):
+        return self
 
-def read_checksum_file(filename):
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        file = self._file if self._file is not None else open(self.filename, "rb")
+        self._file = None
+        encoding = "windows-1252" if self.type == "UltraISO" else "utf-8-sig"
+        with io.TextIOWrapper(file, encoding=encoding, newline=None) as lines:
+            yield from _PARSERS[self.type](self, lines)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _parse_ultra_iso_lines(self, lines):
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if not line or line.startswith("#"):
+                continue
+            (checksum, checked_file) = line.split(" ", 1)
+            yield scan.normalize_name(checked_file.strip().removeprefix("*").replace("\\", "/")), {"md5": checksum.lower()}
+
+    def _parse_gnu_lines(self, lines):
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if not line or line.startswith("#"):
+                continue
+            escaped = line.startswith("\\")
+            (checksum, checked_file) = line.removeprefix("\\").split(" ", 1)
+            checked_file = checked_file[1:]
+            if escaped:
+                checked_file = unescape_path(checked_file)
+            algorithm = self.algorithm if self.algorithm else GNU_DIGEST_ALGORITHMS.get(len(checksum))
+            if algorithm in ("blake2b", "blake2s"):
+                # `b2sum -l BITS` writes shorter digests into files named like any other b2sum file
+                algorithm = algorithm_from_tag("%s_%d" % (algorithm, len(checksum) * 4))
+            if algorithm is None:
+                raise ValueError("cannot determine the algorithm of a %d character digest in %s" % (len(checksum), self.filename))
+            yield scan.normalize_name(checked_file), {algorithm: checksum.lower()}
+
+    def _parse_bsd_lines(self, lines):
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if not line or line.startswith("#"):
+                continue
+            escaped = line.startswith("\\")
+            match = _BSD_LINE.fullmatch(line.removeprefix("\\"))
+            if match is None:
+                raise ValueError("invalid line in BSD-style checksum file %s: %s" % (self.filename, line))
+            checked_file = unescape_path(match.group(2)) if escaped else match.group(2)
+            yield scan.normalize_name(checked_file), {algorithm_from_tag(match.group(1)): match.group(3).lower()}
+
+    def _parse_sfv_lines(self, lines):
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if not line or line.startswith(";"):
+                continue
+            (checked_file, checksum) = line.rsplit(" ", 1)
+            yield scan.normalize_name(checked_file.strip().replace("\\", "/")), {"crc32": checksum.lower()}
+
+    def _parse_veepiaci_lines(self, lines):
+        fields = None
+        for line in lines:
+            line = line.rstrip("\r\n")
+            if line.startswith("# fields:"):
+                fields = line.removeprefix("# fields:").split()
+                continue
+            if not line or line.startswith("#"):
+                continue
+            if fields is None:
+                raise ValueError("missing field declaration in Veepiaci checksum file " + self.filename)
+            escaped = line.startswith("\\")
+            values = line.removeprefix("\\").split(" ", len(fields))
+            checked_file = unescape_path(values[-1]) if escaped else values[-1]
+            yield scan.normalize_name(checked_file), {field: value.lower() for (field, value) in zip(fields, values) if value != "-"}
+
+
+_PARSERS = {
+    "UltraISO": ChecksumFileReader._parse_ultra_iso_lines,
+    "GNU": ChecksumFileReader._parse_gnu_lines,
+    "BSD": ChecksumFileReader._parse_bsd_lines,
+    "SFV": ChecksumFileReader._parse_sfv_lines,
+    "Veepiaci": ChecksumFileReader._parse_veepiaci_lines,
+}
+
+
+def detect_format(head):
+    """Detect the format of a checksum file from its first bytes."""
+    lines = head.decode("latin-1").removeprefix("ï»¿").splitlines()
+    if lines and "UltraISO" in lines[0]:
+        return "UltraISO"
+    if lines and lines[0].startswith("# Veepiaci"):
+        return "Veepiaci"
+    for line in lines:
+        if not line.strip() or line.startswith("#"):
+            continue
+        if line.startswith(";"):
+            return "SFV"
+        if _GNU_LINE.match(line):
+            return "GNU"
+        if _BSD_LINE.fullmatch(line.removeprefix("\\")):
+            return "BSD"
+        if _SFV_LINE.fullmatch(line):
+            return "SFV"
+        break
+    raise ValueError("unknown checksum file format")
+
+
+def algorithm_from_tag(tag):
+    """Convert the name of an algorithm as used in BSD-style checksum files (e.g. “SHA3-256”) to the name used by
+    veepiaci. BLAKE2 with a shorter digest keeps its length (e.g. “BLAKE2b-256” becomes “blake2b_256”)."""
+    algorithm = tag.lower().replace("-", "_").replace("/", "_")
+    return _FULL_LENGTH_BLAKE2.get(algorithm, algorithm)
+
+
+def _algorithm_from_file_name(filename):
+    match = _ALGORITHM_IN_FILE_NAME.search(os.path.basename(filename).lower())
+    if match is None:
+        return None
+    algorithm = match.group(1).replace("-", "_")
+    return {"b2": "blake2b", "b3": "blake3"}.get(algorithm, algorithm)
+
+
+def escape_path(path):
+    """Escape backslashes and line breaks in a file name the way `md5sum` and friends do. Returns the escaped name and
+    whether any escaping was necessary, in which case the line must be prefixed with a backslash."""
+    if "\\" not in path and "\n" not in path and "\r" not in path:
+        return path, False
+    return path.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r"), True
+
+
+def unescape_path(path):
+    """Undo the escaping of backslashes and line breaks that `md5sum` and friends apply to file names."""
+    return re.sub(r"\\(.)", lambda match: {"n": "\n", "r": "\r", "\\": "\\"}.get(match.group(1), match.group(0)), path)
+
+
+def read_checksum_file(filename, algorithm=None):
     """Read the given file and parse it into a `ChecksumFile` object."""
-    file_checksums = {}
-    with open(filename, "r", encoding="latin-1") as file:
-        first_line = file.readline()
-    if "UltraISO" in first_line:
-        encoding = "windows-1252"
-    else:
-        encoding = "utf-8"
-    with open(filename, "r", encoding=encoding) as file:
-        file.readline()
-        file.readline()
-        file.readline()
-        for line in file:
-            line_parts = line.split(" ", 1)
-            checksum = line_parts[0]
-            checked_file = line_parts[1].strip().removeprefix("*").replace("\\", "/")
-            file_checksums[checked_file] = {"md5": checksum}
-    return ChecksumFile("UltraISO", file_checksums)
+    file_checksums = CompactChecksums()
+    with ChecksumFileReader(filename, algorithm) as reader:
+        for (checked_file, checksums) in reader:
+            size = checksums.pop(SIZE_FIELD, None)
+            file_checksums.add(checked_file, checksums, int(size) if size is not None else None)
+    return ChecksumFile(reader.type, file_checksums, file_checksums.sizes)
+
+
+class ChecksumFileWriter:
+    """Writes a checksum file one entry at a time, so that checksums can be written as soon as they are created.
+
+    Use `create_checksum_file_writer` to create a writer for a specific format."""
+
+    encoding = "utf-8"
+    newline = "\n"
+
+    def __init__(self, filename, algorithms, paths=()):
+        self.check_algorithms(algorithms)
+        self.check_paths(paths)
+        self.algorithms = tuple(algorithms)
+        self.file = open(filename, "w", encoding=self.encoding, newline=self.newline, buffering=1024 * 1024)
+        self.write_header()
+
+    @classmethod
+    def check_algorithms(cls, algorithms):
+        """Raise a `ValueError` if the format cannot contain checksums of the given algorithms."""
+
+    @classmethod
+    def check_paths(cls, paths):
+        """Raise a `ValueError` naming the first of the given paths that cannot be written in the encoding of the format,
+        so that this can be found out before a checksum file is left half-written."""
+        for path in paths:
+            try:
+                path.encode(cls.encoding)
+            except UnicodeEncodeError:
+                raise ValueError("the file name %s cannot be written to a checksum file encoded in %s" % (ascii(path), cls.encoding)) from None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_header(self):
+        pass
+
+    def write_entry(self, path, checksums, size=None):
+        """Write the checksums (a mapping from algorithm name to hexadecimal digest) of the file with the given path,
+        and its size in bytes, if known and if the format can record it."""
+        raise NotImplementedError
+
+    def close(self):
+        self.file.close()
+
+
+class VeepiaciChecksumFileWriter(ChecksumFileWriter):
+    """Writes checksum files in veepiaci’s own format, which can contain any number of algorithms per file, and the
+    size of every file."""
+
+    def write_header(self):
+        self.file.write("# Veepiaci checksum file\n")
+        self.file.write("# Generated " + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "\n")
+        self.file.write("# fields: " + " ".join((SIZE_FIELD,) + self.algorithms) + "\n")
+
+    def write_entry(self, path, checksums, size=None):
+        (path, escaped) = escape_path(path)
+        values = [str(size) if size is not None else "-"] + [checksums.get(algorithm, "-") for algorithm in self.algorithms]
+        self.file.write(("\\" if escaped else "") + " ".join(values) + " " + path + "\n")
+
+
+class UltraIsoChecksumFileWriter(ChecksumFileWriter):
+    """Writes MD5 checksum files that UltraISO can read."""
+
+    encoding = "windows-1252"
+    newline = "\r\n"
+
+    @classmethod
+    def check_algorithms(cls, algorithms):
+        if tuple(algorithms) != ("md5",):
+            raise ValueError("UltraISO checksum files can only contain MD5 checksums")
+
+    def write_header(self):
+        self.file.write("# MD5 checksums generated by veepiaci, compatible with UltraISO\n")
+        self.file.write("# Generated " + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "\n")
+        self.file.write("\n")
+
+    def write_entry(self, path, checksums, size=None):
+        self.file.write(checksums["md5"] + " *" + path.replace("/", "\\") + "\n")
+
+
+class GnuChecksumFileWriter(ChecksumFileWriter):
+    """Writes checksum files in the format of `md5sum`, `sha256sum` and friends, which contain a single algorithm."""
+
+    @classmethod
+    def check_algorithms(cls, algorithms):
+        if len(tuple(algorithms)) != 1:
+            raise ValueError("md5sum/sha*sum checksum files can only contain a single algorithm")
+
+    def write_entry(self, path, checksums, size=None):
+        (path, escaped) = escape_path(path)
+        self.file.write(("\\" if escaped else "") + checksums[self.algorithms[0]] + " *" + path + "\n")
+
+
+def checksum_file_writer_class(format):
+    """Return the `ChecksumFileWriter` subclass for the given format (one of `WRITABLE_FORMATS`), e.g. to check
+    algorithms and paths before anything is written."""
+    writers = {"Veepiaci": VeepiaciChecksumFileWriter, "UltraISO": UltraIsoChecksumFileWriter, "GNU": GnuChecksumFileWriter}
+    if format not in writers:
+        raise ValueError("cannot write checksum files in format " + format)
+    return writers[format]
+
+
+def create_checksum_file_writer(filename, format, algorithms, paths=()):
+    """Create a `ChecksumFileWriter` that writes a checksum file of the given format (one of `WRITABLE_FORMATS`)
+    containing checksums of the given algorithms. The given paths are checked before the file is created, see
+    `ChecksumFileWriter.check_paths`."""
+    return checksum_file_writer_class(format)(filename, algorithms, paths)
@@ -0,0 +1,295 @@
+"""The command line interface of veepiaci, for verifying and creating checksum files without a GUI.
+
+Run `python -m veepiaci verify CHECKSUM_FILE DIRECTORY`, `python -m veepiaci create DIRECTORY OUTPUT`, or `python -m
+veepiaci batch ROOT` to verify every checksum file found below ROOT. Progress is written to stderr; the files that
+failed verification and the summary are written to stdout. This module must not import Qt, directly or indirectly."""
+import argparse
+import contextlib
+import os
+import signal
+import sys
+import threading
+import time
+
+import checksumfile
+import engine
+import hash
+import report
+from batch import BatchJob, common_root, discover_jobs, verify_batch
+from control import RunControl
+from create import create_checksums, DEFAULT_ALGORITHMS
+from hashcache import HashCache
+from journal import CheckpointJournal, default_journal_file
+from verify import SAMPLING_MODES, verify_checksums
+
+COMMANDS = ("verify", "create", "batch")
+"""The commands of the command line interface."""
+
+EXIT_SUCCESS = 0
+EXIT_MISMATCH = 1
+EXIT_USAGE = 2
+EXIT_MISSING = 3
+EXIT_ADDITIONAL = 4
+EXIT_ERROR = 5
+EXIT_INTERRUPTED = 130
+"""The exit codes of the command line interface. If a verification finds several kinds of problems, the exit code is
+the one of the first kind in the order mismatches, missing files, additional files. `EXIT_USAGE` is also used by
+`argparse` for invalid arguments."""
+
+PROGRESS_INTERVAL = 0.5
+"""The number of seconds between two progress updates on a terminal."""
+
+LOG_PROGRESS_INTERVAL = 10.0
+"""The number of seconds between two progress lines when stderr is not a terminal, e.g. in a cron job."""
+
+
+def main(argv=None):
+    """Run the command line interface with the given arguments and return the exit code."""
+    arguments = create_argument_parser().parse_args(argv)
+    try:
+        return arguments.run(arguments)
+    except (OSError, ValueError) as error:
+        print("veepiaci: error: %s" % error, file=sys.stderr)
+        return EXIT_ERROR
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+
+def create_argument_parser():
+    parser = argparse.ArgumentParser(prog="veepiaci", description="Verify and create checksum files.")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+
+    verify_parser = commands.add_parser("verify", help="verify the files of a directory against a checksum file")
+    verify_parser.add_argument("checksum_file", help="the checksum file (Veepiaci, UltraISO, md5sum/sha*sum, BSD, or SFV)")
+    verify_parser.add_argument("directory", help="the directory, or ISO image, ZIP archive, or tar archive, containing the files to verify")
+    verify_parser.add_argument("--algorithm", help="the algorithm of an md5sum/sha*sum file, if it cannot be guessed from its name")
+    verify_parser.add_argument("--report", metavar="FILE", help="write a report of the verification to this file")
+    verify_parser.add_argument("--report-format", choices=report.REPORT_FORMATS, help="the format of the report (default: guessed from the file name)")
+    verify_parser.add_argument("--hash-cache", action="store_true", help="look up unchanged files in the hash cache instead of hashing them")
+    verify_parser.add_argument("--rehash", action="store_true", help="hash all files, but update the hash cache")
+    verify_parser.add_argument("--resume", action="store_true", help="resume an interrupted verification of the same checksum file and directory")
+    verify_parser.add_argument("--fail-fast", action="store_true", help="stop at the first mismatching or missing file")
+    verify_parser.add_argument("--targeted", action="store_true", help="only look at the files listed in the checksum file")
+    verify_parser.add_argument("--sample", choices=SAMPLING_MODES, default="off",
+                               help="check the samples recorded in a checksum file created with --sample before (or instead of) hashing files completely")
+    add_common_arguments(verify_parser)
+    verify_parser.set_defaults(run=run_verify)
+
+    create_parser = commands.add_parser("create", help="create a checksum file for the files of a directory")
+    create_parser.add_argument("directory", help="the directory containing the files")
+    create_parser.add_argument("output", help="the checksum file to write")
+    create_parser.add_argument("--algorithms", type=parse_algorithms, default=DEFAULT_ALGORITHMS,
+                               help="comma-separated hash algorithms (default: %s)" % ",".join(DEFAULT_ALGORITHMS))
+    create_parser.add_argument("--sample", action="store_true", help="also record hashes of samples of the files, for quick checks (Veepiaci format only)")
+    create_parser.add_argument("--format", choices=checksumfile.WRITABLE_FORMATS, default="Veepiaci", help="the format of the checksum file (default: Veepiaci)")
+    add_common_arguments(create_parser)
+    create_parser.set_defaults(run=run_create)
+
+    batch_parser = commands.add_parser("batch", help="verify many checksum files, each against its own directory, on a shared pool of workers")
+    batch_parser.add_argument("roots", nargs="*", metavar="ROOT", help="verify every checksum file found below this directory against the directory it is in")
+    batch_parser.add_argument("--job", nargs=2, action="append", default=[], metavar=("CHECKSUM_FILE", "DIRECTORY"), help="verify this checksum file against this directory")
+    batch_parser.add_argument("--report", metavar="FILE", help="write a combined report of all verifications to this file")
+    batch_parser.add_argument("--report-format", choices=report.REPORT_FORMATS, help="the format of the report (default: guessed from the file name)")
+    batch_parser.add_argument("--hash-cache", action="store_true", help="look up unchanged files in the hash cache instead of hashing them")
+    batch_parser.add_argument("--rehash", action="store_true", help="hash all files, but update the hash cache")
+    batch_parser.add_argument("--resume", action="store_true", help="resume interrupted verifications of the same checksum files and directories")
+    add_common_arguments(batch_parser)
+    batch_parser.set_defaults(run=run_batch)
+    return parser
+
+
+def add_common_arguments(parser):
+    parser.add_argument("--workers", type=int, help="the number of files hashed at the same time")
+    parser.add_argument("--backend", choices=engine.BACKENDS, default="threads", help="how files are hashed in parallel (default: threads)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN", help="ignore files and directories matching this glob pattern")
+    parser.add_argument("-q", "--quiet", action="store_true", help="do not show progress")
+
+
+def parse_algorithms(value):
+    algorithms = tuple(algorithm.strip() for algorithm in value.split(",") if algorithm.strip())
+    if not algorithms:
+        raise argparse.ArgumentTypeError("no algorithms given")
+    return algorithms
+
+
+def run_verify(arguments):
+    checksum_file = checksumfile.read_checksum_file(arguments.checksum_file, arguments.algorithm)
+    control = RunControl()
+    progress = None if arguments.quiet else ProgressPrinter(sys.stderr)
+    hash_cache = HashCache() if arguments.hash_cache or arguments.rehash else None
+    journal = CheckpointJournal(default_journal_file(arguments.checksum_file, arguments.directory), arguments.checksum_file, arguments.directory) if arguments.resume else None
+    report_writer = report.create_report_writer(arguments.report, arguments.report_format, arguments.directory, arguments.checksum_file) if arguments.report else None
+    try:
+        with cancel_on_interrupt(control):
+            result = verify_checksums(checksum_file, arguments.directory, on_file_hashed=print_failure, workers=arguments.workers, hash_cache=hash_cache,
+                                      trust_cache=not arguments.rehash, exclude=tuple(arguments.exclude), targeted=arguments.targeted,
+                                      on_progress=progress.on_progress if progress else None, report=report_writer, journal=journal, control=control,
+                                      fail_fast=arguments.fail_fast, backend=arguments.backend, sampling=arguments.sample)
+    finally:
+        if progress is not None:
+            progress.finish()
+        for resource in (report_writer, journal, hash_cache):
+            if resource is not None:
+                resource.close()
+    for (files, status) in ((result.missing_files, report.MISSING), (result.additional_files, report.ADDITIONAL)):
+        for file in files:
+            print(status.upper() + " " + file)
+    summary = report.summarize(result)
+    print("%s: %d files verified, %d mismatches, %d missing, %d without checksum" % (
+        "success" if result.success else "failure" if result.complete else "incomplete", summary["files"], summary["mismatches"], summary["missing"], summary["additional"]))
+    return exit_code(result)
+
+
+def print_failure(file, hashes, correct):
+    if not correct:
+        print(report.MISMATCH.upper() + " " + file, flush=True)
+
+
+def exit_code(verification_result):
+    """Return the exit code for the given `VerificationResult`."""
+    if verification_result.mismatches:
+        return EXIT_MISMATCH
+    if verification_result.missing_files:
+        return EXIT_MISSING
+    if verification_result.additional_files:
+        return EXIT_ADDITIONAL
+    if not verification_result.complete:
+        return EXIT_INTERRUPTED
+    return EXIT_SUCCESS
+
+
+def run_batch(arguments):
+    jobs = [BatchJob(checksum_file, directory) for (checksum_file, directory) in arguments.job]
+    for root in arguments.roots:
+        jobs.extend(discover_jobs(root))
+    if not jobs:
+        raise ValueError("no checksum files to verify")
+    for job in jobs:
+        job.exclude += tuple(arguments.exclude)
+    control = RunControl()
+    progress = None if arguments.quiet else ProgressPrinter(sys.stderr)
+    hash_cache = HashCache() if arguments.hash_cache or arguments.rehash else None
+    root = os.path.abspath(arguments.roots[0]) if len(arguments.roots) == 1 and not arguments.job else common_root(jobs)
+    report_writer = report.create_report_writer(arguments.report, arguments.report_format, root, "") if arguments.report else None
+    try:
+        with cancel_on_interrupt(control):
+            result = verify_batch(jobs, on_file_hashed=print_batch_failure, on_job_finished=print_job_result, on_progress=progress.on_progress if progress else None,
+                                  workers=arguments.workers, hash_cache=hash_cache, trust_cache=not arguments.rehash, report=report_writer, resume=arguments.resume,
+                                  control=control, backend=arguments.backend, root=root)
+    finally:
+        if progress is not None:
+            progress.finish()
+        for resource in (report_writer, hash_cache):
+            if resource is not None:
+                resource.close()
+    for (job, error) in result.errors.items():
+        print("ERROR %s: %s" % (job.checksum_file_name, error))
+    summary = report.summarize(result.combined_result)
+    print("%s: %d checksum files, %d files verified, %d mismatches, %d missing, %d without checksum, %d errors" % (
+        "success" if result.success else "failure" if result.combined_result.complete or result.errors else "incomplete", len(jobs), summary["files"], summary["mismatches"],
+        summary["missing"], summary["additional"], len(result.errors)))
+    if result.errors:
+        return EXIT_ERROR
+    return exit_code(result.combined_result)
+
+
+def print_batch_failure(job, file, hashes, correct):
+    if not correct:
+        print(report.MISMATCH.upper() + " " + os.path.join(job.directory, file), flush=True)
+
+
+def print_job_result(job, verification_result):
+    for (files, status) in ((verification_result.missing_files, report.MISSING), (verification_result.additional_files, report.ADDITIONAL)):
+        for file in files:
+            print(status.upper() + " " + os.path.join(job.directory, file))
+    print("%s %s" % ("OK" if verification_result.success else "FAILED" if verification_result.complete else "INCOMPLETE", job.checksum_file_name), flush=True)
+
+
+def run_create(arguments):
+    for algorithm in arguments.algorithms:
+        if algorithm not in hash.ALGORITHMS:
+            raise ValueError("unsupported hash algorithm: " + algorithm)
+    control = RunControl()
+    progress = None if arguments.quiet else ProgressPrinter(sys.stderr)
+    try:
+        with cancel_on_interrupt(control):
+            algorithms = ((hash.SAMPLE_ALGORITHM,) if arguments.sample else ()) + tuple(arguments.algorithms)
+            result = create_checksums(arguments.directory, algorithms, arguments.output, arguments.format, workers=arguments.workers, exclude=tuple(arguments.exclude),
+                                      on_progress=progress.on_progress if progress else None, control=control, backend=arguments.backend)
+    finally:
+        if progress is not None:
+            progress.finish()
+    if not result.complete:
+        print("incomplete: checksums for %d files have been written to %s" % (result.files, result.output))
+        return EXIT_INTERRUPTED
+    print("success: checksums for %d files have been written to %s" % (result.files, result.output))
+    return EXIT_SUCCESS
+
+
+@contextlib.contextmanager
+def cancel_on_interrupt(control):
+    """Cancel the given `RunControl` on the first Ctrl+C, so that the run stops after the current blocks and still
+    returns a result; a second Ctrl+C interrupts the program immediately."""
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def interrupt(signal_number, frame):
+        if control.cancelled:
+            raise KeyboardInterrupt()
+        print("\nveepiaci: cancelling, press Ctrl+C again to stop immediately", file=sys.stderr)
+        control.cancel()
+
+    previous_handler = signal.signal(signal.SIGINT, interrupt)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+
+
+class ProgressPrinter:
+    """Writes `VerificationProgress` updates to a stream: as a single, continuously updated line on a terminal, and as
+    a line every `LOG_PROGRESS_INTERVAL` seconds otherwise."""
+
+    def __init__(self, stream, interval=None, clock=time.monotonic):
+        self.stream = stream
+        self.terminal = stream.isatty()
+        self.interval = interval if interval is not None else PROGRESS_INTERVAL if self.terminal else LOG_PROGRESS_INTERVAL
+        self.clock = clock
+        self.last_update = None
+        self.last_progress = None
+        self.line_length = 0
+
+    def on_progress(self, progress):
+        self.last_progress = progress
+        now = self.clock()
+        if self.last_update is not None and now - self.last_update < self.interval:
+            return
+        self.last_update = now
+        self.write(format_progress(progress))
+
+    def finish(self):
+        if self.last_progress is not None:
+            self.write(format_progress(self.last_progress))
+        if self.terminal and self.line_length:
+            self.stream.write("\n")
+            self.stream.flush()
+
+    def write(self, line):
+        if self.terminal:
+            self.stream.write("\r" + line.ljust(self.line_length))
+            self.line_length = len(line)
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+
+def format_progress(progress):
+    eta_seconds = progress.eta_seconds
+    return "%s: %d/%d files, %.1f/%.1f MB, %.1f MB/s, %s" % (
+        progress.phase or "finished", progress.processed_files, progress.total_files, progress.processed_bytes / 1000000, progress.total_bytes / 1000000,
+        progress.bytes_per_second / 1000000, "ETA " + format_seconds(eta_seconds) if eta_seconds is not None and progress.phase == "hash" else format_seconds(progress.elapsed_seconds) + " elapsed")
+
+
+def format_seconds(seconds):
+    return "%02d:%02d:%02d" % (seconds // 3600, (seconds // 60) % 60, seconds % 60)
@@ -0,0 +1,43 @@
+import threading
+
+
+class Cancelled(Exception):
+    """Raised by `RunControl.checkpoint` once the run has been cancelled."""
+
+
+class RunControl:
+    """Lets a verification or creation run be cancelled, paused, and resumed from another thread.
+
+    The run calls `checkpoint` between files and between the blocks of a file; it blocks there while the run is paused,
+    and raises `Cancelled` once the run has been cancelled. A paused run does not read from the disk at all."""
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._running.set()
+
+    def pause(self):
+        if not self.cancelled:
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def checkpoint(self):
+        """Wait while the run is paused, and raise `Cancelled` if it has been cancelled."""
+        if not self._running.is_set():
+            self._running.wait()
+        if self._cancelled.is_set():
+            raise Cancelled()
@@ -0,0 +1,70 @@
+import os
+
+import checksumfile
+import engine
+import hash
+import iosched
+import scan
+from control import Cancelled
+from progress import ProgressTracker
+
+DEFAULT_ALGORITHMS = ("sha3_256", "blake3") if "blake3" in hash.ALGORITHMS else ("sha3_256", "blake2b")
+"""The algorithms used for new checksum files unless told otherwise."""
+
+
+def create_checksums(directory, algorithms, output, format="Veepiaci", on_started=None, on_file_hashed=None, on_finished=None, workers=None, exclude=(), on_progress=None, control=None, backend="threads"):
+    """Create a checksum file containing checksums of the given algorithms for all files in the given directory.
+
+    Files are hashed by `workers` threads (or processes, depending on `backend`), in an order chosen by
+    `iosched.IoScheduler`, with a single read per file for all algorithms, and every entry is written to `output` as
+    soon as its file has been hashed, so entries appear in the order in which hashing finishes. The callbacks are
+    the same as for `verify.verify_checksums`; `on_file_hashed` is always told that the hash is correct. If `output`
+    is located inside the directory, it is not included in the checksum file. The run can be paused and cancelled
+    through the given `RunControl`; a cancelled run leaves a checksum file with the files hashed so far.
+
+    Veepiaci checksum files record the size of every file as well. With `hash.SAMPLE_ALGORITHM` among the algorithms,
+    they also record the hash of a sample of every file, for quick checks with `verify.verify_checksums`."""
+    if hash.SAMPLE_ALGORITHM in algorithms and format != "Veepiaci":
+        raise ValueError("only Veepiaci checksum files can contain hashes of samples")
+    checksumfile.checksum_file_writer_class(format).check_algorithms(algorithms)
+    if on_started:
+        on_started(directory)
+    progress = ProgressTracker()
+    progress.start_phase("scan")
+    output_path = os.path.relpath(os.path.abspath(output), os.path.abspath(directory)).replace(os.sep, "/")
+    entries = [entry for entry in scan.scan_directory(directory, workers, exclude) if entry.disk_path != output_path]
+    entries.sort(key=lambda entry: entry.path)
+    progress.set_totals(len(entries), sum(entry.st_size for entry in entries))
+    progress.start_phase("hash")
+    if on_progress:
+        on_progress(progress.snapshot())
+    jobs = iosched.IoScheduler(engine.HashJob(entry.path, os.path.join(directory, entry.disk_path), tuple(algorithms), entry.st_size, device=entry.st_dev, inode=entry.st_ino)
+                               for entry in entries)
+    complete = True
+    with checksumfile.create_checksum_file_writer(output, format, algorithms, (entry.path for entry in entries)) as writer:
+        try:
+            for (job, file_hash) in engine.hash_files(jobs, workers, control, backend):
+                writer.write_entry(job.key, file_hash, job.size)
+                progress.file_processed(job.size)
+                if on_file_hashed:
+                    on_file_hashed(job.key, file_hash, True)
+                if on_progress:
+                    on_progress(progress.snapshot())
+        except Cancelled:
+            complete = False
+    progress.start_phase(None)
+    creation_result = CreationResult(output, progress.processed_files, progress.snapshot(), complete)
+    if on_finished is not None:
+        on_finished(creation_result)
+    return creation_result
+
+
+class CreationResult:
+    def __init__(self, output: str, files: int, statistics=None, complete: bool = True, error: str = None):
+        self.output = output
+        self.files = files
+        self.statistics = statistics
+        self.complete = complete
+        """Whether all files have been hashed; if creating the checksum file was cancelled, it only contains some."""
+        self.error = error
+        """The error that stopped creating the checksum file, if any."""
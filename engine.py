@@ -0,0 +1,306 @@
+import concurrent.futures
+import functools
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+import blockio
+import hash
+import iosched
+from control import Cancelled
+
+
+@dataclass
+class HashJob:
+    """A single file that should be hashed by `hash_files`."""
+
+    key: str
+    """An identifier for the job, e.g. the name of the file relative to the verified directory."""
+    file_name: str
+    """The name of the file to hash."""
+    algorithms: tuple = ("md5",)
+    """The names of the hash algorithms to compute for the file."""
+    size: int = 0
+    """The size of the file, if known."""
+    timings: hash.HashTimings = None
+    """The time spent reading and hashing the file, which is filled in by `hash_files`."""
+    device: int = 0
+    """The device the file is on (`st_dev`), if known, which is used by `iosched.IoScheduler`."""
+    inode: int = 0
+    """The inode of the file (`st_ino`), if known, which is used by `iosched.IoScheduler`."""
+
+
+BACKENDS = ("serial", "threads", "processes", "auto")
+"""The ways `hash_files` can hash files: on the calling thread, on a thread pool, on a process pool, or on whichever of
+these `choose_backend` finds to be fastest for the algorithms in use."""
+
+BATCH_FILES = 64
+BATCH_BYTES = 64 * 1024 * 1024
+"""The maximum number of files and bytes sent to a worker process at once, so that small files do not each pay for a
+round trip to a process, while a batch of large files does not keep other processes idle."""
+
+CALIBRATION_SIZE = 4 * 1024 * 1024
+"""The number of bytes hashed per algorithm and thread by `choose_backend`."""
+
+CONTROL_INTERVAL = 0.1
+"""The number of seconds after which a change of the `RunControl` is passed on to worker processes."""
+
+
+_freeze_support_called = False
+
+
+def freeze_support():
+    """Let worker processes of the "processes" backend start in a frozen executable (such as a PyInstaller bundle),
+    where they would otherwise start another copy of the application. Call this first thing in the `__main__` block;
+    until it has been called, a frozen executable hashes on threads instead of processes."""
+    global _freeze_support_called
+    multiprocessing.freeze_support()
+    _freeze_support_called = True
+
+
+def default_worker_count(backend="threads"):
+    """Return the number of workers used by the given backend when no worker count is given."""
+    if backend == "processes":
+        return os.cpu_count() or 1
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def hash_files(jobs, workers=None, control=None, backend="threads", on_error=None):
+    """Hash the files of the given jobs concurrently.
+
+    For every job a `(job, hashes)` tuple is yielded as soon as its file has been hashed, so results arrive in the
+    order the files finish, not in the order of the jobs. The results are yielded on the calling thread, and only a
+    bounded number of jobs is in flight at any time so that arbitrarily long job iterables can be processed. Instead of
+    an iterable of jobs, an `iosched.IoScheduler` (or another scheduler, such as an `iosched.FairScheduler`) can be
+    given to decide the order and the number of files read from every device at the same time.
+
+    `backend` is one of `BACKENDS`. The "processes" backend only sends the names of files to the worker processes, in
+    batches, and is meant for algorithms that hold the GIL while hashing.
+
+    If a `RunControl` is given, it is checked before every file and between the blocks of every file; once it is
+    cancelled, `Cancelled` is raised from this generator. An `OSError` from reading a file is raised from this
+    generator as well, unless `on_error` is given, which is then called with the job and the error, and the other
+    files are still hashed."""
+    if backend not in BACKENDS:
+        raise ValueError("unknown hashing backend: " + backend)
+    scheduler = jobs if hasattr(jobs, "next_job") else iosched.FifoScheduler(jobs)
+    if backend == "auto":
+        first_job = scheduler.next_job()
+        if first_job is None:
+            return
+        backend = choose_backend(first_job.algorithms, workers)
+        scheduler = _FirstJobScheduler(first_job, scheduler)
+    if backend == "processes" and getattr(sys, "frozen", False) and not _freeze_support_called:
+        backend = "threads"
+    workers = workers if workers else default_worker_count(backend)
+    if backend == "serial":
+        yield from _hash_files_serially(scheduler, control, on_error)
+    elif backend == "processes":
+        yield from _hash_files_in_processes(scheduler, workers, control, on_error)
+    else:
+        yield from _hash_files_in_threads(scheduler, workers, control, on_error)
+
+
+def _hash_files_serially(scheduler, control, on_error):
+    while True:
+        job = scheduler.next_job()
+        if job is None:
+            return
+        if control is not None:
+            control.checkpoint()
+        job.timings = hash.HashTimings()
+        try:
+            result = hash.create_hash(job.file_name, job.algorithms, timings=job.timings, control=control)
+        except OSError as error:
+            scheduler.job_done(job)
+            _handle_error(job, error, on_error)
+            continue
+        scheduler.job_done(job)
+        yield job, result
+
+
+def _hash_files_in_threads(scheduler, workers, control, on_error):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="veepiaci-hash") as executor:
+        pending = {}
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    job = scheduler.next_job()
+                    if job is None:
+                        break
+                    if control is not None:
+                        control.checkpoint()
+                    job.timings = hash.HashTimings()
+                    pending[executor.submit(hash.create_hash, job.file_name, job.algorithms, timings=job.timings, control=control)] = job
+                if not pending:
+                    return
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    job = pending.pop(future)
+                    scheduler.job_done(job)
+                    try:
+                        result = future.result()
+                    except OSError as error:
+                        _handle_error(job, error, on_error)
+                        continue
+                    if control is not None:
+                        control.checkpoint()
+                    yield job, result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _hash_files_in_processes(scheduler, workers, control, on_error):
+    # worker processes cannot see the RunControl, so its state is mirrored into events shared with them
+    context = multiprocessing.get_context("spawn")
+    cancelled = context.Event()
+    running = context.Event()
+    running.set()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_initialize_worker_process, initargs=(cancelled, running)) as executor:
+        pending = {}
+        try:
+            while True:
+                while len(pending) < workers * 2:
+                    batch = _next_batch(scheduler)
+                    if not batch:
+                        break
+                    if control is not None:
+                        control.checkpoint()
+                    pending[executor.submit(_hash_batch, [(job.file_name, job.algorithms) for job in batch])] = batch
+                if not pending:
+                    return
+                done, _ = concurrent.futures.wait(pending, timeout=CONTROL_INTERVAL if control is not None else None, return_when=concurrent.futures.FIRST_COMPLETED)
+                if control is not None:
+                    _mirror_control(control, cancelled, running)
+                for future in done:
+                    batch = pending.pop(future)
+                    for job in batch:
+                        scheduler.job_done(job)
+                    results = future.result()
+                    for (job, (result, read_seconds, hash_seconds)) in zip(batch, results):
+                        job.timings = hash.HashTimings(read_seconds, hash_seconds)
+                        if isinstance(result, OSError):
+                            _handle_error(job, result, on_error)
+                            continue
+                        if control is not None:
+                            control.checkpoint()
+                        yield job, result
+        finally:
+            cancelled.set()
+            running.set()
+            for future in pending:
+                future.cancel()
+
+
+def _handle_error(job, error, on_error):
+    if on_error is None:
+        raise error
+    on_error(job, error)
+
+
+def _next_batch(scheduler):
+    batch = []
+    batch_bytes = 0
+    while len(batch) < BATCH_FILES and batch_bytes < BATCH_BYTES:
+        job = scheduler.next_job()
+        if job is None:
+            break
+        batch.append(job)
+        batch_bytes += job.size
+    return batch
+
+
+def _mirror_control(control, cancelled, running):
+    if control.cancelled:
+        cancelled.set()
+    if control.paused:
+        running.clear()
+    else:
+        running.set()
+
+
+class _WorkerProcessControl:
+    """The `RunControl` of a worker process, backed by the events shared with the process that started it."""
+
+    def __init__(self, cancelled, running):
+        self.cancelled = cancelled
+        self.running = running
+
+    def checkpoint(self):
+        if not self.running.is_set():
+            self.running.wait()
+        if self.cancelled.is_set():
+            raise Cancelled()
+
+
+_worker_process_control = None
+
+
+def _initialize_worker_process(cancelled, running):
+    global _worker_process_control
+    _worker_process_control = _WorkerProcessControl(cancelled, running)
+
+
+def _hash_batch(batch):
+    results = []
+    for (file_name, algorithms) in batch:
+        timings = hash.HashTimings()
+        try:
+            result = hash.create_hash(file_name, algorithms, timings=timings, control=_worker_process_control)
+        except OSError as error:
+            # the other files of the batch are still hashed; the error is raised or handled by the parent process
+            result = error
+        results.append((result, timings.read_seconds, timings.hash_seconds))
+    return results
+
+
+class _FirstJobScheduler:
+    """Hands out a job that has already been taken from a scheduler before the remaining jobs of that scheduler."""
+
+    def __init__(self, first_job, scheduler):
+        self.first_job = first_job
+        self.scheduler = scheduler
+
+    def next_job(self):
+        if self.first_job is not None:
+            (job, self.first_job) = (self.first_job, None)
+            return job
+        return self.scheduler.next_job()
+
+    def job_done(self, job):
+        self.scheduler.job_done(job)
+
+
+@functools.lru_cache(maxsize=None)
+def choose_backend(algorithms, workers=None):
+    """Choose the fastest backend for hashing with the given algorithms by hashing some data in memory, once on a
+    single thread and once on several threads at the same time: if the threads do not run in parallel, the hashers hold
+    the GIL, and processes are used instead."""
+    parallelism = min(workers if workers else default_worker_count(), os.cpu_count() or 1, 4)
+    if parallelism < 2:
+        return "serial"
+    data = memoryview(bytes(CALIBRATION_SIZE))
+
+    def hash_data():
+        # a sample is too small to matter
+        for algorithm in (algorithm for algorithm in algorithms if algorithm != hash.SAMPLE_ALGORITHM):
+            hasher = hash.new_hasher(algorithm)
+            for offset in range(0, len(data), blockio.DEFAULT_BLOCK_SIZE):
+                hasher.update(data[offset:offset + blockio.DEFAULT_BLOCK_SIZE])
+
+    start = time.perf_counter()
+    hash_data()
+    serial_seconds = time.perf_counter() - start
+    threads = [threading.Thread(target=hash_data) for _ in range(parallelism)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    parallel_seconds = time.perf_counter() - start
+    speedup = parallelism * serial_seconds / parallel_seconds if parallel_seconds > 0 else parallelism
+    return "threads" if speedup >= parallelism / 2 else "processes"
@@ -0,0 +1,91 @@
+import threading
+
+
+class VerificationCounters:
+    """Aggregated progress of a verification run."""
+
+    __slots__ = ("files", "bytes", "failures")
+
+    def __init__(self, files=0, bytes=0, failures=0):
+        self.files = files
+        """The number of files that have been hashed so far."""
+        self.bytes = bytes
+        """The number of bytes in the files that have been hashed so far, as far as progress has been reported."""
+        self.failures = failures
+        """The number of files whose hashes did not match so far."""
+
+    def copy(self):
+        return VerificationCounters(self.files, self.bytes, self.failures)
+
+    def __eq__(self, other):
+        return isinstance(other, VerificationCounters) and (self.files, self.bytes, self.failures) == (other.files, other.bytes, other.failures)
+
+    def __repr__(self):
+        return "VerificationCounters(files=%d, bytes=%d, failures=%d)" % (self.files, self.bytes, self.failures)
+
+
+class EventCoalescer:
+    """Collects per-file events and hands them on in batches, to keep a receiver (e.g. a user interface behind a queued
+    signal connection) from being flooded with events.
+
+    `on_file_hashed` and `on_progress` have the signatures of the callbacks of the same names of
+    `verify.verify_checksums`. The collected events are passed to `on_batch` as a list of `(file, hashes, correct)`
+    tuples together with a copy of the `VerificationCounters` at that time. A batch is passed on when `batch_size`
+    events have been collected, or at the latest `interval` seconds after the first event of the batch. Of the
+    `VerificationProgress` snapshots received in the meantime, only the latest is passed to `on_progress_batch`. Call
+    `close` after the last event to pass on the remaining events."""
+
+    def __init__(self, on_batch, interval=0.075, batch_size=1000, on_progress_batch=None):
+        self.on_batch = on_batch
+        self.on_progress_batch = on_progress_batch
+        self.interval = interval
+        self.batch_size = batch_size
+        self.counters = VerificationCounters()
+        self.events = []
+        self.progress = None
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def on_file_hashed(self, file, hashes, correct):
+        with self.lock:
+            self.events.append((file, hashes, correct))
+            self.counters.files += 1
+            if not correct:
+                self.counters.failures += 1
+            if len(self.events) >= self.batch_size:
+                self._flush()
+            else:
+                self._start_timer()
+
+    def on_progress(self, progress):
+        with self.lock:
+            self.progress = progress
+            self.counters.bytes = progress.processed_bytes
+            self._start_timer()
+
+    def _start_timer(self):
+        if self.timer is None:
+            self.timer = threading.Timer(self.interval, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        """Pass on all collected events now."""
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        """Pass on all remaining events and stop the timer."""
+        self.flush()
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.events:
+            (events, self.events) = (self.events, [])
+            self.on_batch(events, self.counters.copy())
+        if self.progress is not None:
+            (progress, self.progress) = (self.progress, None)
+            if self.on_progress_batch:
+                self.on_progress_batch(progress)
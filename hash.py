@@ -1,13 +1,139 @@
 import hashlib
-import io
-
-def create_hash(file_name):
-    md5_hash = hashlib.new("md5")
-    buffer = bytearray(4096)
-    with open(file_name, "rb") as file:
-        while True:
-            read_bytes = file.readinto(buffer)
-            if read_bytes == 0:
-                break
-            md5_hash.update(buffer[:read_bytes])
-    return {'md5': md5_hash.hexdigest()}
+import re
+import time
+import zlib
+
+import blockio
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+ALGORITHMS = {
+    "md5": lambda: hashlib.md5(),
+    "sha1": lambda: hashlib.sha1(),
+    "sha224": lambda: hashlib.sha224(),
+    "sha256": lambda: hashlib.sha256(),
+    "sha384": lambda: hashlib.sha384(),
+    "sha512": lambda: hashlib.sha512(),
+    "sha3_224": lambda: hashlib.sha3_224(),
+    "sha3_256": lambda: hashlib.sha3_256(),
+    "sha3_384": lambda: hashlib.sha3_384(),
+    "sha3_512": lambda: hashlib.sha3_512(),
+    "blake2b": lambda: hashlib.blake2b(),
+    "blake2s": lambda: hashlib.blake2s(),
+    "crc32": lambda: Crc32(),
+}
+"""The hash algorithms `create_hash` can compute, by name."""
+if blake3 is not None:
+    ALGORITHMS["blake3"] = lambda: blake3.blake3()
+
+_SHORT_BLAKE2 = re.compile(r"(blake2[bs])_(\d+)")
+_BLAKE2_CONSTRUCTORS = {"blake2b": hashlib.blake2b, "blake2s": hashlib.blake2s}
+
+SAMPLE_ALGORITHM = "sample"
+"""The name under which the hash of a sample of a file (see `create_sample_hash`) is requested from `create_hash` and
+recorded in checksum files. It is not one of `ALGORITHMS`, since it does not hash the whole file."""
+
+
+def create_hash(file_name, algorithms=("md5",), block_size=blockio.DEFAULT_BLOCK_SIZE, strategy="auto", timings=None, control=None):
+    """Hash the given file with all given algorithms, reading the file only once.
+
+    `block_size` and `strategy` are handed to `blockio.read_blocks`. If a `HashTimings` object is given, the time spent
+    reading and hashing is added to it. If a `RunControl` is given, its checkpoint is passed between blocks, so that
+    hashing a large file can be paused or cancelled. Returns a dictionary from algorithm name to the hexadecimal digest.
+
+    `SAMPLE_ALGORITHM` may be among the algorithms, in which case a sample of the file is hashed as well; if it is the
+    only one, the file is not read completely."""
+    if SAMPLE_ALGORITHM not in algorithms:
+        return hash_blocks(blockio.read_blocks(file_name, block_size, strategy), algorithms, timings, control)
+    full_algorithms = tuple(algorithm for algorithm in algorithms if algorithm != SAMPLE_ALGORITHM)
+    file_hash = hash_blocks(blockio.read_blocks(file_name, block_size, strategy), full_algorithms, timings, control) if full_algorithms else {}
+    file_hash[SAMPLE_ALGORITHM] = create_sample_hash(file_name, timings=timings, control=control)
+    return file_hash
+
+
+def create_sample_hash(file_name, block_size=blockio.SAMPLE_BLOCK_SIZE, random_blocks=blockio.SAMPLE_RANDOM_BLOCKS, timings=None, control=None):
+    """Hash a sample of the given file, as read by `blockio.read_sample_blocks`, for a quick check whether the file has
+    been truncated or damaged. Returns the hexadecimal digest."""
+    hasher = hashlib.blake2b(digest_size=16)
+    _update_hashers((hasher,), blockio.read_sample_blocks(file_name, block_size, random_blocks), timings, control)
+    return hasher.hexdigest()
+
+
+def hash_blocks(blocks, algorithms=("md5",), timings=None, control=None):
+    """Hash the data of the given iterable of blocks with all given algorithms, like `create_hash` does for a file.
+
+    Every block is hashed before the next one is requested, so the blocks may share a buffer."""
+    hashers = {algorithm: new_hasher(algorithm) for algorithm in algorithms}
+    _update_hashers(hashers.values(), blocks, timings, control)
+    return {algorithm: hasher.hexdigest() for (algorithm, hasher) in hashers.items()}
+
+
+def _update_hashers(hashers, blocks, timings, control):
+    if timings is None:
+        for block in blocks:
+            if control is not None:
+                control.checkpoint()
+            for hasher in hashers:
+                hasher.update(block)
+    else:
+        read_start = time.perf_counter()
+        for block in blocks:
+            hash_start = time.perf_counter()
+            timings.read_seconds += hash_start - read_start
+            if control is not None:
+                # the time spent paused is neither reading nor hashing
+                control.checkpoint()
+                hash_start = time.perf_counter()
+            for hasher in hashers:
+                hasher.update(block)
+            read_start = time.perf_counter()
+            timings.hash_seconds += read_start - hash_start
+        timings.read_seconds += time.perf_counter() - read_start
+
+
+def new_hasher(algorithm):
+    """Create a new hasher for the algorithm with the given name. Besides `ALGORITHMS`, BLAKE2 with a shorter digest is
+    supported under a name like “blake2b_256” (the number of bits), as created by `b2sum -l 256`."""
+    if algorithm in ALGORITHMS:
+        return ALGORITHMS[algorithm]()
+    match = _SHORT_BLAKE2.fullmatch(algorithm)
+    if match is not None:
+        constructor = _BLAKE2_CONSTRUCTORS[match.group(1)]
+        bits = int(match.group(2))
+        if bits % 8 == 0 and 0 < bits // 8 <= constructor.MAX_DIGEST_SIZE:
+            return constructor(digest_size=bits // 8)
+    raise ValueError("unsupported hash algorithm: " + algorithm)
+
+
+class Crc32:
+    """Computes a CRC-32 checksum, as used in SFV files, with the same interface as the hashers from hashlib."""
+
+    digest_size = 4
+
+    def __init__(self):
+        self.value = 0
+
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+
+    def digest(self):
+        return self.value.to_bytes(4, "big")
+
+    def hexdigest(self):
+        return "%08x" % self.value
+
+
+class HashTimings:
+    """The time spent reading and hashing a file in `create_hash`."""
+
+    __slots__ = ("read_seconds", "hash_seconds")
+
+    def __init__(self, read_seconds=0.0, hash_seconds=0.0):
+        self.read_seconds = read_seconds
+        self.hash_seconds = hash_seconds
+
+    def __repr__(self):
+        return "HashTimings(read_seconds=%.6f, hash_seconds=%.6f)" % (self.read_seconds, self.hash_seconds)
@@ -0,0 +1,85 @@
+import os
+import sqlite3
+import sys
+import time
+
+RACY_INTERVAL_NS = 2 * 1000 * 1000 * 1000
+"""Files modified less than this many nanoseconds before they were hashed are not cached, as a later modification
+might not change their modification time."""
+
+
+def default_cache_file():
+    """Return the location of the hash cache in the user’s cache directory."""
+    if sys.platform == "win32":
+        cache_directory = os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "veepiaci", "Cache")
+    elif sys.platform == "darwin":
+        cache_directory = os.path.join(os.path.expanduser("~/Library/Caches"), "veepiaci")
+    else:
+        cache_directory = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "veepiaci")
+    return os.path.join(cache_directory, "hashes.sqlite")
+
+
+class HashCache:
+    """Stores hashes of files so that unchanged files do not need to be hashed again.
+
+    An entry is only valid as long as the path, size, modification time, inode, and device of the file are unchanged.
+    When the cache is closed, entries older than `max_age` seconds are removed, as are the oldest entries beyond
+    `max_entries`."""
+
+    def __init__(self, file_name=None, max_entries=None, max_age=None):
+        self.file_name = file_name if file_name else default_cache_file()
+        self.max_entries = max_entries
+        self.max_age = max_age
+        if self.file_name != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.file_name)), exist_ok=True)
+        self.connection = sqlite3.connect(self.file_name, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS hashes ("
+                                "path TEXT NOT NULL, algorithm TEXT NOT NULL, digest TEXT NOT NULL, "
+                                "size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL, device INTEGER NOT NULL, "
+                                "hashed_at REAL NOT NULL, PRIMARY KEY (path, algorithm))")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS hashes_hashed_at ON hashes (hashed_at)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def lookup(self, file_name, stat_result, algorithms):
+        """Return the cached hashes of the given file for all given algorithms, or `None` if any of them is not cached
+        for the file in its current state."""
+        rows = self.connection.execute("SELECT algorithm, digest FROM hashes WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ? AND device = ?",
+                                       (os.path.abspath(file_name),) + _stat_key(stat_result)).fetchall()
+        cached_hashes = dict(rows)
+        if not all(algorithm in cached_hashes for algorithm in algorithms):
+            return None
+        return {algorithm: cached_hashes[algorithm] for algorithm in algorithms}
+
+    def store(self, file_name, stat_result, hashes):
+        """Store the hashes of the given file, which had the given `os.stat_result` before it was hashed."""
+        if time.time_ns() - stat_result.st_mtime_ns < RACY_INTERVAL_NS:
+            return
+        path = os.path.abspath(file_name)
+        stat_key = _stat_key(stat_result)
+        with self.connection:
+            self.connection.execute("DELETE FROM hashes WHERE path = ? AND NOT (size = ? AND mtime_ns = ? AND inode = ? AND device = ?)", (path,) + stat_key)
+            self.connection.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                        [(path, algorithm, digest) + stat_key + (time.time(),) for (algorithm, digest) in hashes.items()])
+
+    def evict(self):
+        """Remove entries that are older than `max_age` seconds, and the oldest entries beyond `max_entries`."""
+        with self.connection:
+            if self.max_age is not None:
+                self.connection.execute("DELETE FROM hashes WHERE hashed_at < ?", (time.time() - self.max_age,))
+            if self.max_entries is not None:
+                self.connection.execute("DELETE FROM hashes WHERE rowid IN (SELECT rowid FROM hashes ORDER BY hashed_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def close(self):
+        self.evict()
+        self.connection.close()
+
+
+def _stat_key(stat_result):
+    return stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino, stat_result.st_dev
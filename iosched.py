@@ -0,0 +1,131 @@
+import collections
+import functools
+import heapq
+import os
+
+ROTATIONAL_CONCURRENCY = 1
+"""The number of files read at the same time from a spinning disk; more than one only makes the disk seek between them."""
+
+NON_ROTATIONAL_CONCURRENCY = None
+"""The number of files read at the same time from an SSD; `None` means as many as there are workers."""
+
+UNKNOWN_CONCURRENCY = None
+"""The number of files read at the same time from a device whose kind cannot be detected, e.g. a network mount."""
+
+FAIR_SHARE_MINIMUM_BYTES = 4096
+"""The number of bytes a file counts for in `FairScheduler` if it is smaller, so that small files are not free."""
+
+
+def is_rotational(device, sys_root="/sys"):
+    """Return whether the block device with the given device number (as in `st_dev`) is a spinning disk, according to
+    `/sys/dev/block`, or `None` if this cannot be detected."""
+    if not hasattr(os, "major"):
+        return None
+    device_directory = os.path.join(sys_root, "dev", "block", "%d:%d" % (os.major(device), os.minor(device)))
+    # partitions do not have a queue of their own; theirs is the one of the disk they are on
+    for directory in (device_directory, os.path.join(device_directory, "..")):
+        try:
+            with open(os.path.join(directory, "queue", "rotational")) as file:
+                return file.read().strip() == "1"
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def device_concurrency(device):
+    """Return the number of files that should be read from the given device at the same time, or `None` for no limit."""
+    rotational = is_rotational(device)
+    if rotational is None:
+        return UNKNOWN_CONCURRENCY
+    return ROTATIONAL_CONCURRENCY if rotational else NON_ROTATIONAL_CONCURRENCY
+
+
+class IoScheduler:
+    """Decides in which order `engine.hash_files` reads the files of a list of `HashJob` objects.
+
+    Jobs are grouped by the device their file is on, and the files of a device are read in the order of their inodes,
+    which on most file systems roughly follows their location on the disk. Devices take turns, so that all of them are
+    busy, but no more than `concurrency(device)` files are read from any device at the same time. Schedulers that
+    share their `active` counter of the files being read per device share these limits, too."""
+
+    def __init__(self, jobs, concurrency=device_concurrency, active=None):
+        self.concurrency = concurrency
+        self.queues = collections.OrderedDict()
+        for job in jobs:
+            self.queues.setdefault(job.device, []).append(job)
+        for (device, queue) in self.queues.items():
+            queue.sort(key=lambda job: job.inode)
+            self.queues[device] = collections.deque(queue)
+        self.limits = {device: concurrency(device) for device in self.queues}
+        self.active = active if active is not None else collections.Counter()
+
+    def __len__(self):
+        return sum(len(queue) for queue in self.queues.values())
+
+    def next_job(self):
+        """Return the job that should be started next, or `None` if there is none or all devices are busy."""
+        for device in list(self.queues):
+            queue = self.queues[device]
+            limit = self.limits[device]
+            if limit is not None and self.active[device] >= limit:
+                continue
+            job = queue.popleft()
+            if queue:
+                self.queues.move_to_end(device)
+            else:
+                del self.queues[device]
+            self.active[device] += 1
+            return job
+        return None
+
+    def job_done(self, job):
+        self.active[job.device] -= 1
+
+
+class FairScheduler:
+    """Hands out the jobs of several schedulers, e.g. one `IoScheduler` per verification of a batch, so that each of
+    them gets an equal share of the workers: the next job is taken from the scheduler whose jobs so far add up to the
+    fewest bytes. A scheduler that has no job to start right now (because its devices are busy) is skipped."""
+
+    def __init__(self, schedulers):
+        self.queue = [(0, index, scheduler) for (index, scheduler) in enumerate(schedulers) if len(scheduler)]
+        heapq.heapify(self.queue)
+        self.owners = {}
+
+    def __len__(self):
+        return sum(len(scheduler) for (_, _, scheduler) in self.queue)
+
+    def next_job(self):
+        skipped = []
+        job = None
+        while self.queue and job is None:
+            (scheduled_bytes, index, scheduler) = heapq.heappop(self.queue)
+            job = scheduler.next_job()
+            if job is None:
+                if len(scheduler):
+                    skipped.append((scheduled_bytes, index, scheduler))
+                continue
+            self.owners[id(job)] = scheduler
+            if len(scheduler):
+                # every file counts for at least some bytes, so that schedulers of empty files take turns as well
+                heapq.heappush(self.queue, (scheduled_bytes + max(job.size, FAIR_SHARE_MINIMUM_BYTES), index, scheduler))
+        for entry in skipped:
+            heapq.heappush(self.queue, entry)
+        return job
+
+    def job_done(self, job):
+        self.owners.pop(id(job)).job_done(job)
+
+
+class FifoScheduler:
+    """Hands out jobs in the order of an iterable, without looking at their devices, for `engine.hash_files`."""
+
+    def __init__(self, jobs):
+        self.jobs = iter(jobs)
+
+    def next_job(self):
+        return next(self.jobs, None)
+
+    def job_done(self, job):
+        pass
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import time
+
+import hashcache
+
+BATCH_SIZE = 1000
+"""The number of entries after which the journal is written to disk."""
+
+SYNC_INTERVAL = 10.0
+"""The number of seconds after which the journal is written to disk even if fewer than `BATCH_SIZE` entries are
+pending, so that little is lost when hashing large files."""
+
+
+def default_journal_file(checksum_file_name, directory):
+    """Return the location of the journal for verifying the given directory against the given checksum file, next to
+    the hash cache."""
+    key = hashlib.sha256((os.path.abspath(checksum_file_name) + "\0" + os.path.abspath(directory)).encode("utf-8", "surrogateescape")).hexdigest()[:32]
+    return os.path.join(os.path.dirname(hashcache.default_cache_file()), "journals", key + ".jsonl")
+
+
+class CheckpointJournal:
+    """Records the hashes of verified files so that an interrupted verification can be resumed where it stopped.
+
+    The journal is an append-only file with one JSON object per line. Its first line identifies the checksum file and
+    the directory; if either has changed (or the checksum file has been modified), the journal is started over. Every
+    entry stores the size, modification time, inode, and device the file had when it was hashed, and is only used as
+    long as the file is unchanged. Entries are written to disk in batches; a line that was only partially written when
+    the verification was interrupted is ignored."""
+
+    def __init__(self, file_name, checksum_file_name, directory, batch_size=BATCH_SIZE, sync_interval=SYNC_INTERVAL):
+        self.file_name = file_name
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        checksum_file_stat = os.stat(checksum_file_name)
+        self.identity = {"checksum_file": os.path.abspath(checksum_file_name), "size": checksum_file_stat.st_size, "mtime_ns": checksum_file_stat.st_mtime_ns,
+                         "directory": os.path.abspath(directory)}
+        self.entries = {}
+        resumable = self._load()
+        os.makedirs(os.path.dirname(os.path.abspath(file_name)), exist_ok=True)
+        self.file = open(file_name, "ab" if resumable else "wb", buffering=1024 * 1024)
+        if not resumable:
+            self._write({"type": "journal", **self.identity})
+        elif self.file.tell() > 0 and not self._ends_with_newline():
+            self.file.write(b"\n")
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, path, stat_result, algorithms):
+        """Return the recorded hashes of the file with the given relative path for all given algorithms, or `None` if
+        the file has not been recorded in its current state."""
+        entry = self.entries.get(path)
+        if entry is None or entry[:4] != _stat_key(stat_result):
+            return None
+        hashes = entry[4]
+        if not all(algorithm in hashes for algorithm in algorithms):
+            return None
+        return {algorithm: hashes[algorithm] for algorithm in algorithms}
+
+    def record(self, path, stat_result, hashes):
+        """Record the hashes of the file with the given relative path, which had the given `os.stat_result` before it was
+        hashed."""
+        if time.time_ns() - stat_result.st_mtime_ns < hashcache.RACY_INTERVAL_NS:
+            return
+        (size, mtime_ns, inode, device) = _stat_key(stat_result)
+        self._write({"path": path, "size": size, "mtime_ns": mtime_ns, "inode": inode, "device": device, "hashes": hashes})
+        self.pending += 1
+        if self.pending >= self.batch_size or time.monotonic() - self.last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """Write all pending entries to disk."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+    def complete(self):
+        """Close and remove the journal once the verification has finished."""
+        self.file.close()
+        try:
+            os.remove(self.file_name)
+        except FileNotFoundError:
+            pass
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8", "surrogateescape") + b"\n")
+
+    def _load(self):
+        try:
+            file = open(self.file_name, "rb")
+        except FileNotFoundError:
+            return False
+        with file:
+            try:
+                header = json.loads(file.readline().decode("utf-8", "surrogateescape"))
+            except ValueError:
+                return False
+            if header.get("type") != "journal" or any(header.get(key) != value for (key, value) in self.identity.items()):
+                return False
+            for line in file:
+                try:
+                    record = json.loads(line.decode("utf-8", "surrogateescape"))
+                    self.entries[record["path"]] = (record["size"], record["mtime_ns"], record["inode"], record["device"], record["hashes"])
+                except (ValueError, KeyError):
+                    continue
+        return True
+
+    def _ends_with_newline(self):
+        with open(self.file_name, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+
+
+def _stat_key(stat_result):
+    return stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino, stat_result.st_dev
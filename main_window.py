@@ -0,0 +1,606 @@
+import os
+import sys
+
+from PySide6 import QtCore, QtWidgets
+
+import checksumfile
+import engine
+from batch import BatchJob, BatchResult, common_root, discover_jobs, verify_batch
+from control import RunControl
+from events import EventCoalescer, VerificationCounters
+from hashcache import HashCache
+from journal import CheckpointJournal, default_journal_file
+from report import create_report_writer
+from progress import VerificationProgress
+from create import create_checksums, CreationResult, DEFAULT_ALGORITHMS
+from hash import SAMPLE_ALGORITHM
+from verify import verify_checksums, VerificationResult
+from verify_window import VerifyRunWindow, CreateRunWindow
+
+
+class VeepiaciSettings:
+    def __init__(self):
+        self.checksumFile = ""
+        self.directory = ""
+        self.resultFile = ""
+        self.workers = None
+        self.useHashCache = False
+        self.trustHashCache = True
+        self.resumeVerification = True
+        self.failFast = False
+        self.hashingBackend = "auto"
+        self.sampling = "off"
+
+
+class VeepiaciMainWindow(QtWidgets.QMainWindow):
+    def __init__(self, settings: VeepiaciSettings):
+        super().__init__()
+        self.settings = settings
+        self.setWindowTitle("veepiaci")
+        self.thread_pool = QtCore.QThreadPool()
+
+        central_window = QtWidgets.QWidget()
+        window_layout = QtWidgets.QGridLayout(central_window)
+        self.setCentralWidget(central_window)
+
+        self.checksumFileField = QtWidgets.QLineEdit()
+        self.checksumFileField.setText(self.settings.checksumFile)
+        self.checksumFileField.setReadOnly(True)
+        checksum_file_box = self.create_group_box(
+            "Checksum File",
+            "This contains the checksums for the files of a directory. Veepiaci can read files in the\nfollowing formats: Veepiaci, UltraISO, md5sum/sha*sum, BSD, SFV.",
+            self.checksumFileField,
+            "…",
+            self.choose_checksum_file
+        )
+        window_layout.addWidget(checksum_file_box, 0, 0)
+
+        self.directoryField = QtWidgets.QLineEdit()
+        self.directoryField.setText(self.settings.directory)
+        self.directoryField.setReadOnly(True)
+        directory_box = self.create_group_box(
+            "Directory",
+            "This directory (or ISO image, ZIP or tar archive) will have all of its files checked against\nthe checksums contained in the checksum file.",
+            self.directoryField,
+            "…",
+            self.choose_directory
+        )
+        archive_button = QtWidgets.QPushButton("Archive…")
+        archive_button.clicked.connect(self.choose_archive)
+        directory_box.layout().addWidget(archive_button, 1, 2)
+        window_layout.addWidget(directory_box, 1, 0)
+
+        self.verificationResultFileField = QtWidgets.QLineEdit()
+        self.verificationResultFileField.setText(self.settings.resultFile)
+        self.verificationResultFileField.setReadOnly(True)
+        verification_result_file_box = self.create_group_box(
+            "Verification Result",
+            "The result of the verification run will be stored in this file.",
+            self.verificationResultFileField,
+            "…",
+            self.choose_result_file
+        )
+        window_layout.addWidget(verification_result_file_box, 2, 0)
+
+        self.useHashCacheCheckBox = QtWidgets.QCheckBox("Cache hashes between verification runs")
+        self.useHashCacheCheckBox.setChecked(self.settings.useHashCache)
+        self.useHashCacheCheckBox.toggled.connect(self.set_use_hash_cache)
+        self.trustHashCacheCheckBox = QtWidgets.QCheckBox("Skip unchanged files whose hashes are cached (uncheck to force rehashing)")
+        self.trustHashCacheCheckBox.setChecked(self.settings.trustHashCache)
+        self.trustHashCacheCheckBox.setEnabled(self.settings.useHashCache)
+        self.trustHashCacheCheckBox.toggled.connect(self.set_trust_hash_cache)
+        self.resumeVerificationCheckBox = QtWidgets.QCheckBox("Resume interrupted verifications")
+        self.resumeVerificationCheckBox.setChecked(self.settings.resumeVerification)
+        self.resumeVerificationCheckBox.toggled.connect(self.set_resume_verification)
+        self.failFastCheckBox = QtWidgets.QCheckBox("Stop at the first mismatching or missing file")
+        self.failFastCheckBox.setChecked(self.settings.failFast)
+        self.failFastCheckBox.toggled.connect(self.set_fail_fast)
+        self.hashingBackendComboBox = QtWidgets.QComboBox()
+        self.hashingBackendComboBox.addItems(engine.BACKENDS)
+        self.hashingBackendComboBox.setCurrentText(self.settings.hashingBackend)
+        self.hashingBackendComboBox.currentTextChanged.connect(self.set_hashing_backend)
+        hashing_backend_box = QtWidgets.QWidget()
+        hashing_backend_layout = QtWidgets.QHBoxLayout(hashing_backend_box)
+        hashing_backend_layout.setContentsMargins(0, 0, 0, 0)
+        hashing_backend_layout.addWidget(QtWidgets.QLabel("Hash files using:"))
+        hashing_backend_layout.addWidget(self.hashingBackendComboBox)
+        hashing_backend_layout.addStretch(1)
+        self.samplingComboBox = QtWidgets.QComboBox()
+        for (text, sampling) in SAMPLING_CHOICES.items():
+            self.samplingComboBox.addItem(text, sampling)
+        self.samplingComboBox.setCurrentIndex(self.samplingComboBox.findData(self.settings.sampling))
+        self.samplingComboBox.currentIndexChanged.connect(self.set_sampling)
+        sampling_box = QtWidgets.QWidget()
+        sampling_layout = QtWidgets.QHBoxLayout(sampling_box)
+        sampling_layout.setContentsMargins(0, 0, 0, 0)
+        sampling_layout.addWidget(QtWidgets.QLabel("Samples of files:"))
+        sampling_layout.addWidget(self.samplingComboBox)
+        sampling_layout.addStretch(1)
+        options_box = QtWidgets.QGroupBox("Options")
+        options_layout = QtWidgets.QGridLayout(options_box)
+        options_layout.addWidget(self.useHashCacheCheckBox, 0, 0)
+        options_layout.addWidget(self.trustHashCacheCheckBox, 1, 0)
+        options_layout.addWidget(self.resumeVerificationCheckBox, 2, 0)
+        options_layout.addWidget(self.failFastCheckBox, 3, 0)
+        options_layout.addWidget(hashing_backend_box, 4, 0)
+        options_layout.addWidget(sampling_box, 5, 0)
+        window_layout.addWidget(options_box, 3, 0)
+
+        self.queue_jobs = []
+        """The `BatchJob` objects of the queue, in the order of the rows of its table."""
+        self.queue_control = None
+        """The `RunControl` of the running queue, or `None` if the queue is not running."""
+        self.queueTable = QtWidgets.QTableWidget(0, 3)
+        self.queueTable.setHorizontalHeaderLabels(("Checksum File", "Directory", "Status"))
+        self.queueTable.horizontalHeader().setStretchLastSection(True)
+        self.queueTable.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.queueTable.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.add_to_queue_button = QtWidgets.QPushButton("Add to Queue")
+        self.add_to_queue_button.clicked.connect(self.add_to_queue)
+        self.find_checksum_files_button = QtWidgets.QPushButton("Find Checksum Files…")
+        self.find_checksum_files_button.clicked.connect(self.find_checksum_files)
+        self.remove_from_queue_button = QtWidgets.QPushButton("Remove")
+        self.remove_from_queue_button.clicked.connect(self.remove_from_queue)
+        self.start_queue_button = QtWidgets.QPushButton("Start Queue")
+        self.start_queue_button.setEnabled(False)
+        self.start_queue_button.clicked.connect(self.start_or_cancel_queue)
+        self.queueProgressBar = QtWidgets.QProgressBar()
+        self.queueProgressBar.setRange(0, 1000)
+        self.queueStatusLabel = QtWidgets.QLabel("All checksum files of the queue are verified together, and their files written to the verification result.")
+        queue_buttons = QtWidgets.QWidget()
+        queue_buttons_layout = QtWidgets.QHBoxLayout(queue_buttons)
+        queue_buttons_layout.setContentsMargins(0, 0, 0, 0)
+        queue_buttons_layout.addWidget(self.add_to_queue_button)
+        queue_buttons_layout.addWidget(self.find_checksum_files_button)
+        queue_buttons_layout.addWidget(self.remove_from_queue_button)
+        queue_buttons_layout.addStretch(1)
+        queue_buttons_layout.addWidget(self.start_queue_button)
+        queue_box = QtWidgets.QGroupBox("Queue")
+        queue_layout = QtWidgets.QGridLayout(queue_box)
+        queue_layout.addWidget(self.queueStatusLabel, 0, 0)
+        queue_layout.addWidget(self.queueTable, 1, 0)
+        queue_layout.addWidget(self.queueProgressBar, 2, 0)
+        queue_layout.addWidget(queue_buttons, 3, 0)
+        window_layout.addWidget(queue_box, 4, 0)
+
+        window_layout.setRowStretch(4, 1)
+
+        self.start_verification_button = QtWidgets.QPushButton("Start Verification")
+        self.check_if_queue_can_be_started()
+        self.start_verification_button.clicked.connect(self.start_verification)
+
+        self.create_checksums_button = QtWidgets.QPushButton("Create Checksum File…")
+        self.create_checksums_button.clicked.connect(self.create_checksum_file)
+
+        button_box = QtWidgets.QWidget()
+        button_box_layout = QtWidgets.QHBoxLayout(button_box)
+        button_box_layout.addWidget(self.create_checksums_button)
+        button_box_layout.addStretch(1)
+        button_box_layout.addWidget(self.start_verification_button)
+        window_layout.addWidget(button_box, 5, 0)
+
+    @staticmethod
+    def create_group_box(title, description, field, button_text, on_click):
+        box = QtWidgets.QGroupBox(title)
+        label = QtWidgets.QLabel(description)
+        label.setWordWrap(False)
+        button = QtWidgets.QPushButton(button_text)
+        button.clicked.connect(on_click)
+        layout = QtWidgets.QGridLayout(box)
+        layout.addWidget(label, 0, 0)
+        layout.addWidget(field, 1, 0)
+        layout.addWidget(button, 1, 1)
+        return box
+
+    @QtCore.Slot()
+    def choose_checksum_file(self):
+        (checksum_file, _) = QtWidgets.QFileDialog.getOpenFileName(self, "Select Checksum File")
+        if (checksum_file is not None) and (checksum_file != ""):
+            self.set_checksum_file(checksum_file)
+
+    def set_checksum_file(self, checksum_file):
+        self.settings.checksumFile = checksum_file
+        self.checksumFileField.setText(checksum_file)
+        self.check_if_start_button_can_be_active()
+
+    @QtCore.Slot()
+    def choose_directory(self):
+        directory = QtWidgets.QFileDialog.getExistingDirectory(self)
+        if (directory is not None) and (directory != ""):
+            self.set_directory(directory)
+
+    @QtCore.Slot()
+    def choose_archive(self):
+        (archive_file, _) = QtWidgets.QFileDialog.getOpenFileName(self, "Select Archive", "", ";;".join(ARCHIVE_FILE_FILTERS))
+        if (archive_file is not None) and (archive_file != ""):
+            self.set_directory(archive_file)
+
+    def set_directory(self, directory):
+        self.settings.directory = directory
+        self.directoryField.setText(directory)
+        self.check_if_start_button_can_be_active()
+
+    @QtCore.Slot()
+    def choose_result_file(self):
+        (result_file, _) = QtWidgets.QFileDialog.getSaveFileName(self, "Select Result File", "", ";;".join(RESULT_FILE_FILTERS))
+        if (result_file is not None) and (result_file != ""):
+            self.set_result_file(result_file)
+
+    def set_result_file(self, result_file):
+        self.settings.resultFile = result_file
+        self.verificationResultFileField.setText(result_file)
+        self.check_if_queue_can_be_started()
+
+    @QtCore.Slot(bool)
+    def set_use_hash_cache(self, use_hash_cache):
+        self.settings.useHashCache = use_hash_cache
+        self.trustHashCacheCheckBox.setEnabled(use_hash_cache)
+
+    @QtCore.Slot(bool)
+    def set_trust_hash_cache(self, trust_hash_cache):
+        self.settings.trustHashCache = trust_hash_cache
+
+    @QtCore.Slot(bool)
+    def set_resume_verification(self, resume_verification):
+        self.settings.resumeVerification = resume_verification
+
+    @QtCore.Slot(bool)
+    def set_fail_fast(self, fail_fast):
+        self.settings.failFast = fail_fast
+
+    @QtCore.Slot(str)
+    def set_hashing_backend(self, hashing_backend):
+        self.settings.hashingBackend = hashing_backend
+
+    @QtCore.Slot(int)
+    def set_sampling(self, index):
+        self.settings.sampling = self.samplingComboBox.itemData(index)
+
+    def check_if_start_button_can_be_active(self):
+        button_can_be_active = True
+        button_can_be_active = button_can_be_active and (self.settings.checksumFile != "")
+        button_can_be_active = button_can_be_active and (self.settings.directory != "")
+        button_can_be_active = button_can_be_active and (self.settings.resultFile != "")
+        self.start_verification_button.setEnabled(button_can_be_active)
+        self.add_to_queue_button.setEnabled((self.settings.checksumFile != "") and (self.settings.directory != "") and (self.queue_control is None))
+
+    @QtCore.Slot()
+    def start_verification(self):
+        control = RunControl()
+        verify_window = VerifyRunWindow(self, control)
+        verify_window.resize(800, 450)
+
+        # the checksum file is read by the worker, so that a large one does not block the window and errors are shown there
+        worker = VerificationWorker(self.settings.checksumFile, self.settings.directory, self.settings.workers, self.settings.useHashCache, self.settings.trustHashCache,
+                                    self.settings.resultFile, self.settings.resumeVerification, control, self.settings.failFast,
+                                    self.settings.hashingBackend, self.settings.sampling)
+        worker.started_signal.connect(verify_window.on_started)
+        worker.files_hashed_signal.connect(verify_window.on_files_hashed)
+        worker.progress_signal.connect(verify_window.on_progress)
+        worker.finished_signal.connect(verify_window.on_finished)
+
+        self.thread_pool.start(worker)
+        # not modal, so that further verifications can be queued meanwhile
+        verify_window.show()
+
+    @QtCore.Slot()
+    def add_to_queue(self):
+        checksum_file_name = self.settings.checksumFile
+        exclude = (os.path.basename(checksum_file_name),) if os.path.dirname(os.path.abspath(checksum_file_name)) == os.path.abspath(self.settings.directory) else ()
+        self.append_to_queue([BatchJob(checksum_file_name, self.settings.directory, exclude=exclude)])
+
+    @QtCore.Slot()
+    def find_checksum_files(self):
+        root = QtWidgets.QFileDialog.getExistingDirectory(self, "Select Directory to Search for Checksum Files", self.settings.directory)
+        if (root is None) or (root == ""):
+            return
+        jobs = discover_jobs(root)
+        if not jobs:
+            QtWidgets.QMessageBox.information(self, "Find Checksum Files", "No checksum files were found in %s." % root)
+        self.append_to_queue(jobs)
+
+    def append_to_queue(self, jobs):
+        for job in jobs:
+            row = self.queueTable.rowCount()
+            self.queueTable.insertRow(row)
+            self.queueTable.setItem(row, 0, QtWidgets.QTableWidgetItem(job.checksum_file_name))
+            self.queueTable.setItem(row, 1, QtWidgets.QTableWidgetItem(job.directory))
+            self.queueTable.setItem(row, 2, QtWidgets.QTableWidgetItem("Waiting"))
+            self.queue_jobs.append(job)
+        self.check_if_queue_can_be_started()
+
+    @QtCore.Slot()
+    def remove_from_queue(self):
+        for row in sorted({index.row() for index in self.queueTable.selectedIndexes()}, reverse=True):
+            self.queueTable.removeRow(row)
+            del self.queue_jobs[row]
+        self.check_if_queue_can_be_started()
+
+    def check_if_queue_can_be_started(self):
+        idle = self.queue_control is None
+        self.start_queue_button.setEnabled(bool(self.queue_jobs) and (self.settings.resultFile != "" or not idle))
+        self.find_checksum_files_button.setEnabled(idle)
+        self.remove_from_queue_button.setEnabled(idle)
+        self.check_if_start_button_can_be_active()
+
+    def set_queue_status(self, row, status):
+        self.queueTable.item(row, 2).setText(status)
+
+    @QtCore.Slot()
+    def start_or_cancel_queue(self):
+        if self.queue_control is not None:
+            if QtWidgets.QMessageBox.question(self, "Cancel Queue", "Do you really want to cancel the verification of the queue?") == QtWidgets.QMessageBox.StandardButton.Yes:
+                self.queue_control.cancel()
+            return
+        self.queue_control = RunControl()
+        for row in range(len(self.queue_jobs)):
+            self.set_queue_status(row, "Waiting")
+        self.queueProgressBar.setValue(0)
+        self.start_queue_button.setText("Cancel Queue")
+        self.check_if_queue_can_be_started()
+
+        worker = BatchWorker(list(self.queue_jobs), self.settings.workers, self.settings.useHashCache, self.settings.trustHashCache, self.settings.resultFile,
+                             self.settings.resumeVerification, self.queue_control, self.settings.hashingBackend)
+        worker.job_started_signal.connect(self.on_queue_job_started)
+        worker.job_finished_signal.connect(self.on_queue_job_finished)
+        worker.progress_signal.connect(self.on_queue_progress)
+        worker.finished_signal.connect(self.on_queue_finished)
+        self.thread_pool.start(worker)
+
+    @QtCore.Slot(int)
+    def on_queue_job_started(self, row):
+        self.set_queue_status(row, "Scanning…")
+
+    @QtCore.Slot(int, VerificationResult)
+    def on_queue_job_finished(self, row, verification_result):
+        if verification_result.success:
+            status = "Success"
+        else:
+            status = "%d mismatches, %d missing, %d without checksum" % (len(verification_result.mismatches), len(verification_result.missing_files),
+                                                                       len(verification_result.additional_files))
+            if not verification_result.complete:
+                status = "Cancelled: " + status
+        self.set_queue_status(row, status)
+
+    @QtCore.Slot(VerificationProgress)
+    def on_queue_progress(self, progress):
+        if progress.total_bytes:
+            self.queueProgressBar.setValue(int(1000 * progress.processed_bytes / progress.total_bytes))
+        self.queueStatusLabel.setText("%d/%d files verified" % (progress.processed_files, progress.total_files))
+
+    @QtCore.Slot(BatchResult)
+    def on_queue_finished(self, batch_result):
+        for (row, job) in enumerate(self.queue_jobs):
+            if job in batch_result.errors:
+                self.set_queue_status(row, "Error: " + batch_result.errors[job])
+        combined_result = batch_result.combined_result
+        if batch_result.success:
+            self.queueStatusLabel.setText("All %d checksum files were verified successfully." % len(batch_result.results))
+        else:
+            self.queueStatusLabel.setText("%d mismatches, %d missing, %d without checksum, %d errors. The details are in the verification result." % (
+                len(combined_result.mismatches), len(combined_result.missing_files), len(combined_result.additional_files), len(batch_result.errors)))
+        self.queue_control = None
+        self.start_queue_button.setText("Start Queue")
+        self.check_if_queue_can_be_started()
+
+    @QtCore.Slot()
+    def create_checksum_file(self):
+        directory = QtWidgets.QFileDialog.getExistingDirectory(self, "Select Directory to Create Checksums For", self.settings.directory)
+        if (directory is None) or (directory == ""):
+            return
+        (output, selected_filter) = QtWidgets.QFileDialog.getSaveFileName(self, "Select Checksum File", "", ";;".join(CHECKSUM_FILE_FILTERS))
+        if (output is None) or (output == ""):
+            return
+        (format, algorithms) = CHECKSUM_FILE_FILTERS.get(selected_filter, ("Veepiaci", DEFAULT_ALGORITHMS))
+
+        control = RunControl()
+        create_window = CreateRunWindow(self, control)
+        create_window.resize(800, 450)
+
+        worker = CreationWorker(directory, algorithms, output, format, self.settings.workers, control, self.settings.hashingBackend)
+        worker.started_signal.connect(create_window.on_started)
+        worker.files_hashed_signal.connect(create_window.on_files_hashed)
+        worker.progress_signal.connect(create_window.on_progress)
+        worker.finished_signal.connect(create_window.on_finished)
+
+        self.thread_pool.start(worker)
+        create_window.exec()
+
+
+CHECKSUM_FILE_FILTERS = {
+    "Veepiaci checksum file (*.veepiaci *.txt)": ("Veepiaci", DEFAULT_ALGORITHMS),
+    "Veepiaci checksum file with samples for quick checks (*.veepiaci *.txt)": ("Veepiaci", (SAMPLE_ALGORITHM,) + DEFAULT_ALGORITHMS),
+    "UltraISO checksum file (*.md5)": ("UltraISO", ("md5",)),
+    "sha256sum checksum file (*.sha256 SHA256SUMS)": ("GNU", ("sha256",)),
+}
+"""The file types offered when creating a checksum file, with the format and algorithms used for each."""
+
+SAMPLING_CHOICES = {
+    "Do not check": "off",
+    "Check before hashing files completely": "before",
+    "Check instead of hashing files completely": "instead",
+}
+"""The ways of checking the samples recorded in a checksum file that are offered, with the `verify.SAMPLING_MODES`
+value of each."""
+
+ARCHIVE_FILE_FILTERS = (
+    "Disc images and archives (*.iso *.zip *.tar *.tar.gz *.tgz *.tar.bz2 *.tar.xz *.tar.zst)",
+    "All files (*)",
+)
+
+RESULT_FILE_FILTERS = (
+    "Text report (*.txt)",
+    "HTML report (*.html *.htm)",
+    "JSON Lines report (*.jsonl)",
+    "CSV report (*.csv)",
+    "All files (*)",
+)
+"""The file types offered for the verification result; the format of the report is chosen by the file extension."""
+
+
+class Mixin(QtCore.QObject):
+    started_signal = QtCore.Signal(str)
+    files_hashed_signal = QtCore.Signal(list, VerificationCounters)
+    progress_signal = QtCore.Signal(VerificationProgress)
+    finished_signal = QtCore.Signal(VerificationResult)
+
+
+class VerificationWorker(QtCore.QRunnable, Mixin):
+
+    def __init__(self, checksum_file_name, directory, workers=None, use_hash_cache=False, trust_hash_cache=True, result_file="", resume=False, control=None,
+                 fail_fast=False, backend="threads", sampling="off"):
+        super().__init__()
+
+        self.checksum_file_name = checksum_file_name
+        self.directory = directory
+        self.workers = workers
+        self.use_hash_cache = use_hash_cache
+        self.trust_hash_cache = trust_hash_cache
+        self.result_file = result_file
+        self.resume = resume
+        self.control = control
+        self.fail_fast = fail_fast
+        self.backend = backend
+        self.sampling = sampling
+        self.coalescer = EventCoalescer(self.files_hashed_signal.emit, on_progress_batch=self.progress_signal.emit)
+
+    def run(self):
+        hash_cache = None
+        report = None
+        journal = None
+        try:
+            checksum_file = checksumfile.read_checksum_file(self.checksum_file_name)
+            hash_cache = HashCache() if self.use_hash_cache else None
+            report = create_report_writer(self.result_file, directory=self.directory, checksum_file=self.checksum_file_name) if self.result_file else None
+            journal = CheckpointJournal(default_journal_file(self.checksum_file_name, self.directory), self.checksum_file_name, self.directory) if self.resume else None
+            verify_checksums(checksum_file, self.directory, on_started=self.on_started, on_file_hashed=self.coalescer.on_file_hashed, on_finished=self.on_finished,
+                             workers=self.workers, hash_cache=hash_cache, trust_cache=self.trust_hash_cache, on_progress=self.coalescer.on_progress, report=report, journal=journal,
+                             control=self.control, fail_fast=self.fail_fast, backend=self.backend, sampling=self.sampling)
+        except Exception as error:
+            self.on_finished(VerificationResult([], [], [], complete=False, error=str(error)))
+        finally:
+            self.coalescer.close()
+            if journal is not None:
+                journal.close()
+            if report is not None:
+                report.close()
+            if hash_cache is not None:
+                hash_cache.close()
+
+    def on_started(self, directory):
+        self.started_signal.emit(directory)
+
+    def on_finished(self, verification_result):
+        self.coalescer.close()
+        self.finished_signal.emit(verification_result)
+
+
+class BatchMixin(QtCore.QObject):
+    job_started_signal = QtCore.Signal(int)
+    job_finished_signal = QtCore.Signal(int, VerificationResult)
+    progress_signal = QtCore.Signal(VerificationProgress)
+    finished_signal = QtCore.Signal(BatchResult)
+
+
+class BatchWorker(QtCore.QRunnable, BatchMixin):
+    """Verifies the jobs of the queue with `batch.verify_batch`; jobs are identified by their row in the queue."""
+
+    def __init__(self, jobs, workers=None, use_hash_cache=False, trust_hash_cache=True, result_file="", resume=False, control=None, backend="threads"):
+        super().__init__()
+
+        self.jobs = jobs
+        self.rows = {id(job): row for (row, job) in enumerate(jobs)}
+        self.workers = workers
+        self.use_hash_cache = use_hash_cache
+        self.trust_hash_cache = trust_hash_cache
+        self.result_file = result_file
+        self.resume = resume
+        self.control = control
+        self.backend = backend
+        # the queue only shows the progress, the files are in the report
+        self.coalescer = EventCoalescer(lambda events, counters: None, on_progress_batch=self.progress_signal.emit)
+        self.finished_jobs = {}
+
+    def run(self):
+        hash_cache = None
+        report = None
+        try:
+            hash_cache = HashCache() if self.use_hash_cache else None
+            report = create_report_writer(self.result_file, directory=common_root(self.jobs)) if self.result_file else None
+            batch_result = verify_batch(self.jobs, on_job_started=self.on_job_started, on_job_finished=self.on_job_finished, on_progress=self.coalescer.on_progress,
+                                        workers=self.workers, hash_cache=hash_cache, trust_cache=self.trust_hash_cache, report=report, resume=self.resume, control=self.control,
+                                        backend=self.backend)
+        except Exception as error:
+            # the jobs that have not finished are reported as failed, so that the queue can be started again
+            batch_result = BatchResult(self.finished_jobs, {job: str(error) for job in self.jobs if job not in self.finished_jobs}, VerificationResult([], [], [], complete=False))
+        finally:
+            self.coalescer.close()
+            if report is not None:
+                report.close()
+            if hash_cache is not None:
+                hash_cache.close()
+        self.finished_signal.emit(batch_result)
+
+    def on_job_started(self, job):
+        self.job_started_signal.emit(self.rows[id(job)])
+
+    def on_job_finished(self, job, verification_result):
+        self.finished_jobs[job] = verification_result
+        self.job_finished_signal.emit(self.rows[id(job)], verification_result)
+
+
+class CreationMixin(QtCore.QObject):
+    started_signal = QtCore.Signal(str)
+    files_hashed_signal = QtCore.Signal(list, VerificationCounters)
+    progress_signal = QtCore.Signal(VerificationProgress)
+    finished_signal = QtCore.Signal(CreationResult)
+
+
+class CreationWorker(QtCore.QRunnable, CreationMixin):
+
+    def __init__(self, directory, algorithms, output, format, workers=None, control=None, backend="threads"):
+        super().__init__()
+
+        self.directory = directory
+        self.algorithms = algorithms
+        self.output = output
+        self.format = format
+        self.workers = workers
+        self.control = control
+        self.backend = backend
+        self.coalescer = EventCoalescer(self.files_hashed_signal.emit, on_progress_batch=self.progress_signal.emit)
+
+    def run(self):
+        try:
+            create_checksums(self.directory, self.algorithms, self.output, self.format, on_started=self.on_started, on_file_hashed=self.coalescer.on_file_hashed, on_finished=self.on_finished,
+                             workers=self.workers, on_progress=self.coalescer.on_progress, control=self.control,
+                             backend=self.backend)
+        except Exception as error:
+            self.on_finished(CreationResult(self.output, 0, complete=False, error=str(error)))
+        finally:
+            self.coalescer.close()
+
+    def on_started(self, directory):
+        self.started_signal.emit(directory)
+
+    def on_finished(self, creation_result):
+        self.coalescer.close()
+        self.finished_signal.emit(creation_result)
+
+
+def main(argv=()):
+    """Show the main window and run the application until it is closed; returns the exit code."""
+    app = QtWidgets.QApplication([sys.argv[0]] + list(argv))
+
+    settings = VeepiaciSettings()
+    widget = VeepiaciMainWindow(settings)
+    widget.resize(widget.layout().minimumSize())
+    widget.layout().setSizeConstraint(QtWidgets.QLayout.SizeConstraint.SetFixedSize)
+    widget.show()
+
+    return app.exec()
+
+
+if __name__ == "__main__":
+    engine.freeze_support()
+    sys.exit(main(sys.argv[1:]))
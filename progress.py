@@ -0,0 +1,90 @@
+import collections
+import time
+
+PHASES = ("scan", "reconcile", "hash", "report")
+"""The phases of a verification run, in order."""
+
+RATE_WINDOW = 5.0
+"""The number of seconds over which the current throughput is averaged."""
+
+SAMPLE_INTERVAL = 0.1
+"""The minimum number of seconds between two samples used to compute the throughput."""
+
+
+class VerificationProgress:
+    """A snapshot of the progress of a verification run."""
+
+    __slots__ = ("phase", "total_files", "total_bytes", "processed_files", "processed_bytes", "elapsed_seconds", "bytes_per_second", "phase_seconds")
+
+    def __init__(self, phase=None, total_files=0, total_bytes=0, processed_files=0, processed_bytes=0, elapsed_seconds=0.0, bytes_per_second=0.0, phase_seconds=None):
+        self.phase = phase
+        """The current phase (one of `PHASES`), or `None` once the run is finished."""
+        self.total_files = total_files
+        """The number of files that need to be hashed."""
+        self.total_bytes = total_bytes
+        """The number of bytes in all files that need to be hashed."""
+        self.processed_files = processed_files
+        self.processed_bytes = processed_bytes
+        self.elapsed_seconds = elapsed_seconds
+        """The time since the run has started."""
+        self.bytes_per_second = bytes_per_second
+        """The throughput of the last few seconds."""
+        self.phase_seconds = phase_seconds if phase_seconds is not None else {}
+        """The time spent in every phase that has been started so far."""
+
+    @property
+    def eta_seconds(self):
+        """The estimated number of seconds until all files are hashed, or `None` if no estimate is possible yet."""
+        if self.bytes_per_second <= 0:
+            return None
+        return max(0, self.total_bytes - self.processed_bytes) / self.bytes_per_second
+
+    def __repr__(self):
+        return "VerificationProgress(phase=%r, files=%d/%d, bytes=%d/%d)" % (self.phase, self.processed_files, self.total_files, self.processed_bytes, self.total_bytes)
+
+
+class ProgressTracker:
+    """Keeps track of the progress of a verification run, and creates `VerificationProgress` snapshots of it."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.start_time = clock()
+        self.phase = None
+        self.phase_start_time = self.start_time
+        self.phase_seconds = {}
+        self.total_files = 0
+        self.total_bytes = 0
+        self.processed_files = 0
+        self.processed_bytes = 0
+        self.samples = collections.deque([(self.start_time, 0)])
+
+    def start_phase(self, phase):
+        """End the current phase, if any, and start the given one. Passing `None` only ends the current phase."""
+        now = self.clock()
+        if self.phase is not None:
+            self.phase_seconds[self.phase] = self.phase_seconds.get(self.phase, 0.0) + now - self.phase_start_time
+        self.phase = phase
+        self.phase_start_time = now
+
+    def set_totals(self, files, bytes):
+        self.total_files = files
+        self.total_bytes = bytes
+
+    def file_processed(self, size):
+        self.processed_files += 1
+        self.processed_bytes += size
+        now = self.clock()
+        if now - self.samples[-1][0] < SAMPLE_INTERVAL:
+            return
+        self.samples.append((now, self.processed_bytes))
+        while len(self.samples) > 2 and now - self.samples[1][0] >= RATE_WINDOW:
+            self.samples.popleft()
+
+    def snapshot(self):
+        now = self.clock()
+        phase_seconds = dict(self.phase_seconds)
+        if self.phase is not None:
+            phase_seconds[self.phase] = phase_seconds.get(self.phase, 0.0) + now - self.phase_start_time
+        (first_sample_time, first_sample_bytes) = self.samples[0]
+        bytes_per_second = (self.processed_bytes - first_sample_bytes) / (now - first_sample_time) if now > first_sample_time else 0.0
+        return VerificationProgress(self.phase, self.total_files, self.total_bytes, self.processed_files, self.processed_bytes, now - self.start_time, bytes_per_second, phase_seconds)
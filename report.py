@@ -0,0 +1,282 @@
+import csv
+import html
+import json
+import os
+from datetime import datetime
+
+REPORT_FORMATS = ("JSONL", "CSV", "text", "HTML")
+"""The formats verification reports can be written in."""
+
+READABLE_REPORT_FORMATS = ("JSONL", "CSV")
+"""The formats of verification reports that can be read back."""
+
+OK = "ok"
+MISMATCH = "mismatch"
+MISSING = "missing"
+ADDITIONAL = "additional"
+ERROR = "error"
+"""The states of the files in a verification report. Files that could not be read are errors; they count as
+mismatches in the summary."""
+
+_FORMATS_BY_EXTENSION = {".jsonl": "JSONL", ".ndjson": "JSONL", ".csv": "CSV", ".html": "HTML", ".htm": "HTML"}
+
+
+def report_format_from_file_name(file_name):
+    """Guess the format of a report from the extension of its file name; anything unknown is a text report."""
+    return _FORMATS_BY_EXTENSION.get(os.path.splitext(file_name)[1].lower(), "text")
+
+
+class ReportWriter:
+    """Writes a verification report while the verification is still running, one file at a time, so that the results
+    of a run never have to be kept in memory just for the report.
+
+    Use `create_report_writer` to create a writer for a specific format. `write_summary` writes the overall result and
+    has to be called after all files have been written."""
+
+    newline = "\n"
+
+    def __init__(self, file_name, directory="", checksum_file=""):
+        self.file = open(file_name, "w", encoding="utf-8", newline=self.newline, buffering=1024 * 1024)
+        self.write_header(directory, checksum_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_header(self, directory, checksum_file):
+        pass
+
+    def write_file(self, path, status, hashes=None, tier=None, timings=None, error=None):
+        """Write the state (one of `OK`, `MISMATCH`, `MISSING`, `ADDITIONAL` and `ERROR`) of the file with the given path, the
+        hashes it was found to have, if it has been hashed, and the tier that decided it (see `verify.FileTiers`). If the
+        file has been read, its `hash.HashTimings` tell whether reading or hashing it took longer. For an `ERROR`, the
+        error message is given as well."""
+        raise NotImplementedError
+
+    def write_summary(self, verification_result):
+        pass
+
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesReportWriter(ReportWriter):
+    """Writes a report with one JSON object per line: a header, one line for every file, and the summary."""
+
+    def write_header(self, directory, checksum_file):
+        self._write_line({"type": "header", "directory": directory, "checksum_file": checksum_file, "started": datetime.now().isoformat(timespec="seconds")})
+
+    def write_file(self, path, status, hashes=None, tier=None, timings=None, error=None):
+        line = {"type": "file", "path": path, "status": status}
+        if hashes:
+            line["hashes"] = dict(hashes)
+        if tier is not None:
+            line["tier"] = tier
+        if timings is not None:
+            line["read_seconds"] = round(timings.read_seconds, 6)
+            line["hash_seconds"] = round(timings.hash_seconds, 6)
+        if error is not None:
+            line["error"] = error
+        self._write_line(line)
+
+    def write_summary(self, verification_result):
+        self._write_line(dict(type="summary", **summarize(verification_result)))
+
+    def _write_line(self, line):
+        self.file.write(json.dumps(line, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+class CsvReportWriter(ReportWriter):
+    """Writes a report with one row for every file, containing its path, its state, its hashes as a list of
+    `algorithm:digest` pairs, the tier that decided it, and the seconds spent reading and hashing it. CSV reports do
+    not contain a summary."""
+
+    newline = ""
+
+    def write_header(self, directory, checksum_file):
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(("path", "status", "hashes", "tier", "read_seconds", "hash_seconds"))
+
+    def write_file(self, path, status, hashes=None, tier=None, timings=None, error=None):
+        self.writer.writerow((path, status, " ".join(algorithm + ":" + digest for (algorithm, digest) in hashes.items()) if hashes else "", tier or "",
+                              "%.6f" % timings.read_seconds if timings is not None else "", "%.6f" % timings.hash_seconds if timings is not None else ""))
+
+
+class TextReportWriter(ReportWriter):
+    """Writes a human-readable report that only lists the files that failed verification, followed by the summary."""
+
+    def write_header(self, directory, checksum_file):
+        self.file.write("Verification of " + directory + " against " + checksum_file + "\n")
+        self.file.write("Started " + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "\n\n")
+
+    def write_file(self, path, status, hashes=None, tier=None, timings=None, error=None):
+        if status != OK:
+            self.file.write(status.upper() + " " + path + (": " + error if error is not None else "") + "\n")
+
+    def write_summary(self, verification_result):
+        summary = summarize(verification_result)
+        self.file.write("\nResult: " + ("success" if summary["success"] else "failure") + ("" if summary["complete"] else " (incomplete)") + "\n")
+        self.file.write("%d files verified (%d bytes), %d mismatches, %d missing, %d without checksum, %d from the hash cache\n" % (
+            summary["files"], summary["bytes"], summary["mismatches"], summary["missing"], summary["additional"], summary["cache_hits"]))
+        self.file.write("Time: %.1f s (%s)\n" % (summary["elapsed_seconds"], ", ".join("%s %.1f s" % item for item in summary["phase_seconds"].items())))
+
+
+class HtmlReportWriter(ReportWriter):
+    """Writes an HTML page with a table of the files that failed verification, followed by the summary."""
+
+    def write_header(self, directory, checksum_file):
+        self.file.write("<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>Verification of " + html.escape(directory) + "</title>\n</head>\n<body>\n")
+        self.file.write("<h1>Verification of " + html.escape(directory) + "</h1>\n")
+        self.file.write("<p>Checksum file: " + html.escape(checksum_file) + "<br>Started " + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "</p>\n")
+        self.file.write("<table>\n<tr><th>Status</th><th>File</th></tr>\n")
+
+    def write_file(self, path, status, hashes=None, tier=None, timings=None, error=None):
+        if status != OK:
+            self.file.write("<tr><td>" + status + "</td><td>" + html.escape(path) + (": " + html.escape(error) if error is not None else "") + "</td></tr>\n")
+
+    def write_summary(self, verification_result):
+        summary = summarize(verification_result)
+        self.file.write("</table>\n<h2>Result: " + ("success" if summary["success"] else "failure") + ("" if summary["complete"] else " (incomplete)") + "</h2>\n<table>\n")
+        for key in ("files", "bytes", "mismatches", "missing", "additional", "cache_hits"):
+            self.file.write("<tr><th>" + key.replace("_", " ") + "</th><td>%d</td></tr>\n" % summary[key])
+        self.file.write("<tr><th>time</th><td>%.1f s</td></tr>\n" % summary["elapsed_seconds"])
+        for (phase, seconds) in summary["phase_seconds"].items():
+            self.file.write("<tr><th>%s</th><td>%.1f s</td></tr>\n" % (html.escape(phase), seconds))
+        self.file.write("</table>\n")
+
+    def close(self):
+        if not self.file.closed:
+            self.file.write("</body>\n</html>\n")
+        super().close()
+
+
+def create_report_writer(file_name, format=None, directory="", checksum_file=""):
+    """Create a `ReportWriter` for the given file. The format (one of `REPORT_FORMATS`) is guessed from the file name if
+    it is not given."""
+    writers = {"JSONL": JsonLinesReportWriter, "CSV": CsvReportWriter, "text": TextReportWriter, "HTML": HtmlReportWriter}
+    format = format if format else report_format_from_file_name(file_name)
+    if format not in writers:
+        raise ValueError("cannot write reports in format " + format)
+    return writers[format](file_name, directory, checksum_file)
+
+
+def summarize(verification_result):
+    """Return the summary of a `VerificationResult` as written to reports."""
+    statistics = verification_result.statistics
+    return {
+        "success": verification_result.success,
+        "complete": verification_result.complete,
+        "files": statistics.processed_files if statistics is not None else 0,
+        "bytes": statistics.processed_bytes if statistics is not None else 0,
+        "mismatches": len(verification_result.mismatches),
+        "missing": len(verification_result.missing_files),
+        "additional": len(verification_result.additional_files),
+        "cache_hits": verification_result.cache_hits,
+        "resumed": verification_result.resumed_files,
+        "tiers": dict(verification_result.tiers),
+        "elapsed_seconds": statistics.elapsed_seconds if statistics is not None else 0.0,
+        "phase_seconds": dict(statistics.phase_seconds) if statistics is not None else {},
+    }
+
+
+class ReportEntry:
+    """The state of a single file in a verification report."""
+
+    __slots__ = ("path", "status", "hashes")
+
+    def __init__(self, path, status, hashes=None):
+        self.path = path
+        self.status = status
+        self.hashes = hashes if hashes is not None else {}
+
+    def __eq__(self, other):
+        return isinstance(other, ReportEntry) and (self.path, self.status, self.hashes) == (other.path, other.status, other.hashes)
+
+    def __repr__(self):
+        return "ReportEntry(%r, %r, %r)" % (self.path, self.status, self.hashes)
+
+
+class ReportReader:
+    """Reads the entries of a JSONL or CSV report one at a time. Iterating over the reader yields a `ReportEntry` for
+    every file; once the iteration is finished, `summary` contains the summary of a JSONL report (or `None`)."""
+
+    def __init__(self, file_name, format=None):
+        self.format = format if format else report_format_from_file_name(file_name)
+        if self.format not in READABLE_REPORT_FORMATS:
+            raise ValueError("cannot read reports in format " + self.format)
+        self.file_name = file_name
+        self.header = None
+        self.summary = None
+
+    def __iter__(self):
+        with open(self.file_name, "r", encoding="utf-8", newline="" if self.format == "CSV" else None) as file:
+            if self.format == "CSV":
+                yield from self._parse_csv(file)
+            else:
+                yield from self._parse_json_lines(file)
+
+    def _parse_json_lines(self, file):
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            type = record.pop("type", "file")
+            if type == "file":
+                yield ReportEntry(record["path"], record["status"], record.get("hashes"))
+            elif type == "header":
+                self.header = record
+            elif type == "summary":
+                self.summary = record
+
+    @staticmethod
+    def _parse_csv(file):
+        rows = csv.reader(file)
+        next(rows, None)
+        # reports of older versions do not have the later columns
+        for (path, status, hashes, *_) in rows:
+            yield ReportEntry(path, status, dict(pair.split(":", 1) for pair in hashes.split()))
+
+
+def read_report(file_name, format=None):
+    """Read all entries of a report into a dictionary from path to `ReportEntry`."""
+    return {entry.path: entry for entry in ReportReader(file_name, format)}
+
+
+def compare_reports(old_report, new_report):
+    """Compare two reports (given by their file names) and return a `ReportComparison`.
+
+    Only the old report is kept in memory; the new one is streamed."""
+    old_entries = {entry.path: (entry.status, entry.hashes) for entry in ReportReader(old_report)}
+    comparison = ReportComparison()
+    for entry in ReportReader(new_report):
+        old = old_entries.pop(entry.path, None)
+        if old is None:
+            comparison.added.append(entry.path)
+            continue
+        (old_status, old_hashes) = old
+        if old_status != entry.status:
+            comparison.changed.append((entry.path, old_status, entry.status))
+        elif any(old_hashes[algorithm] != digest for (algorithm, digest) in entry.hashes.items() if algorithm in old_hashes):
+            comparison.changed.append((entry.path, old_status, entry.status))
+    comparison.removed.extend(old_entries.keys())
+    comparison.added.sort()
+    comparison.removed.sort()
+    comparison.changed.sort()
+    return comparison
+
+
+class ReportComparison:
+    def __init__(self):
+        self.added = []
+        """The files that are only in the new report."""
+        self.removed = []
+        """The files that are only in the old report."""
+        self.changed = []
+        """`(path, old status, new status)` tuples for files whose state or hashes differ between the reports."""
+
+    @property
+    def regressions(self):
+        """The files that were verified successfully in the old report but not in the new one."""
+        return [path for (path, old_status, new_status) in self.changed if old_status == OK and new_status != OK]
@@ -0,0 +1,133 @@
+import concurrent.futures
+import fnmatch
+import os
+import stat
+import unicodedata
+
+import engine
+
+
+class ScanEntry:
+    """A file found by `scan_directory` or `stat_files`.
+
+    The metadata of the file is kept under the same names as in `os.stat_result`, so an entry can be used wherever
+    only these fields of a stat result are needed."""
+
+    __slots__ = ("path", "disk_path", "st_size", "st_mtime_ns", "st_ino", "st_dev")
+
+    def __init__(self, path, disk_path, stat_result):
+        self.path = path
+        """The path of the file relative to the scanned directory, separated by “/” and normalized to NFC."""
+        self.disk_path = disk_path
+        """The path of the file relative to the scanned directory as it is named on disk."""
+        self.st_size = stat_result.st_size
+        self.st_mtime_ns = stat_result.st_mtime_ns
+        self.st_ino = stat_result.st_ino
+        self.st_dev = stat_result.st_dev
+
+    def __repr__(self):
+        return "ScanEntry(%r, size=%d)" % (self.path, self.st_size)
+
+
+def normalize_name(name):
+    """Normalize the given file name to NFC, which is how names are stored in checksum files."""
+    if name.isascii():
+        return name
+    return unicodedata.normalize("NFC", name)
+
+
+def scan_directory(directory, workers=None, exclude=()):
+    """Find all files below the given directory.
+
+    Directories are scanned concurrently by up to `workers` threads. Files and directories whose name or relative path
+    matches one of the glob patterns in `exclude` are skipped. Symbolic links to directories are not followed. Returns
+    a list of `ScanEntry` objects in no particular order."""
+    workers = workers if workers else engine.default_worker_count()
+    entries = []
+    if workers == 1:
+        pending_directories = [("", "")]
+        while pending_directories:
+            (directory_entries, subdirectories) = _scan_single_directory(directory, *pending_directories.pop(), exclude)
+            entries.extend(directory_entries)
+            pending_directories.extend(subdirectories)
+        return entries
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="veepiaci-scan") as executor:
+        pending = {executor.submit(_scan_single_directory, directory, "", "", exclude)}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                (directory_entries, subdirectories) = future.result()
+                entries.extend(directory_entries)
+                for (path, disk_path) in subdirectories:
+                    pending.add(executor.submit(_scan_single_directory, directory, path, disk_path, exclude))
+    return entries
+
+
+def _scan_single_directory(directory, path_prefix, disk_path_prefix, exclude):
+    entries = []
+    subdirectories = []
+    try:
+        with os.scandir(os.path.join(directory, disk_path_prefix) if disk_path_prefix else directory) as iterator:
+            directory_entries = list(iterator)
+    except OSError:
+        # like os.walk, skip directories that cannot be listed, e.g. for lack of permissions
+        return entries, subdirectories
+    for directory_entry in directory_entries:
+        name = directory_entry.name
+        disk_path = disk_path_prefix + name
+        normalized_name = normalize_name(name)
+        path = disk_path if normalized_name == name and path_prefix == disk_path_prefix else path_prefix + normalized_name
+        if exclude and _is_excluded(normalized_name, path, exclude):
+            continue
+        if directory_entry.is_dir():
+            if not directory_entry.is_symlink():
+                subdirectories.append((path + "/", disk_path + "/"))
+            continue
+        try:
+            stat_result = directory_entry.stat()
+        except FileNotFoundError:
+            stat_result = directory_entry.stat(follow_symlinks=False)
+        entries.append(ScanEntry(path, disk_path, stat_result))
+    return entries, subdirectories
+
+
+def _is_excluded(name, path, exclude):
+    return any(fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(path, pattern) for pattern in exclude)
+
+
+def stat_files(directory, paths, workers=None):
+    """Look up only the given files below the given directory, instead of scanning the whole directory.
+
+    `paths` are relative paths as they appear in a checksum file. Files that do not exist are left out of the returned
+    list of `ScanEntry` objects."""
+    workers = workers if workers else engine.default_worker_count()
+    paths = list(paths)
+    batches = [paths[start:start + 1024] for start in range(0, len(paths), 1024)]
+    entries = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="veepiaci-stat") as executor:
+        for batch_entries in executor.map(lambda batch: _stat_batch(directory, batch), batches):
+            entries.extend(batch_entries)
+    return entries
+
+
+def _stat_batch(directory, paths):
+    entries = []
+    for path in paths:
+        entry = stat_file(directory, path)
+        if entry is not None:
+            entries.append(entry)
+    return entries
+
+
+def stat_file(directory, path):
+    """Look up a single file below the given directory by its relative path as it appears in a checksum file. Returns
+    a `ScanEntry`, or `None` if there is no such file."""
+    for disk_path in dict.fromkeys((path, unicodedata.normalize("NFD", path))):
+        try:
+            stat_result = os.stat(os.path.join(directory, disk_path))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        if stat.S_ISREG(stat_result.st_mode):
+            return ScanEntry(path, disk_path, stat_result)
+        return None
+    return None
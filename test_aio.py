@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import aio
+import hash
+from checksumfile import ChecksumFile
+from control import RunControl
+
+
+def create_files(temp_directory, count, prefix="file"):
+    checksums = {}
+    for index in range(count):
+        data = bytes(range(index % 256)) * 10
+        with open(os.path.join(temp_directory, "%s-%d.dat" % (prefix, index)), "wb") as file:
+            file.write(data)
+        checksums["%s-%d.dat" % (prefix, index)] = {"md5": hashlib.md5(data).hexdigest()}
+    return ChecksumFile("test", checksums)
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+class AsyncTest(unittest.TestCase):
+
+    def test_create_hash_async_returns_the_same_hashes_as_create_hash(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_files(temp_directory, 2)
+            file_name = os.path.join(temp_directory, "file-1.dat")
+            hashes = asyncio.run(aio.create_hash_async(file_name, 2, ("md5", "sha3_256")))
+            self.assertEqual(hashes, hash.create_hash(file_name, ("md5", "sha3_256")))
+
+    def test_verify_checksums_async_yields_every_checked_file(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            checksum_file = create_files(temp_directory, 20)
+            checksum_file.file_checksums["file-3.dat"] = {"md5": "0" * 32}
+            checksum_file.file_checksums["missing.dat"] = {"md5": "0" * 32}
+            results = []
+            checked_files = asyncio.run(collect(aio.verify_checksums_async(checksum_file, temp_directory, 4, on_finished=results.append)))
+            self.assertEqual(sorted(file for (file, _, _) in checked_files), sorted(set(checksum_file.file_checksums) - {"missing.dat"}))
+            self.assertEqual([file for (file, _, correct) in checked_files if not correct], ["file-3.dat"])
+            self.assertEqual(results[0].mismatches, ["file-3.dat"])
+            self.assertEqual(results[0].missing_files, ["missing.dat"])
+            self.assertTrue(results[0].complete)
+
+    def test_concurrent_runs_share_the_limit(self):
+        active = 0
+        most_active = 0
+        lock = threading.Lock()
+        create_hash = hash.create_hash
+
+        def counting_create_hash(*arguments):
+            nonlocal active, most_active
+            with lock:
+                active += 1
+                most_active = max(most_active, active)
+            time.sleep(0.005)
+            try:
+                return create_hash(*arguments)
+            finally:
+                with lock:
+                    active -= 1
+
+        async def verify_twice(temp_directory, first_checksum_file, second_checksum_file):
+            with aio.HashLimiter(3) as limiter:
+                return await asyncio.gather(collect(aio.verify_checksums_async(first_checksum_file, os.path.join(temp_directory, "first"), limiter)),
+                                            collect(aio.verify_checksums_async(second_checksum_file, os.path.join(temp_directory, "second"), limiter)))
+
+        with tempfile.TemporaryDirectory() as temp_directory, mock.patch("hash.create_hash", counting_create_hash):
+            os.mkdir(os.path.join(temp_directory, "first"))
+            os.mkdir(os.path.join(temp_directory, "second"))
+            first_checksum_file = create_files(os.path.join(temp_directory, "first"), 30)
+            second_checksum_file = create_files(os.path.join(temp_directory, "second"), 30)
+            (first, second) = asyncio.run(verify_twice(temp_directory, first_checksum_file, second_checksum_file))
+            self.assertEqual((len(first), len(second)), (30, 30))
+            self.assertTrue(all(correct for (_, _, correct) in first + second))
+            self.assertLessEqual(most_active, 3)
+
+    def test_cancelling_the_task_stops_reading_promptly(self):
+        reading = threading.Event()
+        stopped = threading.Event()
+
+        def endless_blocks(file_name, block_size, strategy):
+            try:
+                while True:
+                    reading.set()
+                    time.sleep(0.001)
+                    yield b"block"
+            finally:
+                stopped.set()
+
+        async def cancel_while_hashing():
+            task = asyncio.ensure_future(aio.create_hash_async("endless.dat", 1))
+            await asyncio.get_running_loop().run_in_executor(None, reading.wait)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with mock.patch("blockio.read_blocks", endless_blocks):
+            asyncio.run(cancel_while_hashing())
+        self.assertTrue(stopped.wait(1))
+
+    def test_cancelling_the_task_while_scanning_cancels_the_run_control(self):
+        scanning = threading.Event()
+        control = RunControl()
+
+        def slow_scan(directory, workers=None, exclude=()):
+            scanning.set()
+            time.sleep(0.1)
+            return []
+
+        async def cancel_while_scanning():
+            async def verify():
+                async for _ in aio.verify_checksums_async(ChecksumFile("test", {}), "directory", 1, control=control):
+                    pass
+
+            task = asyncio.ensure_future(verify())
+            await asyncio.get_running_loop().run_in_executor(None, scanning.wait)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with mock.patch("scan.scan_directory", slow_scan):
+            asyncio.run(cancel_while_scanning())
+        self.assertTrue(control.cancelled)
+
+    def test_cancelling_the_run_control_ends_with_an_incomplete_result(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            checksum_file = create_files(temp_directory, 50)
+            control = RunControl()
+            results = []
+
+            async def verify_until_cancelled():
+                checked_files = []
+                async for checked_file in aio.verify_checksums_async(checksum_file, temp_directory, 2, on_finished=results.append, control=control):
+                    checked_files.append(checked_file)
+                    if len(checked_files) == 5:
+                        control.cancel()
+                return checked_files
+
+            checked_files = asyncio.run(verify_until_cancelled())
+            self.assertLess(len(checked_files), 50)
+            self.assertFalse(results[0].complete)
@@ -0,0 +1,178 @@
+import hashlib
+import io
+import os
+import tarfile
+import tempfile
+import unicodedata
+import unittest
+import zipfile
+
+import archive
+import engine
+import verify
+from checksumfile import ChecksumFile
+
+FILES = {"a.txt": b"first file", "dir/b.txt": b"second file" * 1000, "dir/empty.txt": b""}
+
+
+def md5_checksums(files):
+    return ChecksumFile("test", {path: {"md5": hashlib.md5(data).hexdigest()} for (path, data) in files.items()})
+
+
+def create_zip(file_name, files, compression=zipfile.ZIP_DEFLATED):
+    with zipfile.ZipFile(file_name, "w", compression) as archive_file:
+        for (path, data) in files.items():
+            archive_file.writestr(path, data)
+
+
+def create_tar(file_name, files, mode="w"):
+    with tarfile.open(file_name, mode) as archive_file:
+        for (path, data) in files.items():
+            info = tarfile.TarInfo("./" + path)
+            info.size = len(data)
+            archive_file.addfile(info, io.BytesIO(data))
+
+
+def create_iso(file_name, files, joliet=True):
+    """Write a minimal ISO 9660 image containing the given files, which may be at most one directory deep."""
+    sector_size = archive.ISO_SECTOR_SIZE
+    directories = sorted({path.rpartition("/")[0] for path in files if "/" in path})
+    trees = [("primary", lambda name: name.upper().encode("ascii"))] + ([("joliet", lambda name: name.encode("utf-16-be"))] if joliet else [])
+    # sectors: 16 and up volume descriptors and terminator, then the directories of every tree, then the file data
+    first_directory_sector = archive.ISO_FIRST_VOLUME_DESCRIPTOR + len(trees) + 1
+    directory_sectors = {(tree, directory): first_directory_sector + index * (len(directories) + 1) + position
+                         for (index, (tree, _)) in enumerate(trees) for (position, directory) in enumerate([""] + directories)}
+    data_sectors = {}
+    sector = first_directory_sector + len(trees) * (len(directories) + 1)
+    for (path, data) in files.items():
+        data_sectors[path] = sector
+        sector += max(1, -(-len(data) // sector_size))
+    image = bytearray(sector * sector_size)
+
+    def record(name, extent, size, is_directory):
+        length = 33 + len(name) + (1 - len(name) % 2)
+        data = bytearray(length)
+        data[0] = length
+        data[2:6] = extent.to_bytes(4, "little")
+        data[6:10] = extent.to_bytes(4, "big")
+        data[10:14] = size.to_bytes(4, "little")
+        data[14:18] = size.to_bytes(4, "big")
+        data[25] = 2 if is_directory else 0
+        data[32] = len(name)
+        data[33:33 + len(name)] = name
+        return bytes(data)
+
+    for (index, (tree, encode)) in enumerate(trees):
+        descriptor = bytearray(sector_size)
+        descriptor[0] = 1 if tree == "primary" else 2
+        descriptor[1:7] = b"CD001\x01"
+        if tree == "joliet":
+            descriptor[88:91] = b"%/E"
+        descriptor[128:130] = sector_size.to_bytes(2, "little")
+        descriptor[156:190] = record(b"\x00", directory_sectors[(tree, "")], sector_size, True)
+        write(image, (archive.ISO_FIRST_VOLUME_DESCRIPTOR + index) * sector_size, descriptor)
+        for directory in [""] + directories:
+            records = [record(b"\x00", directory_sectors[(tree, directory)], sector_size, True), record(b"\x01", directory_sectors[(tree, "")], sector_size, True)]
+            records += [record(encode(subdirectory), directory_sectors[(tree, subdirectory)], sector_size, True) for subdirectory in directories if not directory]
+            records += [record(encode(path.rpartition("/")[2] + ";1"), data_sectors[path], len(data), False) for (path, data) in files.items() if path.rpartition("/")[0] == directory]
+            write(image, directory_sectors[(tree, directory)] * sector_size, b"".join(records))
+    write(image, (archive.ISO_FIRST_VOLUME_DESCRIPTOR + len(trees)) * sector_size, b"\xffCD001\x01")
+    for (path, data) in files.items():
+        write(image, data_sectors[path] * sector_size, data)
+    with open(file_name, "wb") as file:
+        file.write(image)
+
+
+def write(image, offset, data):
+    image[offset:offset + len(data)] = data
+
+
+ARCHIVE_CREATORS = {
+    "archive.zip": create_zip,
+    "archive.tar": create_tar,
+    "archive.tar.gz": lambda file_name, files: create_tar(file_name, files, "w:gz"),
+    "archive.tar.xz": lambda file_name, files: create_tar(file_name, files, "w:xz"),
+    "archive.iso": create_iso,
+}
+
+
+class ArchiveTest(unittest.TestCase):
+
+    def test_verify_checks_the_files_inside_archives(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            for (name, create_archive) in ARCHIVE_CREATORS.items():
+                with self.subTest(name):
+                    file_name = os.path.join(temp_directory, name)
+                    create_archive(file_name, FILES)
+                    checksums = md5_checksums(dict(FILES, **{"dir/b.txt": b"changed", "missing.txt": b""}))
+                    hashed_files = []
+                    result = verify.verify_checksums(checksums, file_name, on_file_hashed=lambda file, hashes, correct: hashed_files.append(file))
+                    self.assertEqual(result.mismatches, ["dir/b.txt"])
+                    self.assertEqual(result.missing_files, ["missing.txt"])
+                    self.assertEqual(result.additional_files, [])
+                    self.assertEqual(sorted(hashed_files), ["a.txt", "dir/b.txt", "dir/empty.txt"])
+                    self.assertTrue(verify.verify_checksums(md5_checksums(FILES), file_name).success)
+
+    def test_collect_files_lists_archive_members_normalized_and_excluded(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = os.path.join(temp_directory, "archive.zip")
+            create_zip(file_name, {unicodedata.normalize("NFD", "Übersicht.txt"): b"", "skip/file.txt": b"", "keep/file.txt": b""})
+            self.assertEqual(sorted(verify.collect_files(file_name, exclude=("skip",))), ["keep/file.txt", unicodedata.normalize("NFC", "Übersicht.txt")])
+
+    def test_iso_without_joliet_uses_primary_names(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = os.path.join(temp_directory, "archive.iso")
+            create_iso(file_name, FILES, joliet=False)
+            self.assertEqual(archive.archive_format(file_name), "ISO")
+            self.assertEqual(sorted(verify.collect_files(file_name)), ["A.TXT", "DIR/B.TXT", "DIR/EMPTY.TXT"])
+
+    def test_tar_hard_links_have_the_content_of_their_target(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = os.path.join(temp_directory, "archive.tar.gz")
+            with tarfile.open(file_name, "w:gz") as archive_file:
+                info = tarfile.TarInfo("data.txt")
+                info.size = 4
+                archive_file.addfile(info, io.BytesIO(b"data"))
+                link = tarfile.TarInfo("link.txt")
+                link.type = tarfile.LNKTYPE
+                link.linkname = "data.txt"
+                archive_file.addfile(link)
+            self.assertTrue(verify.verify_checksums(md5_checksums({"data.txt": b"data", "link.txt": b"data"}), file_name).success)
+            members = {member.path: member for member in archive.scan_archive(file_name)}
+            jobs = [engine.HashJob(path, file_name) for path in ("data.txt", "link.txt")]
+            list(archive.hash_members(file_name, jobs, members))
+            self.assertIsNot(jobs[0].timings, jobs[1].timings)
+            self.assertEqual((jobs[1].timings.read_seconds, jobs[1].timings.hash_seconds), (0.0, 0.0))
+
+    def test_only_the_last_tar_member_of_a_name_counts(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            for name in ("archive.tar", "archive.tar.gz"):
+                with self.subTest(name):
+                    file_name = os.path.join(temp_directory, name)
+                    with tarfile.open(file_name, "w:gz" if name.endswith(".gz") else "w") as archive_file:
+                        for (path, data) in (("x.txt", b"old"), ("y.txt", b"other"), ("./x.txt", b"new")):
+                            info = tarfile.TarInfo(path)
+                            info.size = len(data)
+                            archive_file.addfile(info, io.BytesIO(data))
+                    progress = []
+                    result = verify.verify_checksums(md5_checksums({"x.txt": b"new", "y.txt": b"other"}), file_name, on_progress=progress.append)
+                    self.assertTrue(result.success)
+                    self.assertEqual((progress[-1].processed_files, progress[-1].total_files), (2, 2))
+
+    def test_corrupt_zip_member_is_a_mismatch(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = os.path.join(temp_directory, "archive.zip")
+            create_zip(file_name, {"file.txt": b"original content"}, zipfile.ZIP_STORED)
+            with open(file_name, "r+b") as file:
+                file.seek(30 + len("file.txt"))
+                file.write(b"O")
+            result = verify.verify_checksums(md5_checksums({"file.txt": b"original content"}), file_name)
+            self.assertEqual(result.mismatches, ["file.txt"])
+
+    def test_other_files_are_not_archives(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = os.path.join(temp_directory, "file.txt")
+            with open(file_name, "wb") as file:
+                file.write(b"just text\n" * 10000)
+            self.assertIsNone(archive.archive_format(file_name))
+            self.assertIsNone(archive.archive_format(temp_directory))
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import journal
+import report
+from batch import BatchJob, discover_jobs, verify_batch
+
+
+def create_delivery(directory, files, checksum_file_name="checksums.md5", wrong_files=()):
+    os.makedirs(directory, exist_ok=True)
+    lines = []
+    for (path, data) in files.items():
+        with open(os.path.join(directory, path), "wb") as file:
+            file.write(data)
+        digest = hashlib.md5(b"wrong" if path in wrong_files else data).hexdigest()
+        lines.append("%s  %s\n" % (digest, path))
+    with open(os.path.join(directory, checksum_file_name), "w") as file:
+        file.writelines(lines)
+    return os.path.join(directory, checksum_file_name)
+
+
+class BatchTest(unittest.TestCase):
+
+    def test_discover_jobs_finds_checksum_files_and_does_not_descend_below_them(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            first = create_delivery(os.path.join(temp_directory, "first"), {"a.dat": b"a"})
+            create_delivery(os.path.join(temp_directory, "first", "nested"), {"b.dat": b"b"})
+            second = create_delivery(os.path.join(temp_directory, "second", "inner"), {"c.dat": b"c"}, "SHA256SUMS")
+            with open(os.path.join(temp_directory, "second", "notes.md5"), "w") as file:
+                file.write("not a checksum file\n")
+            jobs = discover_jobs(temp_directory)
+            self.assertEqual([(job.checksum_file_name, job.directory) for job in jobs], [(first, os.path.dirname(first)), (second, os.path.dirname(second))])
+            self.assertEqual(jobs[0].exclude, ("checksums.md5",))
+
+    def test_verify_batch_reports_every_job_and_the_whole_batch(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as report_directory:
+            create_delivery(os.path.join(temp_directory, "first"), {"a.dat": b"a" * 1000, "b.dat": b"b"})
+            create_delivery(os.path.join(temp_directory, "second"), {"c.dat": b"c" * 5000, "d.dat": b"d"}, wrong_files=("d.dat",))
+            os.remove(os.path.join(temp_directory, "second", "c.dat"))
+            jobs = discover_jobs(temp_directory)
+            started = []
+            finished = []
+            hashed_files = []
+            report_file = os.path.join(report_directory, "batch.jsonl")
+            with report.create_report_writer(report_file, directory=temp_directory) as writer:
+                batch_result = verify_batch(jobs, on_job_started=started.append, on_job_finished=lambda job, result: finished.append(job),
+                                            on_file_hashed=lambda job, file, hashes, correct: hashed_files.append((job, file, correct)), workers=3, report=writer)
+            self.assertEqual(started, jobs)
+            self.assertEqual(sorted(finished, key=jobs.index), jobs)
+            self.assertEqual(sorted((jobs.index(job), file, correct) for (job, file, correct) in hashed_files), [(0, "a.dat", True), (0, "b.dat", True), (1, "d.dat", False)])
+            self.assertTrue(batch_result.results[jobs[0]].success)
+            self.assertEqual(batch_result.results[jobs[1]].mismatches, ["d.dat"])
+            self.assertEqual(batch_result.results[jobs[1]].missing_files, ["c.dat"])
+            combined_result = batch_result.combined_result
+            self.assertFalse(batch_result.success)
+            self.assertTrue(combined_result.complete)
+            self.assertEqual(combined_result.mismatches, ["second/d.dat"])
+            self.assertEqual(combined_result.missing_files, ["second/c.dat"])
+            self.assertEqual(combined_result.additional_files, [])
+            self.assertEqual((combined_result.statistics.processed_files, combined_result.statistics.processed_bytes), (3, 1002))
+            self.assertEqual(dict(combined_result.file_tiers), {"first/a.dat": "full", "first/b.dat": "full", "second/d.dat": "full"})
+            self.assertEqual(combined_result.tiers, {"full": 3})
+            reader = report.ReportReader(report_file)
+            self.assertEqual(sorted((entry.path, entry.status) for entry in reader),
+                             [("first/a.dat", report.OK), ("first/b.dat", report.OK), ("second/c.dat", report.MISSING), ("second/d.dat", report.MISMATCH)])
+            self.assertEqual(reader.summary["mismatches"], 1)
+
+    def test_unreadable_checksum_files_are_errors_of_their_job(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            good = BatchJob(create_delivery(os.path.join(temp_directory, "good"), {"a.dat": b"a"}), os.path.join(temp_directory, "good"), exclude=("checksums.md5",))
+            bad = BatchJob(os.path.join(temp_directory, "missing.md5"), temp_directory)
+            batch_result = verify_batch([bad, good])
+            self.assertEqual(list(batch_result.results), [good])
+            self.assertTrue(batch_result.results[good].success)
+            self.assertIn(bad, batch_result.errors)
+            self.assertFalse(batch_result.combined_result.complete)
+            self.assertFalse(batch_result.success)
+
+
+    def test_journals_are_closed_when_an_error_stops_the_batch(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            jobs = [BatchJob(create_delivery(os.path.join(temp_directory, name), {"a.dat": b"a"}), os.path.join(temp_directory, name), exclude=("checksums.md5",))
+                    for name in ("first", "second")]
+            journals = []
+            original_init = journal.CheckpointJournal.__init__
+
+            def init(self, *arguments, **keywords):
+                original_init(self, *arguments, **keywords)
+                journals.append(self)
+
+            with mock.patch.object(journal.CheckpointJournal, "__init__", init), mock.patch("engine.hash_files", side_effect=RuntimeError("disk on fire")):
+                with self.assertRaises(RuntimeError):
+                    verify_batch(jobs, resume=True)
+            self.assertEqual(len(journals), 2)
+            self.assertTrue(all(journal_file.file.closed for journal_file in journals))
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import blockio
+
+
+def create_file(temp_directory, size):
+    file_name = os.path.join(temp_directory, "data.dat")
+    with open(file_name, "wb") as file:
+        file.write(bytes(index % 251 for index in range(size)))
+    return file_name
+
+
+def open_and_read(file_name):
+    with open(file_name, "rb") as file:
+        return file.read()
+
+
+class BlockIoTest(unittest.TestCase):
+
+    def test_all_strategies_read_the_complete_file(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = create_file(temp_directory, 10000)
+            with open(file_name, "rb") as file:
+                expected_content = file.read()
+            for strategy in blockio.STRATEGIES:
+                content = b"".join(bytes(block) for block in blockio.read_blocks(file_name, 4096, strategy))
+                self.assertEqual(content, expected_content, strategy)
+
+    def test_blocks_are_not_larger_than_the_block_size(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = create_file(temp_directory, 10000)
+            for strategy in blockio.STRATEGIES:
+                block_sizes = [len(block) for block in blockio.read_blocks(file_name, 4096, strategy)]
+                self.assertEqual(block_sizes, [4096, 4096, 1808], strategy)
+
+    def test_empty_file_yields_no_blocks(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = create_file(temp_directory, 0)
+            for strategy in blockio.STRATEGIES:
+                self.assertEqual(list(blockio.read_blocks(file_name, 4096, strategy)), [], strategy)
+
+    def test_auto_strategy_reads_without_memory_mapping(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = create_file(temp_directory, 10000)
+            with mock.patch("mmap.mmap", side_effect=AssertionError("mapped")):
+                self.assertEqual(sum(len(block) for block in blockio.read_blocks(file_name, 4096)), 10000)
+
+    def test_unknown_strategy_is_rejected(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = create_file(temp_directory, 10)
+            with self.assertRaises(ValueError):
+                list(blockio.read_blocks(file_name, 4096, "telepathy"))
+
+    def test_samples_cover_head_and_tail_of_large_files_and_small_files_completely(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = create_file(temp_directory, 500)
+            self.assertEqual(b"".join(bytes(block) for block in blockio.read_sample_blocks(file_name, 100, 4)), (500).to_bytes(8, "little") + open_and_read(file_name))
+            file_name = create_file(temp_directory, 10000)
+            blocks = list(blockio.read_sample_blocks(file_name, 100, 4))
+            self.assertEqual(len(blocks), 7)
+            self.assertEqual((blocks[1], blocks[-1]), (open_and_read(file_name)[:100], open_and_read(file_name)[-100:]))
+            self.assertEqual(blocks, list(blockio.read_sample_blocks(file_name, 100, 4)))
+
+
+if __name__ == '__main__':
+    unittest.main()
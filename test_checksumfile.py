@@ -1,8 +1,10 @@
+import hashlib
 import os
 import tempfile
 import unittest
 
 import checksumfile
+import verify
 
 
 class ChecksumFileTest(unittest.TestCase):
@@ -46,5 +48,132 @@ class ChecksumFileTest(unittest.TestCase):
             self.assertEqual(checksum_file.file_checksums["first/empty.txt"], {"md5": "d41d8cd98f00b204e9800998ecf8427e"})
             self.assertEqual(checksum_file.file_checksums["second/some-bytes.dat"], {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"})
 
+    def test_gnu_checksum_file_can_be_read(self):
+        with tempfile.TemporaryDirectory("w") as temp_dir:
+            with open(os.path.join(temp_dir, "checksums.txt"), "w") as temp_file:
+                temp_file.write("d41d8cd98f00b204e9800998ecf8427e  empty.txt\n")
+                temp_file.write("e2c865db4162bed963bfaa9ef6ac18f0 *dir/some bytes.dat\n")
+                temp_file.write("\\d41d8cd98f00b204e9800998ecf8427e  back\\\\slash\\nnewline.txt\n")
+            checksum_file = checksumfile.read_checksum_file(os.path.join(temp_dir, "checksums.txt"))
+            self.assertEqual(checksum_file.type, "GNU")
+            self.assertEqual(checksum_file.file_checksums["empty.txt"], {"md5": "d41d8cd98f00b204e9800998ecf8427e"})
+            self.assertEqual(checksum_file.file_checksums["dir/some bytes.dat"], {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"})
+            self.assertEqual(checksum_file.file_checksums["back\\slash\nnewline.txt"], {"md5": "d41d8cd98f00b204e9800998ecf8427e"})
+
+    def test_gnu_checksum_file_uses_algorithm_from_file_name(self):
+        with tempfile.TemporaryDirectory("w") as temp_dir:
+            with open(os.path.join(temp_dir, "SHA3-256SUMS"), "w") as temp_file:
+                temp_file.write("a7ffc6f8bf1ed76651c14756a061d662f580ff4de43b49fa82d80a4b80f8434a  empty.txt\n")
+            checksum_file = checksumfile.read_checksum_file(os.path.join(temp_dir, "SHA3-256SUMS"))
+            self.assertEqual(checksum_file.file_checksums["empty.txt"], {"sha3_256": "a7ffc6f8bf1ed76651c14756a061d662f580ff4de43b49fa82d80a4b80f8434a"})
+
+    def test_bsd_checksum_file_can_be_read(self):
+        with tempfile.TemporaryDirectory("w") as temp_dir:
+            with open(os.path.join(temp_dir, "checksums.txt"), "w") as temp_file:
+                temp_file.write("MD5 (empty.txt) = d41d8cd98f00b204e9800998ecf8427e\n")
+                temp_file.write("SHA3-256 (empty.txt) = A7FFC6F8BF1ED76651C14756A061D662F580FF4DE43B49FA82D80A4B80F8434A\n")
+                temp_file.write("BLAKE2b (dir/(odd) name.dat) = 786a02f742015903c6c6fd852552d272912f4740e15847618a86e217f71f5419d25e1031afee585313896444934eb04b903a685b1448b755d56f701afe9be2ce\n")
+            checksum_file = checksumfile.read_checksum_file(os.path.join(temp_dir, "checksums.txt"))
+            self.assertEqual(checksum_file.type, "BSD")
+            self.assertEqual(checksum_file.file_checksums["empty.txt"], {"md5": "d41d8cd98f00b204e9800998ecf8427e", "sha3_256": "a7ffc6f8bf1ed76651c14756a061d662f580ff4de43b49fa82d80a4b80f8434a"})
+            self.assertEqual(list(checksum_file.file_checksums["dir/(odd) name.dat"].keys()), ["blake2b"])
+
+    def test_shorter_blake2_digests_keep_their_length(self):
+        with tempfile.TemporaryDirectory("w") as temp_dir:
+            with open(os.path.join(temp_dir, "checksums.txt"), "w") as temp_file:
+                temp_file.write("BLAKE2b-256 (f.txt) = %s\n" % hashlib.blake2b(b"data", digest_size=32).hexdigest())
+                temp_file.write("BLAKE2b (f.txt) = %s\n" % hashlib.blake2b(b"data").hexdigest())
+            with open(os.path.join(temp_dir, "f.txt"), "wb") as data_file:
+                data_file.write(b"data")
+            with open(os.path.join(temp_dir, "B2SUMS"), "w") as temp_file:
+                temp_file.write("%s  f.txt\n" % hashlib.blake2b(b"data", digest_size=20).hexdigest())
+            checksum_file = checksumfile.read_checksum_file(os.path.join(temp_dir, "checksums.txt"))
+            self.assertEqual(sorted(checksum_file.file_checksums["f.txt"].keys()), ["blake2b", "blake2b_256"])
+            self.assertTrue(verify.verify_checksums(checksum_file, temp_dir, exclude=("checksums.txt", "B2SUMS")).success)
+            checksum_file = checksumfile.read_checksum_file(os.path.join(temp_dir, "B2SUMS"))
+            self.assertEqual(list(checksum_file.file_checksums["f.txt"].keys()), ["blake2b_160"])
+            self.assertTrue(verify.verify_checksums(checksum_file, temp_dir, exclude=("checksums.txt", "B2SUMS")).success)
+
+    def test_sfv_checksum_file_can_be_read(self):
+        with tempfile.TemporaryDirectory("w") as temp_dir:
+            with open(os.path.join(temp_dir, "checksums.sfv"), "w") as temp_file:
+                temp_file.write("; Generated by some tool\n")
+                temp_file.write("empty.txt 00000000\n")
+                temp_file.write("dir\\some bytes.dat 29058C73\n")
+            checksum_file = checksumfile.read_checksum_file(os.path.join(temp_dir, "checksums.sfv"))
+            self.assertEqual(checksum_file.type, "SFV")
+            self.assertEqual(checksum_file.file_checksums["empty.txt"], {"crc32": "00000000"})
+            self.assertEqual(checksum_file.file_checksums["dir/some bytes.dat"], {"crc32": "29058c73"})
+
+    def test_veepiaci_checksum_file_can_be_read(self):
+        with tempfile.TemporaryDirectory("w") as temp_dir:
+            with open(os.path.join(temp_dir, "checksums.txt"), "w", encoding="utf-8") as temp_file:
+                temp_file.write("# Veepiaci checksum file\n")
+                temp_file.write("# fields: md5 crc32\n")
+                temp_file.write("d41d8cd98f00b204e9800998ecf8427e 00000000 empty file.txt\n")
+                temp_file.write("e2c865db4162bed963bfaa9ef6ac18f0 - dir/ümläut.dat\n")
+            checksum_file = checksumfile.read_checksum_file(os.path.join(temp_dir, "checksums.txt"))
+            self.assertEqual(checksum_file.type, "Veepiaci")
+            self.assertEqual(checksum_file.file_checksums["empty file.txt"], {"md5": "d41d8cd98f00b204e9800998ecf8427e", "crc32": "00000000"})
+            self.assertEqual(checksum_file.file_checksums["dir/ümläut.dat"], {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"})
+
+    def test_veepiaci_checksum_files_record_sizes(self):
+        with tempfile.TemporaryDirectory("w") as temp_dir:
+            file_name = os.path.join(temp_dir, "checksums.txt")
+            with checksumfile.create_checksum_file_writer(file_name, "Veepiaci", ("md5",)) as writer:
+                writer.write_entry("empty.txt", {"md5": "d41d8cd98f00b204e9800998ecf8427e"}, 0)
+                writer.write_entry("unknown.txt", {"md5": "d41d8cd98f00b204e9800998ecf8427e"})
+            checksum_file = checksumfile.read_checksum_file(file_name)
+            self.assertEqual(checksum_file.file_checksums["empty.txt"], {"md5": "d41d8cd98f00b204e9800998ecf8427e"})
+            self.assertEqual(dict(checksum_file.file_sizes), {"empty.txt": 0})
+
+    def test_reader_yields_entries_lazily(self):
+        with tempfile.TemporaryDirectory("w") as temp_dir:
+            with open(os.path.join(temp_dir, "checksums.md5"), "w") as temp_file:
+                for index in range(1000):
+                    temp_file.write("d41d8cd98f00b204e9800998ecf8427e  file-%d.txt\n" % index)
+            reader = checksumfile.ChecksumFileReader(os.path.join(temp_dir, "checksums.md5"))
+            entries = iter(reader)
+            self.assertEqual(next(entries), ("file-0.txt", {"md5": "d41d8cd98f00b204e9800998ecf8427e"}))
+            self.assertEqual(sum(1 for _ in entries), 999)
+
+    def test_unknown_format_is_rejected(self):
+        with tempfile.TemporaryDirectory("w") as temp_dir:
+            with open(os.path.join(temp_dir, "checksums.txt"), "w") as temp_file:
+                temp_file.write("this is not a checksum file\n")
+            with self.assertRaises(ValueError):
+                checksumfile.read_checksum_file(os.path.join(temp_dir, "checksums.txt"))
+
+    def test_compact_checksums_behave_like_a_dictionary(self):
+        file_checksums = {"empty.txt": {"md5": "d41d8cd98f00b204e9800998ecf8427e"}, "dir/ümläut.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0", "crc32": "29058c73"}}
+        compact_checksums = checksumfile.CompactChecksums(file_checksums)
+        self.assertEqual(len(compact_checksums), 2)
+        self.assertEqual(list(compact_checksums), ["empty.txt", "dir/ümläut.dat"])
+        self.assertIn("dir/ümläut.dat", compact_checksums)
+        self.assertNotIn("dir/empty.txt", compact_checksums)
+        self.assertEqual(compact_checksums["dir/ümläut.dat"], file_checksums["dir/ümläut.dat"])
+        self.assertEqual(list(compact_checksums["empty.txt"].keys()), ["md5"])
+        with self.assertRaises(KeyError):
+            compact_checksums["empty.txt"]["crc32"]
+
+    def test_compact_checksums_merge_checksums_for_the_same_path(self):
+        compact_checksums = checksumfile.CompactChecksums()
+        compact_checksums.add("file.dat", {"md5": "d41d8cd98f00b204e9800998ecf8427e"})
+        compact_checksums.add("file.dat", {"crc32": "00000000"})
+        self.assertEqual(len(compact_checksums), 1)
+        self.assertEqual(compact_checksums["file.dat"], {"md5": "d41d8cd98f00b204e9800998ecf8427e", "crc32": "00000000"})
+
+    def test_compact_checksums_find_all_of_many_entries(self):
+        compact_checksums = checksumfile.CompactChecksums()
+        for index in range(5000):
+            compact_checksums.add("directory-%d/file-%d.dat" % (index % 7, index), {"crc32": "%08x" % index})
+        self.assertEqual(len(compact_checksums), 5000)
+        self.assertTrue(all(compact_checksums["directory-%d/file-%d.dat" % (index % 7, index)]["crc32"] == "%08x" % index for index in range(5000)))
+
+    def test_compact_checksums_reject_digests_of_the_wrong_size(self):
+        compact_checksums = checksumfile.CompactChecksums({"file.dat": {"md5": "d41d8cd98f00b204e9800998ecf8427e"}})
+        with self.assertRaises(ValueError):
+            compact_checksums.add("other.dat", {"md5": "d41d8cd9"})
+
 if __name__ == '__main__':
     unittest.main()
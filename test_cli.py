@@ -0,0 +1,99 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import cli
+
+
+def create_file_with_data(temp_directory, filename="data.dat", content=bytes(range(256))):
+    with open(os.path.join(temp_directory, filename), "wb") as file:
+        file.write(content)
+
+
+def run_cli(*argv):
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        exit_code = cli.main(list(argv))
+    return exit_code, stdout.getvalue(), stderr.getvalue()
+
+
+class CliTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.temp_directory.name, "files")
+        os.mkdir(self.directory)
+        create_file_with_data(self.directory)
+        create_file_with_data(self.directory, "other.dat", b"other")
+        self.checksum_file = os.path.join(self.temp_directory.name, "checksums.txt")
+
+    def tearDown(self):
+        self.temp_directory.cleanup()
+
+    def create(self, *arguments):
+        return run_cli("create", self.directory, self.checksum_file, "--algorithms", "md5,sha1", *arguments)
+
+    def test_created_checksum_file_verifies_successfully(self):
+        (exit_code, stdout, _) = self.create()
+        self.assertEqual(exit_code, cli.EXIT_SUCCESS)
+        self.assertIn("2 files", stdout)
+        (exit_code, stdout, stderr) = run_cli("verify", self.checksum_file, self.directory)
+        self.assertEqual(exit_code, cli.EXIT_SUCCESS)
+        self.assertTrue(stdout.startswith("success: 2 files verified"))
+        self.assertIn("2/2 files", stderr)
+
+    def test_exit_code_tells_the_outcome(self):
+        self.create()
+        create_file_with_data(self.directory, "additional.dat")
+        self.assertEqual(run_cli("verify", "-q", self.checksum_file, self.directory)[0], cli.EXIT_ADDITIONAL)
+        os.remove(os.path.join(self.directory, "other.dat"))
+        self.assertEqual(run_cli("verify", "-q", self.checksum_file, self.directory)[0], cli.EXIT_MISSING)
+        create_file_with_data(self.directory, content=b"changed")
+        (exit_code, stdout, stderr) = run_cli("verify", "-q", self.checksum_file, self.directory)
+        self.assertEqual(exit_code, cli.EXIT_MISMATCH)
+        self.assertEqual(stdout.splitlines()[:3], ["MISMATCH data.dat", "MISSING other.dat", "ADDITIONAL additional.dat"])
+        self.assertEqual(stderr, "")
+
+    def test_report_is_written_in_the_requested_format(self):
+        self.create()
+        report_file = os.path.join(self.temp_directory.name, "report.txt")
+        run_cli("verify", "-q", "--report", report_file, "--report-format", "JSONL", self.checksum_file, self.directory)
+        with open(report_file, encoding="utf-8") as file:
+            self.assertTrue(file.readline().startswith('{"type":"header"'))
+
+    def test_errors_are_reported_with_an_exit_code(self):
+        (exit_code, _, stderr) = run_cli("verify", os.path.join(self.temp_directory.name, "missing.txt"), self.directory)
+        self.assertEqual(exit_code, cli.EXIT_ERROR)
+        self.assertIn("veepiaci: error:", stderr)
+        self.assertEqual(self.create("--algorithms", "md4")[0], cli.EXIT_ERROR)
+
+    def test_batch_verifies_every_checksum_file_below_a_root(self):
+        self.create()
+        other_directory = os.path.join(self.temp_directory.name, "other")
+        os.mkdir(other_directory)
+        create_file_with_data(other_directory)
+        other_checksum_file = os.path.join(self.temp_directory.name, "other.txt")
+        run_cli("create", "-q", other_directory, other_checksum_file)
+        create_file_with_data(other_directory, content=b"changed")
+        (exit_code, stdout, _) = run_cli("batch", "-q", "--job", self.checksum_file, self.directory, "--job", other_checksum_file, other_directory)
+        self.assertEqual(exit_code, cli.EXIT_MISMATCH)
+        self.assertIn("MISMATCH " + os.path.join(other_directory, "data.dat"), stdout)
+        self.assertIn("failure: 2 checksum files, 3 files verified, 1 mismatches", stdout)
+        self.assertEqual(run_cli("batch", "-q", self.directory)[0], cli.EXIT_ERROR)
+
+    def test_command_line_interface_does_not_import_qt(self):
+        # PySide6 is made unimportable, so any attempt to import it fails the run
+        script = ("import sys; sys.modules['PySide6'] = None; import veepiaci; "
+                  "sys.exit(veepiaci.main(['create', '-q', sys.argv[1], sys.argv[2]]))")
+        process = subprocess.run([sys.executable, "-c", script, self.directory, self.checksum_file], cwd=os.path.dirname(os.path.abspath(cli.__file__)),
+                                 capture_output=True, text=True)
+        self.assertEqual(process.returncode, cli.EXIT_SUCCESS, process.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import engine
+import hash
+import verify
+from checksumfile import ChecksumFile
+from control import Cancelled, RunControl
+
+
+def create_file_with_data(temp_directory, filename="data.dat", size=256):
+    with open(os.path.join(temp_directory, filename), "wb") as file:
+        file.write(bytes(index % 256 for index in range(size)))
+
+
+class RunControlTest(unittest.TestCase):
+
+    def test_checkpoint_raises_once_cancelled(self):
+        control = RunControl()
+        control.checkpoint()
+        control.cancel()
+        with self.assertRaises(Cancelled):
+            control.checkpoint()
+
+    def test_checkpoint_waits_while_paused(self):
+        control = RunControl()
+        control.pause()
+        passed = threading.Event()
+        thread = threading.Thread(target=lambda: (control.checkpoint(), passed.set()))
+        thread.start()
+        self.assertFalse(passed.wait(0.1))
+        control.resume()
+        self.assertTrue(passed.wait(5))
+        thread.join()
+
+    def test_cancelling_wakes_up_a_paused_run(self):
+        control = RunControl()
+        control.pause()
+        threading.Timer(0.05, control.cancel).start()
+        with self.assertRaises(Cancelled):
+            control.checkpoint()
+
+    def test_hashing_a_file_is_cancelled_between_blocks(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_file_with_data(temp_directory, size=4096)
+            control = RunControl()
+            blocks = []
+            original_checkpoint = control.checkpoint
+
+            def checkpoint():
+                blocks.append(None)
+                if len(blocks) == 2:
+                    control.cancel()
+                original_checkpoint()
+
+            control.checkpoint = checkpoint
+            with self.assertRaises(Cancelled):
+                hash.create_hash(os.path.join(temp_directory, "data.dat"), block_size=1024, strategy="buffered", control=control)
+            self.assertEqual(len(blocks), 2)
+
+    def test_hash_files_stops_when_cancelled(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            jobs = []
+            for index in range(20):
+                create_file_with_data(temp_directory, "file-%d.dat" % index)
+                jobs.append(engine.HashJob("file-%d.dat" % index, os.path.join(temp_directory, "file-%d.dat" % index)))
+            control = RunControl()
+            results = []
+            with self.assertRaises(Cancelled):
+                for result in engine.hash_files(jobs, workers=2, control=control):
+                    results.append(result)
+                    control.cancel()
+            self.assertEqual(len(results), 1)
+
+
+class VerificationControlTest(unittest.TestCase):
+
+    def test_cancelled_verification_returns_an_incomplete_result(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            for index in range(10):
+                create_file_with_data(temp_directory, "file-%d.dat" % index)
+            checksum_file = ChecksumFile("test", {"file-%d.dat" % index: {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"} for index in range(10)})
+            control = RunControl()
+            finished = []
+            result = verify.verify_checksums(checksum_file, temp_directory, workers=1, control=control, on_file_hashed=lambda file, hashes, correct: control.cancel(),
+                                             on_finished=finished.append)
+        self.assertFalse(result.complete)
+        self.assertFalse(result.success)
+        self.assertEqual(result.statistics.processed_files, 1)
+        self.assertEqual(finished, [result])
+
+    def test_fail_fast_stops_at_the_first_mismatch(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            for index in range(10):
+                create_file_with_data(temp_directory, "file-%d.dat" % index)
+            checksum_file = ChecksumFile("test", {"file-%d.dat" % index: {"md5": "0" * 32} for index in range(10)})
+            result = verify.verify_checksums(checksum_file, temp_directory, workers=1, fail_fast=True)
+        self.assertFalse(result.complete)
+        self.assertEqual(len(result.mismatches), 1)
+
+    def test_fail_fast_stops_before_hashing_when_files_are_missing(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_file_with_data(temp_directory)
+            hashed_files = []
+            checksum_file = ChecksumFile("test", {"data.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}, "missing.dat": {"md5": "0" * 32}})
+            result = verify.verify_checksums(checksum_file, temp_directory, fail_fast=True, on_file_hashed=lambda file, hashes, correct: hashed_files.append(file))
+        self.assertFalse(result.complete)
+        self.assertEqual(result.missing_files, ["missing.dat"])
+        self.assertEqual(hashed_files, [])
+
+    def test_fail_fast_verifies_everything_when_all_files_match(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_file_with_data(temp_directory)
+            result = verify.verify_checksums(ChecksumFile("test", {"data.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}}), temp_directory, fail_fast=True)
+        self.assertTrue(result.complete)
+        self.assertTrue(result.success)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+import checksumfile
+import create
+import verify
+
+
+def create_file_with_data(temp_directory, filename="data.dat"):
+    os.makedirs(os.path.dirname(os.path.join(temp_directory, filename)), exist_ok=True)
+    with open(os.path.join(temp_directory, filename), "wb") as file:
+        file.write(bytearray(range(256)))
+
+
+class CreateTest(unittest.TestCase):
+
+    def test_created_checksum_file_contains_all_files_and_algorithms(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as output_directory:
+            create_file_with_data(temp_directory)
+            create_file_with_data(temp_directory, "sub directory/ümläut.dat")
+            output = os.path.join(output_directory, "checksums.txt")
+            result = create.create_checksums(temp_directory, ("md5", "sha256"), output, workers=4)
+            self.assertEqual(result.files, 2)
+            checksum_file = checksumfile.read_checksum_file(output)
+            self.assertEqual(checksum_file.type, "Veepiaci")
+            self.assertEqual(checksum_file.file_checksums["sub directory/ümläut.dat"], {"md5": "e2c865db4162bed963bfaa9ef6ac18f0", "sha256": "40aff2e9d2d8922e47afd4648e6967497158785fbd1da870e7110266bf944880"})
+            self.assertEqual(checksum_file.file_sizes["sub directory/ümläut.dat"], 256)
+            self.assertTrue(verify.verify_checksums(checksum_file, temp_directory).success)
+
+    def test_created_checksum_file_does_not_contain_itself(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_file_with_data(temp_directory)
+            output = os.path.join(temp_directory, "checksums.txt")
+            create.create_checksums(temp_directory, ("md5",), output)
+            checksum_file = checksumfile.read_checksum_file(output)
+            self.assertEqual(list(checksum_file.file_checksums.keys()), ["data.dat"])
+
+    def test_ultra_iso_and_gnu_checksum_files_can_be_created(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as output_directory:
+            create_file_with_data(temp_directory, "first/data.dat")
+            create_file_with_data(temp_directory, "back\\slash.dat")
+            for (format, algorithm) in (("UltraISO", "md5"), ("GNU", "sha1")):
+                output = os.path.join(output_directory, format + ".txt")
+                create.create_checksums(temp_directory, (algorithm,), output, format=format)
+                checksum_file = checksumfile.read_checksum_file(output, algorithm if format == "GNU" else None)
+                self.assertEqual(checksum_file.type, format)
+                self.assertIn("first/data.dat", checksum_file.file_checksums)
+                if format == "GNU":
+                    self.assertTrue(verify.verify_checksums(checksum_file, temp_directory).success)
+
+    def test_ultra_iso_checksum_files_only_contain_md5(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as output_directory:
+            with self.assertRaises(ValueError):
+                create.create_checksums(temp_directory, ("sha1",), os.path.join(output_directory, "checksums.md5"), format="UltraISO")
+
+    def test_file_names_are_checked_before_the_checksum_file_is_written(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as output_directory:
+            create_file_with_data(temp_directory, "a.dat")
+            create_file_with_data(temp_directory, "日本語.dat")
+            output = os.path.join(output_directory, "checksums.md5")
+            with self.assertRaisesRegex(ValueError, "windows-1252"):
+                create.create_checksums(temp_directory, ("md5",), output, format="UltraISO")
+            self.assertFalse(os.path.exists(output))
+            with self.assertRaises(ValueError):
+                create.create_checksums(temp_directory, ("sha3_256", "blake2b"), output, format="GNU", on_started=self.fail)
+            self.assertFalse(os.path.exists(output))
+
+    def test_samples_can_only_be_recorded_in_veepiaci_checksum_files(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as output_directory:
+            with self.assertRaises(ValueError):
+                create.create_checksums(temp_directory, ("sample",), os.path.join(output_directory, "checksums.md5"), format="GNU")
+
+    def test_create_calls_event_handlers(self):
+        events = []
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as output_directory:
+            create_file_with_data(temp_directory)
+            create.create_checksums(temp_directory, ("md5",), os.path.join(output_directory, "checksums.txt"), on_started=lambda d: events.append("start"),
+                                    on_file_hashed=lambda f, h, c: events.append((f, h, c)), on_finished=lambda r: events.append(r.files))
+        self.assertEqual(events, ["start", ("data.dat", {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}, True), 1])
+
+    def test_create_reports_byte_progress(self):
+        progress = []
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as output_directory:
+            create_file_with_data(temp_directory)
+            create_file_with_data(temp_directory, "sub/other.dat")
+            result = create.create_checksums(temp_directory, ("md5",), os.path.join(output_directory, "checksums.txt"), on_progress=progress.append)
+        self.assertEqual([(p.processed_files, p.processed_bytes, p.total_bytes) for p in progress], [(0, 0, 512), (1, 256, 512), (2, 512, 512)])
+        self.assertIsNone(result.statistics.phase)
+        self.assertIn("hash", result.statistics.phase_seconds)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import engine
+import iosched
+from control import Cancelled, RunControl
+
+
+def create_jobs(temp_directory, count):
+    jobs = []
+    for index in range(count):
+        file_name = os.path.join(temp_directory, "file-%d.dat" % index)
+        with open(file_name, "wb") as file:
+            file.write(bytes(range(index % 256)))
+        jobs.append(engine.HashJob("file-%d.dat" % index, file_name, ("md5", "sha3_256")))
+    return jobs
+
+
+class EngineTest(unittest.TestCase):
+
+    def test_hash_files_yields_a_result_for_every_job(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            jobs = []
+            for index in range(50):
+                file_name = os.path.join(temp_directory, "file-%d.dat" % index)
+                with open(file_name, "wb") as file:
+                    file.write(bytearray(range(256)) if index % 2 else b"")
+                jobs.append(engine.HashJob("file-%d.dat" % index, file_name))
+            results = {job.key: hashes["md5"] for (job, hashes) in engine.hash_files(jobs, workers=4)}
+        self.assertEqual(len(results), 50)
+        self.assertEqual(results["file-0.dat"], "d41d8cd98f00b204e9800998ecf8427e")
+        self.assertEqual(results["file-1.dat"], "e2c865db4162bed963bfaa9ef6ac18f0")
+
+    def test_hash_files_yields_nothing_for_no_jobs(self):
+        self.assertEqual(list(engine.hash_files([], workers=2)), [])
+
+    def test_hash_files_propagates_errors_from_hashing(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            jobs = [engine.HashJob("missing.dat", os.path.join(temp_directory, "missing.dat"))]
+            with self.assertRaises(FileNotFoundError):
+                list(engine.hash_files(jobs, workers=2))
+
+    def test_all_backends_yield_the_same_hashes(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            jobs = create_jobs(temp_directory, 150)
+            expected = {job.key: hashes for (job, hashes) in engine.hash_files(jobs, workers=2)}
+            for backend in ("serial", "processes", "auto"):
+                with self.subTest(backend=backend):
+                    jobs = create_jobs(temp_directory, 150)
+                    results = {job.key: hashes for (job, hashes) in engine.hash_files(jobs, workers=2, backend=backend)}
+                    self.assertEqual(results, expected)
+                    self.assertTrue(all(job.timings is not None for job in jobs))
+
+    def test_processes_backend_propagates_errors_from_hashing(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            jobs = [engine.HashJob("missing.dat", os.path.join(temp_directory, "missing.dat"))]
+            with self.assertRaises(FileNotFoundError):
+                list(engine.hash_files(jobs, workers=2, backend="processes"))
+
+    def test_errors_can_be_handled_without_stopping_the_other_files(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            for backend in ("serial", "threads", "processes"):
+                with self.subTest(backend=backend):
+                    jobs = create_jobs(temp_directory, 10) + [engine.HashJob("missing.dat", os.path.join(temp_directory, "missing.dat"))]
+                    errors = []
+                    results = list(engine.hash_files(jobs, workers=2, backend=backend, on_error=lambda job, error: errors.append((job.key, type(error)))))
+                    self.assertEqual(len(results), 10)
+                    self.assertEqual(errors, [("missing.dat", FileNotFoundError)])
+
+    def test_processes_backend_can_be_cancelled(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            control = RunControl()
+            results = []
+            with self.assertRaises(Cancelled):
+                for result in engine.hash_files(create_jobs(temp_directory, 200), workers=2, control=control, backend="processes"):
+                    results.append(result)
+                    control.cancel()
+            self.assertEqual(len(results), 1)
+
+    def test_frozen_executables_hash_on_threads_until_freeze_support_is_called(self):
+        with tempfile.TemporaryDirectory() as temp_directory, mock.patch.object(sys, "frozen", True, create=True), \
+                mock.patch.object(engine, "_freeze_support_called", False), mock.patch.object(engine, "_hash_files_in_processes") as in_processes:
+            results = list(engine.hash_files(create_jobs(temp_directory, 10), workers=2, backend="processes"))
+        self.assertEqual(len(results), 10)
+        in_processes.assert_not_called()
+
+    def test_unknown_backends_are_rejected(self):
+        with self.assertRaises(ValueError):
+            list(engine.hash_files([], backend="fibers"))
+
+    def test_batches_are_limited_by_files_and_bytes(self):
+        small_jobs = iosched.FifoScheduler(engine.HashJob(str(index), "", size=10) for index in range(100))
+        self.assertEqual(len(engine._next_batch(small_jobs)), engine.BATCH_FILES)
+        large_jobs = iosched.FifoScheduler(engine.HashJob(str(index), "", size=engine.BATCH_BYTES // 2) for index in range(10))
+        self.assertEqual(len(engine._next_batch(large_jobs)), 2)
+
+    def test_choose_backend_returns_a_concrete_backend(self):
+        self.assertIn(engine.choose_backend(("md5", "sha3_256")), ("serial", "threads", "processes"))
+
+
+if __name__ == '__main__':
+    unittest.main()
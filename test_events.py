@@ -0,0 +1,58 @@
+import time
+import unittest
+
+from events import EventCoalescer, VerificationCounters
+from progress import VerificationProgress
+
+
+class EventCoalescerTest(unittest.TestCase):
+
+    def test_events_are_passed_on_in_batches_of_the_given_size(self):
+        batches = []
+        coalescer = EventCoalescer(lambda events, counters: batches.append(events), interval=60, batch_size=3)
+        for index in range(7):
+            coalescer.on_file_hashed("file-%d" % index, {}, True)
+        self.assertEqual([len(batch) for batch in batches], [3, 3])
+        coalescer.close()
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        self.assertEqual([event[0] for batch in batches for event in batch], ["file-%d" % index for index in range(7)])
+
+    def test_events_are_passed_on_after_the_interval(self):
+        batches = []
+        coalescer = EventCoalescer(lambda events, counters: batches.append(events), interval=0.01, batch_size=1000)
+        coalescer.on_file_hashed("file", {}, True)
+        deadline = time.monotonic() + 5
+        while not batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(batches, [[("file", {}, True)]])
+        coalescer.close()
+        self.assertEqual(len(batches), 1)
+
+    def test_batches_carry_aggregated_counters(self):
+        counters = []
+        coalescer = EventCoalescer(lambda events, batch_counters: counters.append(batch_counters), interval=60, batch_size=2)
+        coalescer.on_file_hashed("first", {}, True)
+        coalescer.on_progress(VerificationProgress(processed_bytes=100))
+        coalescer.on_file_hashed("second", {}, False)
+        coalescer.on_progress(VerificationProgress(processed_bytes=200))
+        coalescer.on_file_hashed("third", {}, False)
+        coalescer.on_progress(VerificationProgress(processed_bytes=300))
+        coalescer.close()
+        self.assertEqual(counters, [VerificationCounters(2, 100, 1), VerificationCounters(3, 300, 2)])
+
+    def test_only_the_latest_progress_is_passed_on(self):
+        progress_events = []
+        coalescer = EventCoalescer(lambda events, counters: None, interval=60, on_progress_batch=progress_events.append)
+        for processed_files in range(10):
+            coalescer.on_progress(VerificationProgress(processed_files=processed_files))
+        coalescer.close()
+        self.assertEqual([progress.processed_files for progress in progress_events], [9])
+
+    def test_closing_without_events_does_not_pass_on_an_empty_batch(self):
+        batches = []
+        EventCoalescer(lambda events, counters: batches.append(events)).close()
+        self.assertEqual(batches, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
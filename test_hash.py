@@ -1,6 +1,8 @@
+import hashlib
 import unittest
 import os
 import tempfile
+import time
 import hash
 
 class TestHashMethods(unittest.TestCase):
@@ -29,5 +31,57 @@ class TestHashMethods(unittest.TestCase):
             created_hash = hash.create_hash(f)
             self.assertEqual(created_hash["md5"], "e2c865db4162bed963bfaa9ef6ac18f0")
 
+    def test_all_requested_hashes_are_created_from_a_single_read(self):
+        with tempfile.TemporaryDirectory() as t:
+            f = os.path.join(t, "data_file")
+            with open(f, "wb") as temp_file:
+                temp_file.write(bytearray(range(256)))
+            created_hash = hash.create_hash(f, ("md5", "sha1", "sha256", "sha3_256", "blake2b"))
+            self.assertEqual(created_hash["md5"], "e2c865db4162bed963bfaa9ef6ac18f0")
+            self.assertEqual(created_hash["sha1"], "4916d6bdb7f78e6803698cab32d1586ea457dfc8")
+            self.assertEqual(created_hash["sha256"], "40aff2e9d2d8922e47afd4648e6967497158785fbd1da870e7110266bf944880")
+            self.assertEqual(created_hash["sha3_256"], hashlib.sha3_256(bytearray(range(256))).hexdigest())
+            self.assertEqual(created_hash["blake2b"], hashlib.blake2b(bytearray(range(256))).hexdigest())
+
+    def test_only_requested_hashes_are_created(self):
+        with tempfile.TemporaryDirectory() as t:
+            f = os.path.join(t, "empty_file")
+            with open(f, "w"):
+                pass
+            created_hash = hash.create_hash(f, ("sha1",))
+            self.assertEqual(created_hash, {"sha1": "da39a3ee5e6b4b0d3255bfef95601890afd80709"})
+
+    def test_unsupported_algorithm_is_rejected(self):
+        with tempfile.TemporaryDirectory() as t:
+            f = os.path.join(t, "empty_file")
+            with open(f, "w"):
+                pass
+            with self.assertRaises(ValueError):
+                hash.create_hash(f, ("md4-but-broken",))
+
+    def test_time_spent_reading_and_hashing_is_recorded(self):
+        with tempfile.TemporaryDirectory() as t:
+            f = os.path.join(t, "data_file")
+            with open(f, "wb") as temp_file:
+                temp_file.write(bytearray(range(256)) * 1024)
+            timings = hash.HashTimings()
+            created_hash = hash.create_hash(f, ("sha256",), 4096, timings=timings)
+            self.assertEqual(created_hash, hash.create_hash(f, ("sha256",)))
+            self.assertGreater(timings.read_seconds, 0)
+            self.assertGreater(timings.hash_seconds, 0)
+
+    def test_time_spent_paused_is_not_recorded(self):
+        class SlowControl:
+            def checkpoint(self):
+                time.sleep(0.05)
+
+        with tempfile.TemporaryDirectory() as t:
+            f = os.path.join(t, "data_file")
+            with open(f, "wb") as temp_file:
+                temp_file.write(bytes(4 * 4096))
+            timings = hash.HashTimings()
+            hash.create_hash(f, ("sha256",), 4096, "buffered", timings=timings, control=SlowControl())
+            self.assertLess(timings.read_seconds + timings.hash_seconds, 0.05)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import time
+import unittest
+
+from hashcache import HashCache
+
+
+def create_old_file(temp_directory, filename="data.dat", content=b"data"):
+    file_name = os.path.join(temp_directory, filename)
+    with open(file_name, "wb") as file:
+        file.write(content)
+    os.utime(file_name, (time.time() - 3600, time.time() - 3600))
+    return file_name
+
+
+class HashCacheTest(unittest.TestCase):
+
+    def test_stored_hashes_are_returned_for_an_unchanged_file(self):
+        with tempfile.TemporaryDirectory() as temp_directory, HashCache(os.path.join(temp_directory, "cache.sqlite")) as cache:
+            file_name = create_old_file(temp_directory)
+            cache.store(file_name, os.stat(file_name), {"md5": "1", "sha1": "2"})
+            self.assertEqual(cache.lookup(file_name, os.stat(file_name), ("md5",)), {"md5": "1"})
+            self.assertEqual(cache.lookup(file_name, os.stat(file_name), ("md5", "sha1")), {"md5": "1", "sha1": "2"})
+
+    def test_lookup_misses_when_an_algorithm_is_not_cached(self):
+        with tempfile.TemporaryDirectory() as temp_directory, HashCache(os.path.join(temp_directory, "cache.sqlite")) as cache:
+            file_name = create_old_file(temp_directory)
+            cache.store(file_name, os.stat(file_name), {"md5": "1"})
+            self.assertIsNone(cache.lookup(file_name, os.stat(file_name), ("md5", "sha1")))
+
+    def test_lookup_misses_when_the_file_has_changed(self):
+        with tempfile.TemporaryDirectory() as temp_directory, HashCache(os.path.join(temp_directory, "cache.sqlite")) as cache:
+            file_name = create_old_file(temp_directory)
+            cache.store(file_name, os.stat(file_name), {"md5": "1"})
+            create_old_file(temp_directory, content=b"changed data")
+            self.assertIsNone(cache.lookup(file_name, os.stat(file_name), ("md5",)))
+
+    def test_recently_modified_files_are_not_cached(self):
+        with tempfile.TemporaryDirectory() as temp_directory, HashCache(os.path.join(temp_directory, "cache.sqlite")) as cache:
+            file_name = os.path.join(temp_directory, "new.dat")
+            with open(file_name, "wb") as file:
+                file.write(b"data")
+            cache.store(file_name, os.stat(file_name), {"md5": "1"})
+            self.assertIsNone(cache.lookup(file_name, os.stat(file_name), ("md5",)))
+
+    def test_cache_persists_across_instances(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = create_old_file(temp_directory)
+            with HashCache(os.path.join(temp_directory, "cache.sqlite")) as cache:
+                cache.store(file_name, os.stat(file_name), {"md5": "1"})
+            with HashCache(os.path.join(temp_directory, "cache.sqlite")) as cache:
+                self.assertEqual(cache.lookup(file_name, os.stat(file_name), ("md5",)), {"md5": "1"})
+
+    def test_oldest_entries_are_evicted_beyond_the_maximum_number_of_entries(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_names = [create_old_file(temp_directory, "data-%d.dat" % index) for index in range(3)]
+            with HashCache(os.path.join(temp_directory, "cache.sqlite"), max_entries=2) as cache:
+                for file_name in file_names:
+                    cache.store(file_name, os.stat(file_name), {"md5": file_name})
+                    time.sleep(0.01)
+            with HashCache(os.path.join(temp_directory, "cache.sqlite")) as cache:
+                self.assertEqual([cache.lookup(file_name, os.stat(file_name), ("md5",)) is not None for file_name in file_names], [False, True, True])
+
+    def test_entries_older_than_the_maximum_age_are_evicted(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_name = create_old_file(temp_directory)
+            with HashCache(os.path.join(temp_directory, "cache.sqlite"), max_age=0) as cache:
+                cache.store(file_name, os.stat(file_name), {"md5": "1"})
+            with HashCache(os.path.join(temp_directory, "cache.sqlite")) as cache:
+                self.assertIsNone(cache.lookup(file_name, os.stat(file_name), ("md5",)))
+
+
+if __name__ == '__main__':
+    unittest.main()
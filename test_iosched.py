@@ -0,0 +1,122 @@
+import collections
+import os
+import tempfile
+import threading
+import unittest
+
+import engine
+import iosched
+from engine import HashJob
+
+
+def create_sys_block_device(sys_root, device, rotational, partition=None):
+    disk_directory = os.path.join(sys_root, "devices", "disk")
+    os.makedirs(os.path.join(disk_directory, "queue"), exist_ok=True)
+    with open(os.path.join(disk_directory, "queue", "rotational"), "w") as file:
+        file.write("1\n" if rotational else "0\n")
+    os.makedirs(os.path.join(sys_root, "dev", "block"), exist_ok=True)
+    target = disk_directory
+    if partition is not None:
+        target = os.path.join(disk_directory, partition)
+        os.makedirs(target)
+    os.symlink(target, os.path.join(sys_root, "dev", "block", "%d:%d" % (os.major(device), os.minor(device))))
+
+
+class IoSchedulerTest(unittest.TestCase):
+
+    def test_files_of_a_device_are_read_in_inode_order(self):
+        jobs = [HashJob("c", "c", device=1, inode=30), HashJob("a", "a", device=1, inode=10), HashJob("b", "b", device=1, inode=20)]
+        scheduler = iosched.IoScheduler(jobs, concurrency=lambda device: None)
+        self.assertEqual([scheduler.next_job().key for _ in range(3)], ["a", "b", "c"])
+        self.assertIsNone(scheduler.next_job())
+
+    def test_devices_take_turns(self):
+        jobs = [HashJob("1a", "", device=1, inode=1), HashJob("1b", "", device=1, inode=2), HashJob("2a", "", device=2, inode=1), HashJob("2b", "", device=2, inode=2)]
+        scheduler = iosched.IoScheduler(jobs, concurrency=lambda device: None)
+        self.assertEqual([scheduler.next_job().key for _ in range(4)], ["1a", "2a", "1b", "2b"])
+
+    def test_devices_are_not_read_beyond_their_concurrency(self):
+        jobs = [HashJob("hdd-%d" % index, "", device=1, inode=index) for index in range(3)] + [HashJob("ssd-%d" % index, "", device=2, inode=index) for index in range(3)]
+        scheduler = iosched.IoScheduler(jobs, concurrency=lambda device: 1 if device == 1 else None)
+        started = [scheduler.next_job() for _ in range(4)]
+        self.assertEqual([job.key for job in started], ["hdd-0", "ssd-0", "ssd-1", "ssd-2"])
+        self.assertIsNone(scheduler.next_job())
+        scheduler.job_done(started[0])
+        self.assertEqual(scheduler.next_job().key, "hdd-1")
+        self.assertEqual(len(scheduler), 1)
+
+    def test_hash_files_respects_the_concurrency_of_devices(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            jobs = []
+            for index in range(40):
+                file_name = os.path.join(temp_directory, "file-%d.dat" % index)
+                with open(file_name, "wb") as file:
+                    file.write(bytes(range(256)))
+                jobs.append(HashJob("file-%d.dat" % index, file_name, device=index % 2, inode=index))
+            lock = threading.Lock()
+            active = {0: 0, 1: 0}
+            maximum = {0: 0, 1: 0}
+            scheduler = iosched.IoScheduler(jobs, concurrency=lambda device: 1 if device == 0 else None)
+            original_next_job = scheduler.next_job
+            original_job_done = scheduler.job_done
+
+            def next_job():
+                job = original_next_job()
+                if job is not None:
+                    with lock:
+                        active[job.device] += 1
+                        maximum[job.device] = max(maximum[job.device], active[job.device])
+                return job
+
+            def job_done(job):
+                with lock:
+                    active[job.device] -= 1
+                original_job_done(job)
+
+            scheduler.next_job = next_job
+            scheduler.job_done = job_done
+            results = list(engine.hash_files(scheduler, workers=4))
+        self.assertEqual(len(results), 40)
+        self.assertEqual(maximum[0], 1)
+        self.assertGreater(maximum[1], 1)
+
+    @unittest.skipUnless(hasattr(os, "major"), "device numbers cannot be split on this platform")
+    def test_rotational_devices_are_detected_from_sysfs(self):
+        with tempfile.TemporaryDirectory() as sys_root:
+            hdd = os.makedev(8, 0)
+            create_sys_block_device(os.path.join(sys_root, "hdd"), hdd, True)
+            create_sys_block_device(os.path.join(sys_root, "partition"), os.makedev(8, 1), True, partition="sda1")
+            create_sys_block_device(os.path.join(sys_root, "ssd"), os.makedev(259, 0), False)
+            self.assertTrue(iosched.is_rotational(hdd, os.path.join(sys_root, "hdd")))
+            self.assertTrue(iosched.is_rotational(os.makedev(8, 1), os.path.join(sys_root, "partition")))
+            self.assertFalse(iosched.is_rotational(os.makedev(259, 0), os.path.join(sys_root, "ssd")))
+            self.assertIsNone(iosched.is_rotational(os.makedev(0, 42), os.path.join(sys_root, "ssd")))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class FairSchedulerTest(unittest.TestCase):
+
+    def test_schedulers_take_turns_by_bytes(self):
+        large = iosched.IoScheduler([HashJob("large-%d" % index, "", size=30000, inode=index) for index in range(3)], concurrency=lambda device: None)
+        small = iosched.IoScheduler([HashJob("small-%d" % index, "", size=10000, inode=index) for index in range(6)], concurrency=lambda device: None)
+        scheduler = iosched.FairScheduler([large, small])
+        keys = [scheduler.next_job().key for _ in range(9)]
+        self.assertEqual(keys[:5], ["large-0", "small-0", "small-1", "small-2", "large-1"])
+        self.assertEqual(sorted(keys), sorted(["large-%d" % index for index in range(3)] + ["small-%d" % index for index in range(6)]))
+        self.assertIsNone(scheduler.next_job())
+
+    def test_busy_schedulers_are_skipped_and_share_device_limits(self):
+        active = collections.Counter()
+        first = iosched.IoScheduler([HashJob("first-%d" % index, "", device=1, inode=index) for index in range(2)], concurrency=lambda device: 1, active=active)
+        second = iosched.IoScheduler([HashJob("second-%d" % index, "", device=1 if index == 0 else 2, inode=index) for index in range(2)], concurrency=lambda device: 1,
+                                     active=active)
+        scheduler = iosched.FairScheduler([first, second])
+        started = scheduler.next_job()
+        self.assertEqual(started.key, "first-0")
+        self.assertEqual(scheduler.next_job().key, "second-1")
+        self.assertIsNone(scheduler.next_job())
+        scheduler.job_done(started)
+        self.assertIn(scheduler.next_job().key, ("first-1", "second-0"))
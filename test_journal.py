@@ -0,0 +1,93 @@
+import os
+import tempfile
+import time
+import unittest
+
+import verify
+from checksumfile import ChecksumFile
+from control import RunControl
+from journal import CheckpointJournal
+
+
+def create_old_file(temp_directory, filename="data.dat", content=bytes(range(256))):
+    file_name = os.path.join(temp_directory, filename)
+    with open(file_name, "wb") as file:
+        file.write(content)
+    os.utime(file_name, (time.time() - 3600, time.time() - 3600))
+    return file_name
+
+
+class CheckpointJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.temp_directory.name, "files")
+        os.mkdir(self.directory)
+        self.checksum_file_name = create_old_file(self.temp_directory.name, "checksums.txt", b"checksums")
+        self.journal_file = os.path.join(self.temp_directory.name, "journal", "verify.jsonl")
+
+    def tearDown(self):
+        self.temp_directory.cleanup()
+
+    def open_journal(self, **kwargs):
+        return CheckpointJournal(self.journal_file, self.checksum_file_name, self.directory, **kwargs)
+
+    def test_recorded_hashes_survive_reopening_the_journal(self):
+        file_name = create_old_file(self.directory)
+        with self.open_journal() as journal:
+            journal.record("data.dat", os.stat(file_name), {"md5": "1", "sha1": "2"})
+        with self.open_journal() as journal:
+            self.assertEqual(journal.lookup("data.dat", os.stat(file_name), ("md5",)), {"md5": "1"})
+            self.assertIsNone(journal.lookup("other.dat", os.stat(file_name), ("md5",)))
+
+    def test_entries_of_changed_files_are_not_used(self):
+        file_name = create_old_file(self.directory)
+        with self.open_journal() as journal:
+            journal.record("data.dat", os.stat(file_name), {"md5": "1"})
+        create_old_file(self.directory, content=b"changed")
+        with self.open_journal() as journal:
+            self.assertIsNone(journal.lookup("data.dat", os.stat(file_name), ("md5",)))
+
+    def test_journal_is_started_over_when_the_checksum_file_changes(self):
+        file_name = create_old_file(self.directory)
+        with self.open_journal() as journal:
+            journal.record("data.dat", os.stat(file_name), {"md5": "1"})
+        create_old_file(self.temp_directory.name, "checksums.txt", b"other checksums")
+        with self.open_journal() as journal:
+            self.assertEqual(len(journal), 0)
+
+    def test_partially_written_entries_are_ignored(self):
+        file_name = create_old_file(self.directory)
+        other_file_name = create_old_file(self.directory, "other.dat")
+        with self.open_journal() as journal:
+            journal.record("data.dat", os.stat(file_name), {"md5": "1"})
+        with open(self.journal_file, "ab") as file:
+            file.write(b'{"path":"other.dat","si')
+        with self.open_journal() as journal:
+            self.assertEqual(len(journal), 1)
+            journal.record("other.dat", os.stat(other_file_name), {"md5": "2"})
+        with self.open_journal() as journal:
+            self.assertEqual(journal.lookup("other.dat", os.stat(other_file_name), ("md5",)), {"md5": "2"})
+
+    def test_interrupted_verification_is_resumed_and_the_journal_removed(self):
+        create_old_file(self.directory, "a.dat")
+        create_old_file(self.directory, "b.dat", b"")
+        checksum_file = ChecksumFile("test", {"a.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}, "b.dat": {"md5": "0" * 32}})
+
+        control = RunControl()
+        with self.open_journal() as journal:
+            result = verify.verify_checksums(checksum_file, self.directory, journal=journal, workers=1, control=control, on_file_hashed=lambda file, hashes, correct: control.cancel())
+        self.assertFalse(result.complete)
+
+        hashed_files = []
+        with self.open_journal() as journal:
+            self.assertEqual(len(journal), 1)
+            result = verify.verify_checksums(checksum_file, self.directory, journal=journal, on_file_hashed=lambda file, hashes, correct: hashed_files.append(file))
+        self.assertEqual(result.resumed_files, 1)
+        self.assertEqual(result.mismatches, ["b.dat"])
+        self.assertEqual(sorted(hashed_files), ["a.dat", "b.dat"])
+        self.assertFalse(os.path.exists(self.journal_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from progress import ProgressTracker, VerificationProgress
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class ProgressTrackerTest(unittest.TestCase):
+
+    def test_time_spent_in_phases_is_recorded(self):
+        clock = FakeClock()
+        tracker = ProgressTracker(clock)
+        tracker.start_phase("scan")
+        clock.now += 2
+        tracker.start_phase("hash")
+        clock.now += 3
+        tracker.start_phase(None)
+        clock.now += 5
+        progress = tracker.snapshot()
+        self.assertEqual(progress.phase_seconds, {"scan": 2, "hash": 3})
+        self.assertEqual(progress.elapsed_seconds, 10)
+
+    def test_throughput_and_eta_are_calculated_from_processed_bytes(self):
+        clock = FakeClock()
+        tracker = ProgressTracker(clock)
+        tracker.set_totals(3, 3000)
+        for _ in range(2):
+            clock.now += 1
+            tracker.file_processed(1000)
+        progress = tracker.snapshot()
+        self.assertEqual((progress.processed_files, progress.processed_bytes), (2, 2000))
+        self.assertEqual(progress.bytes_per_second, 1000)
+        self.assertEqual(progress.eta_seconds, 1)
+
+    def test_throughput_only_considers_the_last_seconds(self):
+        clock = FakeClock()
+        tracker = ProgressTracker(clock)
+        tracker.set_totals(100, 100000)
+        clock.now += 1
+        tracker.file_processed(50000)
+        for _ in range(10):
+            clock.now += 1
+            tracker.file_processed(100)
+        self.assertAlmostEqual(tracker.snapshot().bytes_per_second, 100, delta=25)
+
+    def test_eta_is_unknown_before_anything_has_been_processed(self):
+        self.assertIsNone(VerificationProgress(total_bytes=1000).eta_seconds)
+
+
+if __name__ == '__main__':
+    unittest.main()
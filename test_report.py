@@ -0,0 +1,100 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+import report
+import verify
+from checksumfile import ChecksumFile
+
+
+def create_file_with_data(temp_directory, filename="data.dat"):
+    with open(os.path.join(temp_directory, filename), "wb") as file:
+        file.write(bytearray(range(256)))
+
+
+def verify_into_report(temp_directory, report_file, checksums):
+    with report.create_report_writer(report_file, directory=temp_directory, checksum_file="checksums.txt") as writer:
+        return verify.verify_checksums(ChecksumFile("test", checksums), temp_directory, report=writer)
+
+
+class ReportTest(unittest.TestCase):
+
+    def test_verification_writes_every_file_and_the_summary_to_a_json_lines_report(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as report_directory:
+            create_file_with_data(temp_directory)
+            create_file_with_data(temp_directory, "additional.dat")
+            report_file = os.path.join(report_directory, "result.jsonl")
+            verify_into_report(temp_directory, report_file, {"data.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}, "missing.dat": {"md5": "d41d8cd98f00b204e9800998ecf8427e"}})
+            reader = report.ReportReader(report_file)
+            entries = list(reader)
+            self.assertEqual(entries, [report.ReportEntry("data.dat", report.OK, {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}), report.ReportEntry("missing.dat", report.MISSING),
+                                       report.ReportEntry("additional.dat", report.ADDITIONAL)])
+            self.assertEqual(reader.header["directory"], temp_directory)
+            self.assertFalse(reader.summary["success"])
+            self.assertEqual((reader.summary["files"], reader.summary["bytes"], reader.summary["missing"], reader.summary["additional"]), (1, 256, 1, 1))
+
+    def test_csv_reports_can_be_read_back(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as report_directory:
+            create_file_with_data(temp_directory, "a, \"quoted\" name.dat")
+            report_file = os.path.join(report_directory, "result.csv")
+            verify_into_report(temp_directory, report_file, {"a, \"quoted\" name.dat": {"md5": "d41d8cd98f00b204e9800998ecf8427e", "sha1": "4916d6bdb7f78e6803698cab32d1586ea457dfc8"}})
+            self.assertEqual(report.read_report(report_file), {"a, \"quoted\" name.dat": report.ReportEntry(
+                "a, \"quoted\" name.dat", report.MISMATCH, {"md5": "e2c865db4162bed963bfaa9ef6ac18f0", "sha1": "4916d6bdb7f78e6803698cab32d1586ea457dfc8"})})
+
+    def test_json_lines_and_csv_reports_record_the_tier_and_timings_of_every_checked_file(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as report_directory:
+            create_file_with_data(temp_directory)
+            checksums = {"data.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}, "missing.dat": {"md5": "d41d8cd98f00b204e9800998ecf8427e"}}
+            verify_into_report(temp_directory, os.path.join(report_directory, "result.jsonl"), checksums)
+            verify_into_report(temp_directory, os.path.join(report_directory, "result.csv"), checksums)
+            with open(os.path.join(report_directory, "result.jsonl"), encoding="utf-8") as file:
+                lines = [json.loads(line) for line in file]
+            self.assertEqual([(line["path"], line.get("tier")) for line in lines if line["type"] == "file"], [("data.dat", verify.FULL_TIER), ("missing.dat", None)])
+            self.assertGreater(lines[1]["read_seconds"] + lines[1]["hash_seconds"], 0)
+            self.assertNotIn("read_seconds", lines[2])
+            with open(os.path.join(report_directory, "result.csv"), encoding="utf-8", newline="") as file:
+                rows = list(csv.DictReader(file))
+            self.assertEqual([(row["path"], row["tier"]) for row in rows], [("data.dat", verify.FULL_TIER), ("missing.dat", "")])
+            self.assertGreater(float(rows[0]["read_seconds"]) + float(rows[0]["hash_seconds"]), 0)
+            self.assertEqual(rows[1]["read_seconds"], "")
+
+    def test_text_and_html_reports_list_failures_and_the_summary(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as report_directory:
+            create_file_with_data(temp_directory)
+            create_file_with_data(temp_directory, "<b>.dat")
+            for file_name in ("result.txt", "result.html"):
+                report_file = os.path.join(report_directory, file_name)
+                verify_into_report(temp_directory, report_file, {"data.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}, "<b>.dat": {"md5": "d41d8cd98f00b204e9800998ecf8427e"}})
+                with open(report_file, encoding="utf-8") as file:
+                    content = file.read()
+                self.assertNotIn("data.dat", content)
+                self.assertIn("failure", content)
+                self.assertIn("&lt;b&gt;.dat" if file_name.endswith(".html") else "MISMATCH <b>.dat", content)
+            with self.assertRaises(ValueError):
+                report.ReportReader(report_file)
+
+    def test_comparing_reports_finds_added_removed_and_changed_files(self):
+        with tempfile.TemporaryDirectory() as report_directory:
+            old_report = os.path.join(report_directory, "old.jsonl")
+            new_report = os.path.join(report_directory, "new.csv")
+            with report.create_report_writer(old_report) as writer:
+                writer.write_file("same.dat", report.OK, {"md5": "00"})
+                writer.write_file("broken.dat", report.OK, {"md5": "01"})
+                writer.write_file("rehashed.dat", report.MISMATCH, {"md5": "02"})
+                writer.write_file("removed.dat", report.OK, {"md5": "03"})
+            with report.create_report_writer(new_report) as writer:
+                writer.write_file("same.dat", report.OK, {"md5": "00"})
+                writer.write_file("broken.dat", report.MISMATCH, {"md5": "11"})
+                writer.write_file("rehashed.dat", report.MISMATCH, {"md5": "12"})
+                writer.write_file("added.dat", report.ADDITIONAL)
+            comparison = report.compare_reports(old_report, new_report)
+            self.assertEqual(comparison.added, ["added.dat"])
+            self.assertEqual(comparison.removed, ["removed.dat"])
+            self.assertEqual(comparison.changed, [("broken.dat", report.OK, report.MISMATCH), ("rehashed.dat", report.MISMATCH, report.MISMATCH)])
+            self.assertEqual(comparison.regressions, ["broken.dat"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unicodedata
+import unittest
+from unittest import mock
+
+import scan
+
+
+def create_file(temp_directory, relative_path, content=b""):
+    file_name = os.path.join(temp_directory, relative_path)
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    with open(file_name, "wb") as file:
+        file.write(content)
+
+
+class ScanTest(unittest.TestCase):
+
+    def test_scan_finds_files_in_all_subdirectories(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_file(temp_directory, "top.dat")
+            create_file(temp_directory, "first/middle.dat")
+            create_file(temp_directory, "first/second/bottom.dat")
+            for workers in (1, 4):
+                entries = scan.scan_directory(temp_directory, workers)
+                self.assertCountEqual([entry.path for entry in entries], ["top.dat", "first/middle.dat", "first/second/bottom.dat"])
+
+    def test_scan_skips_directories_that_cannot_be_listed(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_file(temp_directory, "top.dat")
+            create_file(temp_directory, "locked/hidden.dat")
+            real_scandir = os.scandir
+
+            def scandir(path):
+                if os.path.basename(os.path.normpath(path)) == "locked":
+                    raise PermissionError(13, "Permission denied", path)
+                return real_scandir(path)
+
+            with mock.patch("os.scandir", scandir):
+                for workers in (1, 4):
+                    self.assertEqual([entry.path for entry in scan.scan_directory(temp_directory, workers)], ["top.dat"])
+
+    def test_scan_keeps_the_stat_information_of_files(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_file(temp_directory, "data.dat", b"12345")
+            stat_result = os.stat(os.path.join(temp_directory, "data.dat"))
+            (entry,) = scan.scan_directory(temp_directory)
+            self.assertEqual((entry.st_size, entry.st_mtime_ns, entry.st_ino, entry.st_dev), (5, stat_result.st_mtime_ns, stat_result.st_ino, stat_result.st_dev))
+
+    def test_scan_normalizes_paths_but_keeps_the_name_on_disk(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_file(temp_directory, unicodedata.normalize("NFD", "dïr/ümläut.txt"))
+            (entry,) = scan.scan_directory(temp_directory)
+            self.assertEqual(entry.path, unicodedata.normalize("NFC", "dïr/ümläut.txt"))
+            self.assertTrue(os.path.isfile(os.path.join(temp_directory, entry.disk_path)))
+
+    def test_scan_skips_excluded_files_and_directories(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_file(temp_directory, "keep.dat")
+            create_file(temp_directory, "skip.tmp")
+            create_file(temp_directory, ".git/config")
+            create_file(temp_directory, "first/second/skipped.dat")
+            create_file(temp_directory, "first/kept.dat")
+            entries = scan.scan_directory(temp_directory, exclude=("*.tmp", ".git", "first/second"))
+            self.assertCountEqual([entry.path for entry in entries], ["keep.dat", "first/kept.dat"])
+
+    def test_stat_files_only_returns_existing_files(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_file(temp_directory, "first/data.dat", b"123")
+            create_file(temp_directory, "unlisted.dat")
+            os.makedirs(os.path.join(temp_directory, "directory.dat"))
+            entries = scan.stat_files(temp_directory, ["first/data.dat", "missing.dat", "directory.dat"])
+            self.assertEqual([(entry.path, entry.st_size) for entry in entries], [("first/data.dat", 3)])
+
+    def test_stat_files_finds_files_stored_with_decomposed_names(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_file(temp_directory, unicodedata.normalize("NFD", "ümläut.txt"))
+            (entry,) = scan.stat_files(temp_directory, [unicodedata.normalize("NFC", "ümläut.txt")])
+            self.assertTrue(os.path.isfile(os.path.join(temp_directory, entry.disk_path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,17 @@
 import os
 import tempfile
+import time
 import unicodedata
 import unittest
+from unittest import mock
 
+import checksumfile
+import create
+import hash
+import report
 import verify
 from checksumfile import ChecksumFile
+from hashcache import HashCache
 
 
 def create_empty_file(temp_directory, filename="empty.dat"):
@@ -17,6 +24,19 @@ def create_file_with_data(temp_directory, filename="data.dat"):
         empty.write(bytearray(range(256)))
 
 
+def create_large_file(temp_directory, filename, size=1024 * 1024):
+    with open(os.path.join(temp_directory, filename), "wb") as file:
+        file.write(bytes(index % 251 for index in range(size)))
+
+
+def damage_file(temp_directory, filename, offset=0):
+    with open(os.path.join(temp_directory, filename), "r+b") as file:
+        file.seek(offset)
+        data = file.read(1)
+        file.seek(offset)
+        file.write(bytes([data[0] ^ 0xff]))
+
+
 class VerifyTest(unittest.TestCase):
 
     def test_verify_reports_success_when_all_files_match(self):
@@ -128,3 +148,161 @@ class VerifyTest(unittest.TestCase):
             checksum_file = ChecksumFile("test", {"empty.dat": {"md5": "d41d8cd98f00b204e9800998ecf8427e"}})
             verify.verify_checksums(checksum_file, temp_directory, on_started=lambda d: events.append(d), on_file_hashed=lambda f, h, c: events.append(f))
         self.assertEqual(events, [temp_directory, "empty.dat"])
+
+    def test_verify_reports_mismatches_in_the_same_order_with_multiple_workers(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            file_checksums = {}
+            for index in range(40):
+                create_file_with_data(temp_directory, "data-%02d.dat" % index)
+                file_checksums["data-%02d.dat" % index] = {"md5": "e2c865db4162bed963bfaa9ef6ac18f0" if index % 3 else "d41d8cd98f00b204e9800998ecf8427e"}
+            checksum_file = ChecksumFile("test", file_checksums)
+            single_result = verify.verify_checksums(checksum_file, temp_directory, workers=1)
+            parallel_result = verify.verify_checksums(checksum_file, temp_directory, workers=8)
+            self.assertEqual(parallel_result.mismatches, single_result.mismatches)
+            self.assertCountEqual(parallel_result.mismatches, ["data-%02d.dat" % index for index in range(0, 40, 3)])
+
+    def test_verify_checks_all_algorithms_contained_in_the_checksum_file(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_empty_file(temp_directory)
+            create_file_with_data(temp_directory)
+            checksum_file = ChecksumFile("test", {"empty.dat": {"sha1": "da39a3ee5e6b4b0d3255bfef95601890afd80709"}, "data.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0", "sha256": "40aff2e9d2d8922e47afd4648e6967497158785fbd1da870e7110266bf944880"}})
+            hashed_files = {}
+            verify_result = verify.verify_checksums(checksum_file, temp_directory, on_file_hashed=lambda f, h, c: hashed_files.update({f: h}))
+            self.assertTrue(verify_result.success)
+            self.assertEqual(set(hashed_files["empty.dat"].keys()), {"sha1"})
+            self.assertEqual(set(hashed_files["data.dat"].keys()), {"md5", "sha256"})
+
+    def test_reconcile_returns_sorted_lists(self):
+        (files_to_hash, missing_files, additional_files) = verify.reconcile(["c", "a", "e", "b"], ["f", "b", "d", "a"])
+        self.assertEqual(files_to_hash, ["a", "b"])
+        self.assertEqual(missing_files, ["c", "e"])
+        self.assertEqual(additional_files, ["d", "f"])
+
+    def test_reconcile_scales_linearly_to_millions_of_paths(self):
+        def time_reconciliation(count):
+            files_with_checksum = ["directory-%d/file-%d.dat" % (index % 1000, index) for index in range(count)]
+            existing_files = files_with_checksum[count // 100:] + ["additional-%d.dat" % index for index in range(count // 100)]
+            start = time.perf_counter()
+            (files_to_hash, missing_files, additional_files) = verify.reconcile(files_with_checksum, existing_files)
+            elapsed = time.perf_counter() - start
+            self.assertEqual((len(files_to_hash), len(missing_files), len(additional_files)), (count - count // 100, count // 100, count // 100))
+            return elapsed
+        small_run = time_reconciliation(100_000)
+        large_run = time_reconciliation(2_000_000)
+        self.assertLess(large_run, 30)
+        self.assertLess(large_run / small_run, 60)
+
+    def test_verify_uses_hashes_from_the_hash_cache(self):
+        with tempfile.TemporaryDirectory() as temp_directory, HashCache(":memory:") as hash_cache:
+            create_file_with_data(temp_directory)
+            os.utime(os.path.join(temp_directory, "data.dat"), (time.time() - 3600, time.time() - 3600))
+            checksum_file = ChecksumFile("test", {"data.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}})
+            first_result = verify.verify_checksums(checksum_file, temp_directory, hash_cache=hash_cache)
+            second_result = verify.verify_checksums(checksum_file, temp_directory, hash_cache=hash_cache)
+            self.assertTrue(second_result.success)
+            self.assertEqual((first_result.cache_hits, second_result.cache_hits), (0, 1))
+
+    def test_verify_rehashes_files_when_the_hash_cache_is_not_trusted(self):
+        with tempfile.TemporaryDirectory() as temp_directory, HashCache(":memory:") as hash_cache:
+            create_file_with_data(temp_directory)
+            os.utime(os.path.join(temp_directory, "data.dat"), (time.time() - 3600, time.time() - 3600))
+            checksum_file = ChecksumFile("test", {"data.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}})
+            verify.verify_checksums(checksum_file, temp_directory, hash_cache=hash_cache)
+            verify_result = verify.verify_checksums(checksum_file, temp_directory, hash_cache=hash_cache, trust_cache=False)
+            self.assertTrue(verify_result.success)
+            self.assertEqual(verify_result.cache_hits, 0)
+
+    def test_verify_ignores_excluded_files(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_empty_file(temp_directory)
+            create_file_with_data(temp_directory, "data.tmp")
+            checksum_file = ChecksumFile("test", {"empty.dat": {"md5": "d41d8cd98f00b204e9800998ecf8427e"}})
+            verify_result = verify.verify_checksums(checksum_file, temp_directory, exclude=("*.tmp",))
+            self.assertTrue(verify_result.success)
+
+    def test_targeted_verification_only_checks_listed_files(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_empty_file(temp_directory)
+            create_file_with_data(temp_directory)
+            checksum_file = ChecksumFile("test", {"empty.dat": {"md5": "d41d8cd98f00b204e9800998ecf8427e"}, "missing.dat": {"md5": "d41d8cd98f00b204e9800998ecf8427e"}})
+            verify_result = verify.verify_checksums(checksum_file, temp_directory, targeted=True)
+            self.assertEqual(verify_result.mismatches, [])
+            self.assertEqual(verify_result.missing_files, ["missing.dat"])
+            self.assertEqual(verify_result.additional_files, [])
+
+    def test_unreadable_files_are_mismatches_and_the_others_are_still_verified(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as report_directory:
+            create_file_with_data(temp_directory)
+            create_file_with_data(temp_directory, "unreadable.dat")
+            checksums = {"data.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}, "unreadable.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}}
+            create_hash = hash.create_hash
+
+            def fail_on_unreadable(file_name, *arguments, **keywords):
+                if file_name.endswith("unreadable.dat"):
+                    raise PermissionError(13, "Permission denied", file_name)
+                return create_hash(file_name, *arguments, **keywords)
+
+            finished = []
+            report_file = os.path.join(report_directory, "result.jsonl")
+            with mock.patch("hash.create_hash", fail_on_unreadable), report.create_report_writer(report_file) as writer:
+                verify_result = verify.verify_checksums(ChecksumFile("test", checksums), temp_directory, on_finished=finished.append, report=writer)
+            self.assertEqual(finished, [verify_result])
+            self.assertTrue(verify_result.complete)
+            self.assertEqual(verify_result.mismatches, ["unreadable.dat"])
+            self.assertEqual({entry.path: entry.status for entry in report.ReportReader(report_file)}, {"data.dat": report.OK, "unreadable.dat": report.ERROR})
+
+    def test_other_errors_are_raised_after_the_report_has_been_finished(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as report_directory:
+            create_file_with_data(temp_directory)
+            report_file = os.path.join(report_directory, "result.jsonl")
+            with mock.patch("hash.create_hash", side_effect=RuntimeError("broken")), report.create_report_writer(report_file) as writer:
+                with self.assertRaises(RuntimeError):
+                    verify.verify_checksums(ChecksumFile("test", {"data.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}}), temp_directory, report=writer)
+            reader = report.ReportReader(report_file)
+            list(reader)
+            self.assertFalse(reader.summary["complete"])
+
+    def test_verify_reports_progress_and_statistics(self):
+        progress_events = []
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_empty_file(temp_directory)
+            create_file_with_data(temp_directory)
+            checksum_file = ChecksumFile("test", {"empty.dat": {"md5": "d41d8cd98f00b204e9800998ecf8427e"}, "data.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}})
+            verify_result = verify.verify_checksums(checksum_file, temp_directory, on_progress=progress_events.append)
+        self.assertEqual([progress.phase for progress in progress_events], ["scan", "reconcile", "hash", "hash", "hash", "report"])
+        self.assertEqual((progress_events[-2].processed_files, progress_events[-2].processed_bytes), (2, 256))
+        self.assertEqual((verify_result.statistics.total_files, verify_result.statistics.total_bytes), (2, 256))
+        self.assertEqual(set(verify_result.statistics.phase_seconds.keys()), {"scan", "reconcile", "hash", "report"})
+        self.assertGreater(verify_result.timings.read_seconds + verify_result.timings.hash_seconds, 0)
+
+    def test_files_of_the_wrong_size_are_mismatches_without_being_hashed(self):
+        with tempfile.TemporaryDirectory() as temp_directory:
+            create_file_with_data(temp_directory)
+            create_file_with_data(temp_directory, "truncated.dat")
+            checksums = {"data.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}, "truncated.dat": {"md5": "e2c865db4162bed963bfaa9ef6ac18f0"}}
+            checksum_file = ChecksumFile("test", checksums, {"data.dat": 256, "truncated.dat": 512})
+            hashed_files = []
+            with mock.patch("hash.create_hash", side_effect=lambda file_name, *arguments, **keywords: hashed_files.append(os.path.basename(file_name)) or dict(checksums["data.dat"])):
+                verify_result = verify.verify_checksums(checksum_file, temp_directory)
+            self.assertEqual(hashed_files, ["data.dat"])
+            self.assertEqual(verify_result.mismatches, ["truncated.dat"])
+            self.assertEqual(dict(verify_result.file_tiers), {"data.dat": verify.FULL_TIER, "truncated.dat": verify.SIZE_TIER})
+            self.assertEqual(verify_result.tiers, {verify.FULL_TIER: 1, verify.SIZE_TIER: 1})
+
+    def test_samples_are_checked_before_or_instead_of_hashing_completely(self):
+        with tempfile.TemporaryDirectory() as temp_directory, tempfile.TemporaryDirectory() as output_directory:
+            create_large_file(temp_directory, "damaged.dat")
+            create_large_file(temp_directory, "intact.dat")
+            output = os.path.join(output_directory, "checksums.txt")
+            create.create_checksums(temp_directory, (hash.SAMPLE_ALGORITHM, "md5"), output)
+            checksum_file = checksumfile.read_checksum_file(output)
+            damage_file(temp_directory, "damaged.dat")
+            before_result = verify.verify_checksums(checksum_file, temp_directory, sampling="before")
+            self.assertEqual(before_result.mismatches, ["damaged.dat"])
+            self.assertEqual(dict(before_result.file_tiers), {"damaged.dat": verify.SAMPLE_TIER, "intact.dat": verify.FULL_TIER})
+            self.assertEqual(before_result.tiers, {verify.SAMPLE_TIER: 1, verify.FULL_TIER: 1})
+            instead_result = verify.verify_checksums(checksum_file, temp_directory, sampling="instead")
+            self.assertEqual(instead_result.mismatches, ["damaged.dat"])
+            self.assertEqual(dict(instead_result.file_tiers), {"damaged.dat": verify.SAMPLE_TIER, "intact.dat": verify.SAMPLE_TIER})
+            self.assertEqual(instead_result.tiers, {verify.SAMPLE_TIER: 2})
+            self.assertEqual(verify.verify_checksums(checksum_file, temp_directory).tiers, {verify.FULL_TIER: 2})
@@ -1,46 +1,331 @@
+import bisect
+import collections.abc
+import dataclasses
 import os
-import unicodedata
 
+import archive
+import engine
 import hash
+import iosched
+import report as reports
+import scan
+from control import Cancelled, RunControl
+from progress import ProgressTracker
 
+SIZE_TIER = "size"
+"""The tier of a file whose size differs from the size recorded in the checksum file, so that it was not hashed."""
 
-def verify_checksums(checksum_file, directory, on_started=None, on_file_hashed=None, on_finished=None):
+SAMPLE_TIER = "sample"
+"""The tier of a file that was decided by the hash of a sample of it (see `hash.create_sample_hash`)."""
+
+FULL_TIER = "full"
+"""The tier of a file that was decided by the hashes of its complete content."""
+
+SAMPLING_MODES = ("off", "before", "instead")
+"""The ways `verify_checksums` can use the hashes of samples recorded in a checksum file: not at all, to find damaged
+files before hashing the others completely, or instead of hashing files completely."""
+
+
+def verify_checksums(checksum_file, directory, on_started=None, on_file_hashed=None, on_finished=None, workers=None, hash_cache=None, trust_cache=True, exclude=(), targeted=False,
+                     on_progress=None, report=None, journal=None, control=None, fail_fast=False, backend="threads", sampling="off"):
+    """Verify the files in the given directory against the checksums of the given `ChecksumFile`.
+
+    Files are hashed by `workers` threads (or processes, see `engine.BACKENDS` for the possible `backend` values),
+    in an order chosen by `iosched.IoScheduler` for the devices they are on. If a `HashCache` is given, unchanged
+    files are looked up in it instead of being hashed, unless `trust_cache` is false. Files and directories matching
+    the glob patterns in `exclude` are ignored. With `targeted`, only the files listed in the checksum file are
+    looked up instead of scanning the whole directory; additional files are not detected in this mode. `on_progress`
+    is called with a `VerificationProgress` whenever a phase starts and after every file. If a `ReportWriter` is
+    given, every file is written to it as soon as it has been checked, and the summary once the verification is
+    finished. If a `CheckpointJournal` is given, unchanged files recorded in it by an earlier, interrupted run are
+    not hashed again, newly hashed files are recorded in it, and it is removed once the verification is finished.
+
+    The verification can be paused, resumed, and cancelled through the given `RunControl`. With `fail_fast`, it
+    stops at the first mismatching or missing file. A verification that has been stopped early returns (and passes
+    to `on_finished`) a `VerificationResult` that only covers the files checked so far and whose `complete` is
+    false. A file that cannot be read, e.g. because it vanished or became unreadable during the run, is a mismatch
+    and an `ERROR` in the report, and the other files are still verified; any other error is raised once the report
+    has been finished.
+
+    Files are checked in tiers, cheapest first. A file whose size differs from the size recorded in the checksum file
+    is a mismatch right away, without being hashed. With a `sampling` mode other than "off" (see `SAMPLING_MODES`),
+    the files whose checksum file records the hash of a sample are sampled next, and a file whose sample differs is a
+    mismatch, too; with "instead", a file whose sample matches is not hashed completely. The tier that decided every
+    file is recorded in `VerificationResult.file_tiers` and written to the report, and `VerificationResult.tiers`
+    counts the files per tier.
+
+    Instead of a directory, an ISO image, ZIP archive, or tar archive (see `archive.FORMATS`) can be given, whose files
+    are then verified without extracting them. They are hashed one after the other while the archive is read once,
+    from start to end, so `workers` and `backend` only apply to the scan of a directory, and files are not sampled."""
+    if sampling not in SAMPLING_MODES:
+        raise ValueError("unknown sampling mode: " + sampling)
     if on_started:
         on_started(directory)
-    existing_files = collect_files(directory)
-    files_with_checksum = checksum_file.file_checksums.keys()
-    missing_files = [file for file in filter(lambda f: f not in existing_files, files_with_checksum)]
-    additional_files = [file for file in filter(lambda f: f not in files_with_checksum, existing_files)]
-    mismatches = []
-    for existing_file in filter(lambda f: f in files_with_checksum, existing_files):
-        filename = os.path.join(directory, existing_file)
-        file_hash = hash.create_hash(filename)
-        existing_hashes = checksum_file.file_checksums[existing_file]
-        hash_checks_out = True
-        for (hash_to_check) in existing_hashes:
-            if file_hash[hash_to_check] != existing_hashes[hash_to_check]:
-                mismatches.append(existing_file)
-                hash_checks_out = False
-        if on_file_hashed:
-            on_file_hashed(existing_file, file_hash, hash_checks_out)
-    verification_result = VerificationResult(mismatches, missing_files, additional_files)
+    control = control if control is not None else RunControl()
+    verification = Verification(checksum_file, directory, on_file_hashed, on_progress, hash_cache, trust_cache, report, journal, control, fail_fast)
+    complete = True
+    try:
+        jobs = verification.prepare(workers, exclude, targeted)
+        if sampling != "off" and verification.archive_format is None:
+            for (job, file_hash) in engine.hash_files(iosched.IoScheduler(verification.sample_jobs(jobs)), workers, control, backend, verification.file_failed):
+                verification.file_sampled(job, file_hash, sampling == "instead")
+            jobs = verification.unchecked(jobs)
+        if verification.archive_format is not None:
+            hashed_files = archive.hash_members(directory, jobs, verification.existing_files, control)
+        else:
+            hashed_files = engine.hash_files(iosched.IoScheduler(jobs), workers, control, backend, verification.file_failed)
+        for (job, file_hash) in hashed_files:
+            verification.file_hashed(job, file_hash)
+    except Cancelled:
+        complete = False
+    except Exception:
+        verification.finish(False)
+        raise
+    verification_result = verification.finish(complete)
     if on_finished is not None:
         on_finished(verification_result)
     return verification_result
 
 
-def collect_files(directory):
-    file_list = []
-    for path, dirs, files in os.walk(directory):
-        relative_path = path.removeprefix(directory).removesuffix("/")
-        for file in files:
-            file_list.append((relative_path + "/" + unicodedata.normalize("NFC", os.fsdecode(file))).removeprefix("/"))
-    return file_list
+class Verification:
+    """The state of a single verification run, split into the steps that happen before, during, and after hashing.
+
+    `verify_checksums` drives a `Verification` from start to finish; it is only needed directly to hash the files of
+    a verification in some other way."""
+
+    def __init__(self, checksum_file, directory, on_file_hashed=None, on_progress=None, hash_cache=None, trust_cache=True, report=None, journal=None, control=None,
+                 fail_fast=False):
+        self.checksum_file = checksum_file
+        self.directory = directory
+        self.on_file_hashed = on_file_hashed
+        self.on_progress = on_progress
+        self.hash_cache = hash_cache
+        self.trust_cache = trust_cache
+        self.report = report
+        self.journal = journal
+        self.control = control if control is not None else RunControl()
+        self.fail_fast = fail_fast
+        self.archive_format = archive.archive_format(directory)
+        """The format of the archive whose files are verified, or `None` if `directory` is a directory."""
+        self.progress = ProgressTracker()
+        self.existing_files = {}
+        self.files_to_hash = []
+        self.missing_files = []
+        self.additional_files = []
+        self.mismatched_files = set()
+        self.cache_hits = 0
+        self.resumed_files = 0
+        self.timings = hash.HashTimings()
+        """The total time spent reading and hashing files, which is added up as files are hashed, so that the memory
+        needed does not grow with the number of files; the time of every file is written to the report."""
+        self.file_tiers = FileTiers()
+
+    def prepare(self, workers=None, exclude=(), targeted=False):
+        """Scan the directory and compare it with the checksum file. Files whose size differs from the recorded one, and
+        files whose hashes are found in the journal or the hash cache, are checked right away; a list of `HashJob`
+        objects is returned for all other files."""
+        self.start_phase("scan")
+        if self.archive_format is not None:
+            entries = archive.scan_archive(self.directory, exclude)
+        elif targeted:
+            entries = scan.stat_files(self.directory, self.checksum_file.file_checksums.keys(), workers)
+        else:
+            entries = scan.scan_directory(self.directory, workers, exclude)
+        self.existing_files = {entry.path: entry for entry in entries}
+        self.start_phase("reconcile")
+        (self.files_to_hash, self.missing_files, self.additional_files) = reconcile(self.checksum_file.file_checksums.keys(), self.existing_files.keys())
+        self.file_tiers = FileTiers(self.files_to_hash)
+        if self.fail_fast and self.missing_files:
+            self.control.cancel()
+        self.progress.set_totals(len(self.files_to_hash), sum(self.existing_files[file].st_size for file in self.files_to_hash))
+        self.start_phase("hash")
+        jobs = []
+        for file in self.files_to_hash:
+            self.control.checkpoint()
+            entry = self.existing_files[file]
+            recorded_size = self.checksum_file.file_sizes.get(file)
+            if recorded_size is not None and recorded_size != entry.st_size:
+                self.file_checked(file, entry.st_size, None, False, SIZE_TIER)
+                continue
+            algorithms = tuple(algorithm for algorithm in self.checksum_file.file_checksums[file].keys() if algorithm != hash.SAMPLE_ALGORITHM)
+            job = engine.HashJob(file, os.path.join(self.directory, entry.disk_path), algorithms or (hash.SAMPLE_ALGORITHM,), entry.st_size, device=entry.st_dev,
+                                 inode=entry.st_ino)
+            if self.journal is not None:
+                recorded_hash = self.journal.lookup(file, entry, job.algorithms)
+                if recorded_hash is not None:
+                    self.resumed_files += 1
+                    self.check_hashes(job, recorded_hash)
+                    continue
+            if self.hash_cache is not None and self.trust_cache:
+                cached_hash = self.hash_cache.lookup(job.file_name, entry, job.algorithms)
+                if cached_hash is not None:
+                    self.cache_hits += 1
+                    self.check_hashes(job, cached_hash)
+                    continue
+            jobs.append(job)
+        return jobs
+
+    def sample_jobs(self, jobs):
+        """Return a `HashJob` that hashes a sample of the file for every one of the given jobs whose checksum file
+        records the hash of a sample. Their results are passed to `file_sampled`."""
+        return [dataclasses.replace(job, algorithms=(hash.SAMPLE_ALGORITHM,)) for job in jobs
+                if hash.SAMPLE_ALGORITHM in self.checksum_file.file_checksums[job.key] and job.algorithms != (hash.SAMPLE_ALGORITHM,)]
+
+    def file_sampled(self, job, file_hash, sufficient=False):
+        """Check the hash of the sample of a file. A file whose sample does not match is a mismatch; a file whose sample
+        matches is only considered correct if the sample is `sufficient`, and has to be hashed completely otherwise."""
+        correct = file_hash[hash.SAMPLE_ALGORITHM] == self.checksum_file.file_checksums[job.key][hash.SAMPLE_ALGORITHM]
+        if sufficient or not correct:
+            self.file_checked(job.key, job.size, file_hash, correct, SAMPLE_TIER, job.timings)
+
+    def unchecked(self, jobs):
+        """Return those of the given jobs whose files have not been checked yet, e.g. by `file_sampled`."""
+        return [job for job in jobs if job.key not in self.file_tiers and job.key not in self.mismatched_files]
+
+    def file_hashed(self, job, file_hash):
+        """Check the hashes of a file that has been hashed."""
+        if self.hash_cache is not None:
+            self.hash_cache.store(job.file_name, self.existing_files[job.key], file_hash)
+        if self.journal is not None:
+            self.journal.record(job.key, self.existing_files[job.key], file_hash)
+        if job.timings is not None:
+            self.timings.read_seconds += job.timings.read_seconds
+            self.timings.hash_seconds += job.timings.hash_seconds
+        self.check_hashes(job, file_hash)
+
+    def file_failed(self, job, error):
+        """Record a file that could not be read, as a mismatch."""
+        self.file_checked(job.key, job.size, None, False, None, error=str(error))
+
+    def check_hashes(self, job, file_hash):
+        existing_hashes = self.checksum_file.file_checksums[job.key]
+        hash_checks_out = all(file_hash[algorithm] == existing_hashes[algorithm] for algorithm in job.algorithms)
+        self.file_checked(job.key, job.size, file_hash, hash_checks_out, SAMPLE_TIER if job.algorithms == (hash.SAMPLE_ALGORITHM,) else FULL_TIER, job.timings)
+
+    def file_checked(self, file, size, file_hash, correct, tier, timings=None, error=None):
+        if not correct:
+            self.mismatched_files.add(file)
+        if tier is not None:
+            self.file_tiers[file] = tier
+        if self.fail_fast and not correct:
+            self.control.cancel()
+        self.progress.file_processed(size)
+        if self.report is not None:
+            self.report.write_file(file, reports.ERROR if error is not None else reports.OK if correct else reports.MISMATCH, file_hash, tier, timings, error)
+        if self.on_file_hashed:
+            self.on_file_hashed(file, file_hash if file_hash is not None else {}, correct)
+        if self.on_progress:
+            self.on_progress(self.progress.snapshot())
+
+    def finish(self, complete=True):
+        """Create the `VerificationResult` once all files have been checked, or once the verification has been stopped
+        early, in which case `complete` has to be false."""
+        self.start_phase("report")
+        mismatches = [file for file in self.files_to_hash if file in self.mismatched_files]
+        if self.report is not None:
+            for file in self.missing_files:
+                self.report.write_file(file, reports.MISSING)
+            for file in self.additional_files:
+                self.report.write_file(file, reports.ADDITIONAL)
+        self.start_phase(None)
+        verification_result = VerificationResult(mismatches, self.missing_files, self.additional_files, self.cache_hits, self.progress.snapshot(), self.timings,
+                                                 self.resumed_files, complete, self.file_tiers.counts(), self.file_tiers)
+        if self.report is not None:
+            self.report.write_summary(verification_result)
+        if self.journal is not None and complete:
+            self.journal.complete()
+        return verification_result
+
+    def start_phase(self, phase):
+        self.progress.start_phase(phase)
+        if self.on_progress and phase is not None:
+            self.on_progress(self.progress.snapshot())
+
+
+def reconcile(files_with_checksum, existing_files):
+    """Compare the files listed in a checksum file with the files that actually exist.
+
+    Returns a tuple of the files that need to be hashed, the files that are missing, and the files that do not have a
+    checksum, each as a sorted list. This runs in linear time (plus the sorting of the results)."""
+    files_with_checksum = set(files_with_checksum)
+    existing_files = set(existing_files)
+    files_to_hash = sorted(files_with_checksum & existing_files)
+    missing_files = sorted(files_with_checksum - existing_files)
+    additional_files = sorted(existing_files - files_with_checksum)
+    return files_to_hash, missing_files, additional_files
+
+
+def collect_files(directory, exclude=()):
+    if archive.archive_format(directory) is not None:
+        return [member.path for member in archive.scan_archive(directory, exclude)]
+    return [entry.path for entry in scan.scan_directory(directory, exclude=exclude)]
+
+
+class FileTiers(collections.abc.Mapping):
+    """A mapping from the path of every checked file to the tier that decided it. Only a byte is kept per file, next to
+    the sorted list of the files to check, which a verification keeps anyway, so that this stays small even for
+    millions of files; paths are looked up by bisection."""
+
+    TIERS = (None, SIZE_TIER, SAMPLE_TIER, FULL_TIER)
+
+    def __init__(self, files=()):
+        self.files = files
+        """The sorted paths of all files that can be checked."""
+        self.codes = bytearray(len(files))
+        """The index in `TIERS` of the tier of every file in `files`, or 0 if it has not been checked."""
+
+    def _index(self, file):
+        index = bisect.bisect_left(self.files, file)
+        if index == len(self.files) or self.files[index] != file:
+            raise KeyError(file)
+        return index
+
+    def __getitem__(self, file):
+        code = self.codes[self._index(file)]
+        if not code:
+            raise KeyError(file)
+        return self.TIERS[code]
+
+    def __setitem__(self, file, tier):
+        self.codes[self._index(file)] = self.TIERS.index(tier)
+
+    def __contains__(self, file):
+        try:
+            return bool(self.codes[self._index(file)])
+        except KeyError:
+            return False
+
+    def __iter__(self):
+        return (file for (file, code) in zip(self.files, self.codes) if code)
+
+    def __len__(self):
+        return len(self.codes) - self.codes.count(0)
+
+    def counts(self):
+        """Return the number of files decided by every tier."""
+        return {tier: self.codes.count(code) for (code, tier) in enumerate(self.TIERS) if code and code in self.codes}
 
 
 class VerificationResult:
-    def __init__(self, mismatches: list, missing_files: list, additional_files: list):
+    def __init__(self, mismatches: list, missing_files: list, additional_files: list, cache_hits: int = 0, statistics=None, timings=None, resumed_files: int = 0,
+                 complete: bool = True, tiers: dict = None, file_tiers=None, error: str = None):
         self.mismatches = mismatches
         self.missing_files = missing_files
         self.additional_files = additional_files
-        self.success = not mismatches and not missing_files and not additional_files
+        self.cache_hits = cache_hits
+        self.statistics = statistics
+        """The final `VerificationProgress` of the run, containing the totals and the time spent in every phase."""
+        self.timings = timings if timings is not None else hash.HashTimings()
+        """The `HashTimings` of all files that have been hashed (i.e. not found in the hash cache) together."""
+        self.resumed_files = resumed_files
+        """The number of files whose hashes were taken from the journal of an earlier, interrupted verification."""
+        self.complete = complete
+        """Whether all files have been checked, i.e. the verification has not been cancelled or stopped early."""
+        self.file_tiers = file_tiers if file_tiers is not None else FileTiers()
+        """The tier that decided every checked file (`SIZE_TIER`, `SAMPLE_TIER`, or `FULL_TIER`), as a `FileTiers`
+        mapping from path to tier."""
+        self.tiers = tiers if tiers is not None else self.file_tiers.counts()
+        """The number of checked files decided by every tier."""
+        self.error = error
+        """The error that stopped the verification, if any; the result of such a run is incomplete."""
+        self.success = complete and not mismatches and not missing_files and not additional_files
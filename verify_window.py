@@ -1,45 +1,133 @@
-from dataclasses import dataclass
-from datetime import datetime
+from array import array
+from datetime import datetime, timedelta
 
-from PySide6 import QtWidgets, QtCore, QtGui
+from PySide6 import QtWidgets, QtCore
 
-from verify import VerificationResult
+from control import RunControl
+from create import CreationResult
+from events import VerificationCounters
+from progress import VerificationProgress, PHASES
+from verify import SAMPLE_TIER, SIZE_TIER, VerificationResult
 
+INFO = 0
+SUCCESS = 1
+FAILURE = 2
+"""The kinds of lines shown in a `VerifyRunWindow`."""
 
-@dataclass
-class TimestampedLine:
-    text: str
-    date: datetime
+LINE_KIND_ROLE = QtCore.Qt.ItemDataRole.UserRole
+"""The item data role under which `ProgressLogModel` returns the kind of a line."""
 
-    def __init__(self, text, date=None):
-        self.text = text
-        self.date = date if date else datetime.now()
+
+class LineBuffer:
+    """Stores the lines of a progress log compactly: the texts in a list, and the time offsets and kinds of the lines
+    in flat arrays."""
+
+    def __init__(self):
+        self.texts = []
+        self.offsets = array("d")
+        self.kinds = bytearray()
+
+    def __len__(self):
+        return len(self.texts)
+
+    def append(self, text, offset, kind=INFO):
+        self.texts.append(text)
+        self.offsets.append(offset)
+        self.kinds.append(kind)
+
+
+class ProgressLogModel(QtCore.QAbstractListModel):
+    """A list model over a `LineBuffer`. Lines are only formatted when a view asks for them, i.e. when they are
+    visible, and appending lines does not touch the existing ones."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.lines = LineBuffer()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.lines)
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.lines):
+            return None
+        row = index.row()
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+            text = self.lines.texts[row]
+            return format_timedelta(timedelta(seconds=self.lines.offsets[row])) + " " + text if text else ""
+        if role == LINE_KIND_ROLE:
+            return self.lines.kinds[row]
+        return None
+
+    def append_lines(self, lines):
+        """Append the given `(text, offset, kind)` tuples."""
+        if not lines:
+            return
+        first_row = len(self.lines)
+        self.beginInsertRows(QtCore.QModelIndex(), first_row, first_row + len(lines) - 1)
+        for (text, offset, kind) in lines:
+            self.lines.append(text, offset, kind)
+        self.endInsertRows()
+
+
+class FailureFilterModel(QtCore.QSortFilterProxyModel):
+    """Hides the lines of successfully verified files of a `ProgressLogModel`."""
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self.sourceModel().lines.kinds[source_row] != SUCCESS
 
 
 class VerifyRunWindow(QtWidgets.QDialog):
 
-    def __init__(self, parent):
+    def __init__(self, parent, control=None):
         super().__init__(parent)
         self.verification_start = datetime.now()
         self.verification_finished = False
-        self.lines = []
+        self.control = control if control is not None else RunControl()
+        self.close_when_finished = False
 
         self.setWindowTitle("Verify Checksums")
-        self.progress_details = QtWidgets.QTextEdit()
-        self.progress_details.setReadOnly(True)
-        self.progress_details.setAlignment(QtCore.Qt.AlignmentFlag.AlignLeft | QtCore.Qt.AlignmentFlag.AlignTop)
+        self.log_model = ProgressLogModel(self)
+        self.filter_model = None
+        self.progress_details = QtWidgets.QListView()
+        self.progress_details.setModel(self.log_model)
+        self.progress_details.setUniformItemSizes(True)
+        self.progress_details.setLayoutMode(QtWidgets.QListView.LayoutMode.Batched)
+        self.progress_details.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.progress_details.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+
+        self.failures_only_check_box = QtWidgets.QCheckBox("Show failures only")
+        self.failures_only_check_box.toggled.connect(self.set_failures_only)
+
+        self.counters_label = QtWidgets.QLabel()
+
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setTextVisible(False)
+        self.statistics_label = QtWidgets.QLabel()
 
-        scroll_area = QtWidgets.QScrollArea()
-        scroll_area.setWidget(self.progress_details)
-        scroll_area.setWidgetResizable(True)
+        self.pause_button = QtWidgets.QPushButton("Pause")
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.cancel_button = QtWidgets.QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel)
 
         self.close_button = QtWidgets.QPushButton("Close")
         self.close_button.setDisabled(True)
         self.close_button.clicked.connect(self.close)
 
+        button_box = QtWidgets.QWidget()
+        button_box_layout = QtWidgets.QHBoxLayout(button_box)
+        button_box_layout.setContentsMargins(0, 0, 0, 0)
+        button_box_layout.addWidget(self.pause_button)
+        button_box_layout.addWidget(self.cancel_button)
+        button_box_layout.addWidget(self.close_button)
+
         layout = QtWidgets.QGridLayout()
-        layout.addWidget(scroll_area, 0, 0)
-        layout.addWidget(self.close_button, 1, 0, alignment=QtCore.Qt.AlignmentFlag.AlignRight)
+        layout.addWidget(self.progress_details, 0, 0, 1, 3)
+        layout.addWidget(self.progress_bar, 1, 0, 1, 3)
+        layout.addWidget(self.statistics_label, 2, 0, 1, 3)
+        layout.addWidget(self.failures_only_check_box, 3, 0, alignment=QtCore.Qt.AlignmentFlag.AlignLeft)
+        layout.addWidget(self.counters_label, 3, 1, alignment=QtCore.Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(button_box, 3, 2, alignment=QtCore.Qt.AlignmentFlag.AlignRight)
         self.setLayout(layout)
 
     def keyPressEvent(self, event):
@@ -50,52 +138,159 @@ class VerifyRunWindow(QtWidgets.QDialog):
 
     def closeEvent(self, close_event):
         if not self.verification_finished:
+            # the run is stopped first; the window closes itself once the worker has finished
             close_event.ignore()
+            if self.close_when_finished or self.confirm_cancel():
+                self.close_when_finished = True
+                self.control.cancel()
             return
         super().closeEvent(close_event)
 
-    def add_lines(self, *lines):
-        for line in lines:
-            self.lines.append(TimestampedLine(line))
+    def reject(self):
+        # Escape rejects the dialog without a close event, so it has to be stopped here as well
+        if self.verification_finished:
+            super().reject()
+        else:
+            self.close()
+
+    def confirm_cancel(self):
+        answer = QtWidgets.QMessageBox.question(self, self.windowTitle(), "The run has not finished yet. Do you want to cancel it?")
+        return answer == QtWidgets.QMessageBox.StandardButton.Yes
+
+    @QtCore.Slot()
+    def toggle_pause(self):
+        if self.control.paused:
+            self.control.resume()
+            self.pause_button.setText("Pause")
+            self.add_lines("Resumed.")
+        else:
+            self.control.pause()
+            self.pause_button.setText("Resume")
+            self.add_lines("Paused.")
+
+    @QtCore.Slot()
+    def cancel(self):
+        if self.confirm_cancel():
+            self.control.cancel()
+            self.pause_button.setDisabled(True)
+            self.cancel_button.setDisabled(True)
+            self.add_lines("Cancelling…")
+
+    def run_finished(self):
+        self.verification_finished = True
+        self.pause_button.setDisabled(True)
+        self.cancel_button.setDisabled(True)
+        self.close_button.setEnabled(True)
+        if self.close_when_finished:
+            self.close()
+
+    @QtCore.Slot(bool)
+    def set_failures_only(self, failures_only):
+        # the filter model is only connected while it is needed so that it does not slow down appending lines
+        if failures_only:
+            self.filter_model = FailureFilterModel(self)
+            self.filter_model.setSourceModel(self.log_model)
+            self.progress_details.setModel(self.filter_model)
+        elif self.filter_model is not None:
+            self.progress_details.setModel(self.log_model)
+            self.filter_model.deleteLater()
+            self.filter_model = None
+        self.progress_details.scrollToBottom()
+
+    def add_lines(self, *lines, kind=INFO):
+        offset = (datetime.now() - self.verification_start).total_seconds()
+        self.append_to_log([(line, offset, kind) for line in lines])
+
+    def append_to_log(self, lines):
+        scroll_bar = self.progress_details.verticalScrollBar()
+        follow_output = scroll_bar.value() == scroll_bar.maximum()
+        self.log_model.append_lines(lines)
+        if follow_output:
+            self.progress_details.scrollToBottom()
 
     @QtCore.Slot(str)
     def on_started(self, directory):
         self.verification_start = datetime.now()
         self.add_lines("Starting verification in " + directory + "…")
-        self.write_lines()
 
-    @QtCore.Slot(str, dict, bool)
-    def on_file_hashed(self, file, _, correct_hash):
-        self.add_lines(("✅" if correct_hash else "❌") + " " + file)
-        self.write_lines()
+    @QtCore.Slot(list, VerificationCounters)
+    def on_files_hashed(self, events, counters):
+        offset = (datetime.now() - self.verification_start).total_seconds()
+        self.append_to_log([(("✅" if correct_hash else "❌") + " " + file, offset, SUCCESS if correct_hash else FAILURE) for (file, _, correct_hash) in events])
+        self.counters_label.setText("%d files, %.1f MB, %d failures" % (counters.files, counters.bytes / 1000000, counters.failures))
+
+    @QtCore.Slot(VerificationProgress)
+    def on_progress(self, progress):
+        # the bar follows the bytes, not the files, so that a few large files do not make it stall
+        if progress.total_bytes > 0:
+            self.progress_bar.setValue(int(1000 * progress.processed_bytes / progress.total_bytes))
+        elif progress.total_files > 0:
+            self.progress_bar.setValue(int(1000 * progress.processed_files / progress.total_files))
+        eta_seconds = progress.eta_seconds
+        self.statistics_label.setText("%s – %d of %d files, %.1f of %.1f MB, %.1f MB/s, %s remaining" % (
+            progress.phase or "finished", progress.processed_files, progress.total_files, progress.processed_bytes / 1000000, progress.total_bytes / 1000000,
+            progress.bytes_per_second / 1000000, format_timedelta(timedelta(seconds=eta_seconds)) if eta_seconds is not None else "unknown time"))
+
+    def add_statistics(self, statistics):
+        if statistics is None:
+            return
+        self.on_progress(statistics)
+        self.progress_bar.setValue(self.progress_bar.maximum())
+        self.add_lines("", "Time spent per phase:")
+        self.add_lines(*("%s: %s" % (phase, format_timedelta(timedelta(seconds=statistics.phase_seconds[phase]))) for phase in PHASES if phase in statistics.phase_seconds))
 
     @QtCore.Slot(VerificationResult)
     def on_finished(self, verification_result):
-        self.add_lines("", "Verification finished. The overall result is: " + ("✅ success" if verification_result.success else "❌ failure"))
+        if verification_result.error is not None:
+            self.add_lines("", "Verification failed: " + verification_result.error, kind=FAILURE)
+            self.run_finished()
+            return
+        if verification_result.complete:
+            self.add_lines("", "Verification finished. The overall result is: " + ("✅ success" if verification_result.success else "❌ failure"))
+        else:
+            self.add_lines("", "Verification stopped early. Only the files listed so far have been checked: ❌ failure")
+        if verification_result.resumed_files:
+            self.add_lines("%d files were verified by an earlier, interrupted run and have not changed since." % verification_result.resumed_files)
+        tiers = verification_result.tiers
+        if tiers.get(SIZE_TIER):
+            self.add_lines("%d files had the wrong size and have not been hashed." % tiers[SIZE_TIER])
+        if tiers.get(SAMPLE_TIER):
+            self.add_lines("%d files have only been checked by a sample of their content." % tiers[SAMPLE_TIER])
         if verification_result.mismatches:
             self.add_lines("", "The following files had incorrect checksums:")
-            for mismatch in verification_result.mismatches:
-                self.add_lines(mismatch)
+            self.add_lines(*verification_result.mismatches, kind=FAILURE)
         if verification_result.missing_files:
             self.add_lines("", "The following files are missing:")
-            for missing_file in verification_result.missing_files:
-                self.add_lines(missing_file)
+            self.add_lines(*verification_result.missing_files, kind=FAILURE)
         if verification_result.additional_files:
             self.add_lines("", "The following files did not have checksums:")
-            for additional_file in verification_result.additional_files:
-                self.add_lines(additional_file)
-        self.verification_finished = True
-        self.close_button.setEnabled(True)
-        self.write_lines()
+            self.add_lines(*verification_result.additional_files, kind=FAILURE)
+        self.add_statistics(verification_result.statistics)
+        self.run_finished()
+
+
+class CreateRunWindow(VerifyRunWindow):
 
-    def write_lines(self):
-        self.progress_details.setText("<html>\n" + "\n".join(map(self.convert_line_to_html, self.lines)) + "</html>")
-        self.progress_details.moveCursor(QtGui.QTextCursor.MoveOperation.End)
+    def __init__(self, parent, control=None):
+        super().__init__(parent, control)
+        self.setWindowTitle("Create Checksums")
 
-    def convert_line_to_html(self, line: TimestampedLine):
-        if line.text:
-            return "<div style='line-height: 1.1'>" + format_timedelta(line.date - self.verification_start) + " " + line.text + "</div>"
-        return "<hr/>"
+    @QtCore.Slot(str)
+    def on_started(self, directory):
+        self.verification_start = datetime.now()
+        self.add_lines("Creating checksums for " + directory + "…")
+
+    @QtCore.Slot(CreationResult)
+    def on_finished(self, creation_result):
+        if creation_result.error is not None:
+            self.add_lines("", "Creating checksums failed: " + creation_result.error, kind=FAILURE)
+            self.run_finished()
+            return
+        if not creation_result.complete:
+            self.add_lines("", "Creating checksums was cancelled; the checksum file is incomplete.")
+        self.add_lines("", "Checksums for %d files have been written to %s." % (creation_result.files, creation_result.output))
+        self.add_statistics(creation_result.statistics)
+        self.run_finished()
 
 
 def format_timedelta(timedelta):